@@ -0,0 +1,26 @@
+import hmac
+from typing import Optional
+from fastapi import HTTPException, Request
+from .config import settings
+
+ADMIN_HEADER = "X-Admin-Key"
+
+def is_admin(request: Request) -> bool:
+    """True when the request carries ADMIN_API_KEY. Always False while no key is configured."""
+    key = request.headers.get(ADMIN_HEADER)
+    return bool(settings.ADMIN_API_KEY and key and hmac.compare_digest(key, settings.ADMIN_API_KEY))
+
+def require_admin(request: Request):
+    """Dependency (or plain call) for admin-only endpoints and options."""
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail=f"Admin access required ({ADMIN_HEADER} header)")
+
+def is_known_api_key(key: Optional[str]) -> bool:
+    """True when key is ADMIN_API_KEY or one of SCAN_CLIENT_API_KEYS."""
+    if not key:
+        return False
+    known = [k.strip() for k in settings.SCAN_CLIENT_API_KEYS.split(",") if k.strip()]
+    if settings.ADMIN_API_KEY:
+        known.append(settings.ADMIN_API_KEY)
+    # Compares against every key, so the time taken doesn't tell which one was close
+    return sum(hmac.compare_digest(key, k) for k in known) > 0
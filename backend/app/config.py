@@ -1,3 +1,4 @@
+import functools
 import os
 import shutil
 from typing import Optional
@@ -51,14 +52,118 @@ class Settings(BaseSettings):
     ZAP_API_KEY: str = ""
     ZAP_PORT: int = 8080
     ZAP_HOST: str = "localhost"
+    ZAP_REQUEST_TIMEOUT_SECONDS: float = 10.0
+    ZAP_REQUEST_RETRIES: int = 2  # transport errors and 5xx, with exponential backoff
+    ZAP_MAX_CONNECTIONS: int = 10  # per scan: each scan thread has its own pool, so ZAP sees up to this times the running scans
+    ZAP_POLL_INITIAL_SECONDS: float = 0.5  # spider status polling starts here and doubles
+    ZAP_POLL_MAX_SECONDS: float = 8.0
+    ZAP_SCAN_DEADLINE_SECONDS: float = 300.0  # overall budget for spider + alerts; the spider is stopped when it runs out
+    # How ZAP sees the target: "har" imports the render's HAR, "spider" crawls the target again
+    # (the previous behavior), "proxy" routes the page render through ZAP. Proxy is opt-in: ZAP
+    # re-signs TLS with its own CA, so the render then skips certificate validation
+    ZAP_TRAFFIC_MODE: str = "har"
+    ZAP_SPIDER_DEPTH: int = 0  # opt-in crawl on top of the rendered traffic; 0 = no spider (per scan: zap_spider_depth)
+    ZAP_ALERTS_PAGE_SIZE: int = 500  # alerts fetched per core/view/alerts request
+    ZAP_ALERT_SAMPLE_URLS: int = 5  # example URLs kept per deduplicated alert
+
+    # SQLite production profile (ignored for other databases)
+    SQLITE_PRODUCTION_PROFILE: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 15000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
+    SQLITE_CACHE_SIZE: int = -65536  # negative = KiB, i.e. 64 MB
+
+    # Single writer: batches DB writes from all running scans into grouped transactions
+    DB_WRITER_ENABLED: bool = True
+    DB_WRITER_BATCH_SIZE: int = 100
+    DB_WRITER_BATCH_WINDOW_MS: int = 20
+
+    # Serialized response cache for finished scans
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256
+    RESPONSE_CACHE_MAX_BYTES: int = 128 * 1024 * 1024
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None  # optional shared tier, requires the redis package
+    RESPONSE_CACHE_TTL_SECONDS: int = 24 * 3600
+
+    # ModuleResult.result_json storage: "zstd", "gzip" (zlib with preset dictionary) or "none"
+    RESULT_JSON_COMPRESSION: str = "zstd"
+    RESULT_JSON_COMPRESSION_LEVEL: int = 9
+
+    # Retention: background collector deleting in small batches (0 disables a rule).
+    # The deletion rules below are opt-in: set RETENTION_ENABLED=true to apply them. Without
+    # it the collector only removes orphaned rows and stale temp files from crashed scans
+    RETENTION_ENABLED: bool = False
+    RETENTION_KEEP_PER_URL: int = 20  # keep the newest N finished scans per URL
+    RETENTION_ARTIFACT_MAX_AGE_DAYS: int = 30  # then drop files and module details, keep the summary
+    RETENTION_INTERVAL_SECONDS: int = 600
+    RETENTION_BATCH_SIZE: int = 50
+    RETENTION_BATCH_PAUSE_MS: int = 200
+    RETENTION_VACUUM_PAGES: int = 2000  # SQLite pages released per incremental_vacuum step
+
+    # Page artifact: the render the analyzers share while a scan runs
+    ARTIFACT_SPILL_BYTES: int = 1048576  # screenshot and DOM at least this large wait in data/artifacts; 0 keeps them in memory
+    ARTIFACT_MAX_NETWORK_LOGS: int = 2000  # requests kept per render; later ones are only counted
+    ARTIFACT_MAX_CLICKABLE_ELEMENTS: int = 5000  # clickables kept for the click heatmap, in document order
+
+    # Render snapshots, to re-run analyzers offline (POST /scan/{id}/reanalyze, POST /scan/reanalyze)
+    SCAN_SNAPSHOTS: str = "off"  # off, page (DOM, headers, cookies, network log, clickables) or har (page plus a HAR to replay the render); per scan: snapshot
+    REANALYSIS_WORKERS: int = 0  # processes for bulk re-analysis jobs; 0 = one per CPU
+    REANALYSIS_BATCH_SIZE: int = 100  # snapshots read from the database per query
+
+    # Heatmaps
+    HEATMAP_CLICK_SCALE: float = 0.25  # click map is rasterized and blurred at this fraction of full size
+    HEATMAP_QUALITY: str = "balanced"  # attention map level when a scan doesn't choose one: fast, balanced, high
+    HEATMAP_MEMORY_BUDGET_MB: int = 256  # peak for full-size heatmap buffers; beyond it overlays run in bands
+
+    # Image encoding (screenshot and heatmaps)
+    IMAGE_FORMAT: str = "jpeg"  # jpeg, webp or png; the screenshot is captured by the browser in this format
+    IMAGE_QUALITY: int = 80  # 1-100 for jpeg and webp
+    IMAGE_JPEG_PROGRESSIVE: bool = False  # ~12% smaller heatmaps, but about 5x the encode time
+    IMAGE_JPEG_OPTIMIZE: bool = True  # optimized Huffman tables: ~8% smaller for ~2x a plain encode
+
+    # Admin-only API features (e.g. per-scan profiling); sent as the X-Admin-Key header. Unset disables them
+    ADMIN_API_KEY: Optional[str] = None
+
+    # Per-scan profiling (ScanCreate.profile)
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+
+    # Scan admission control: a bounded queue in front of a fixed number of scan workers
+    SCAN_MAX_CONCURRENT: int = 3  # scan workers in total, interactive ones included; each scan opens up to three browsers
+    SCAN_QUEUE_MAX: int = 50  # waiting scans beyond which submissions get 429
+    SCAN_CLIENT_MAX_ACTIVE: int = 5  # queued + running scans per client; 0 = no per-client limit
+    SCAN_CLIENT_KEY_HEADER: str = "X-API-Key"  # clients sending a known key in this header are keyed on it, the rest on their IP
+    SCAN_CLIENT_API_KEYS: str = ""  # comma-separated known client keys (ADMIN_API_KEY also counts); unknown keys are ignored
+    # Other clients are keyed on their IP. Behind a reverse proxy that is the proxy's address unless
+    # uvicorn runs with --proxy-headers and the proxy in --forwarded-allow-ips (start.sh passes
+    # FORWARDED_ALLOW_IPS); otherwise the per-client limits become service-wide
+    SCAN_MIN_AVAILABLE_MEMORY_MB: int = 1024  # a queued scan starts only with this much memory available...
+    SCAN_MAX_LOAD_PER_CPU: float = 2.0  # ...and the 1-minute load average per CPU below this (0 disables)
+    SCAN_ESTIMATED_DURATION_SECONDS: float = 60.0  # starting point for wait estimates, then learned from scans
+    # Priority lanes (ScanCreate.priority): interactive, normal and bulk
+    SCAN_LANE_WEIGHTS: str = "interactive=8,normal=3,bulk=1"  # fair share of worker starts between busy lanes
+    SCAN_LANE_MAX_WAIT_SECONDS: str = "interactive=5,normal=300,bulk=3600"  # then a scan goes ahead of the fair order
+    SCAN_INTERACTIVE_WORKERS: int = 1  # of SCAN_MAX_CONCURRENT, workers that only run interactive scans (at least one stays shared)
+    SCAN_CLIENT_MAX_INTERACTIVE: int = 1  # interactive scans per client without a known key; more go to the normal lane (0 = no limit)
+    SCAN_BULK_QUEUE_MAX: int = 1000  # bulk has its own bounds; SCAN_QUEUE_MAX and SCAN_CLIENT_MAX_ACTIVE cover the rest
+    SCAN_BULK_CLIENT_MAX_ACTIVE: int = 500
+
+    # Startup warm-up and readiness (/healthz, /readyz)
+    WARMUP_ENABLED: bool = True  # launch the browser, open DB connections and load the workflow and rule sets at startup
+    WARMUP_DB_CONNECTIONS: int = 5  # pool connections opened ahead of the first scans (capped at the pool size)
+    READINESS_REQUIRED: str = "db,browser,warmup"  # comma-separated components /readyz needs; others are only reported
+    READINESS_CHECK_TIMEOUT_SECONDS: float = 2.0
+
+    # axe-core for the accessibility module; empty means the copy npm installs with Lighthouse
+    AXE_CORE_PATH: str = ""
+
+    # Technology fingerprinting
+    FINGERPRINT_SIGNATURES_PATH: str = ""  # extra signature files (os.pathsep-separated), merged over the bundled ones
     
     # AI Configuration
     AI_PROVIDER: str = "gemini"
     AI_MODEL: str = "gemini-1.5-pro"
     GEMINI_API_KEY: Optional[str] = None
     
-    # Dynamic Chrome Path
-    CHROME_PATH: str = get_chrome_path()
+    # Chrome for Lighthouse; empty means discovered on first use (see chrome_path())
+    CHROME_PATH: str = ""
     
     class Config:
         env_file = ".env"
@@ -66,3 +171,14 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
+@functools.lru_cache(maxsize=1)
+def _discovered_chrome_path() -> str:
+    return get_chrome_path()
+
+def chrome_path() -> str:
+    """
+    settings.CHROME_PATH, or else the discovered browser. Discovery starts Playwright's
+    driver, so it runs once on first use instead of at import time.
+    """
+    return settings.CHROME_PATH or _discovered_chrome_path()
+
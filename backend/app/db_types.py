@@ -0,0 +1,114 @@
+import json
+import threading
+import zlib
+from typing import Any, Optional
+import orjson
+from sqlalchemy.types import LargeBinary, TypeDecorator
+from .config import settings
+from .result_json_dictionary import DICTIONARIES, CURRENT_VERSION
+
+try:
+    import zstandard
+except ImportError:  # optional: falls back to zlib
+    zstandard = None
+
+# Stored layout: 1 byte codec, 1 byte dictionary version (0 = none), then the payload.
+CODEC_RAW = 0x00
+CODEC_ZSTD = 0x01
+CODEC_ZLIB = 0x02
+
+# Below this size the header and dictionary lookup cost more than they save
+MIN_COMPRESS_BYTES = 256
+
+_local = threading.local()
+
+def _zstd_dict(version: int):
+    cache = getattr(_local, "zstd_dicts", None)
+    if cache is None:
+        cache = _local.zstd_dicts = {}
+    if version not in cache:
+        cache[version] = zstandard.ZstdCompressionDict(
+            DICTIONARIES[version], dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+    return cache[version]
+
+def _zstd_compressor(version: int, level: int):
+    # zstd contexts are not thread-safe, so keep one per thread
+    key = (version, level)
+    cache = getattr(_local, "zstd_compressors", None)
+    if cache is None:
+        cache = _local.zstd_compressors = {}
+    if key not in cache:
+        cache[key] = zstandard.ZstdCompressor(level=level, dict_data=_zstd_dict(version))
+    return cache[key]
+
+def _zstd_decompressor(version: int):
+    cache = getattr(_local, "zstd_decompressors", None)
+    if cache is None:
+        cache = _local.zstd_decompressors = {}
+    if version not in cache:
+        cache[version] = zstandard.ZstdDecompressor(dict_data=_zstd_dict(version))
+    return cache[version]
+
+def compress_json(value: Any, codec: Optional[str] = None, level: Optional[int] = None) -> bytes:
+    """Serializes value to JSON and compresses it with the shared dictionary."""
+    codec = codec or settings.RESULT_JSON_COMPRESSION
+    raw = orjson.dumps(value)
+    if codec == "none" or len(raw) < MIN_COMPRESS_BYTES:
+        return bytes((CODEC_RAW, 0)) + raw
+
+    version = CURRENT_VERSION
+    if codec == "zstd" and zstandard is not None:
+        level = level if level is not None else settings.RESULT_JSON_COMPRESSION_LEVEL
+        return bytes((CODEC_ZSTD, version)) + _zstd_compressor(version, level).compress(raw)
+
+    # gzip/zlib: deflate with the dictionary as preset (zdict)
+    level = level if level is not None else 6
+    compressor = zlib.compressobj(level=min(level, 9), zdict=DICTIONARIES[version])
+    return bytes((CODEC_ZLIB, version)) + compressor.compress(raw) + compressor.flush()
+
+def decompress_json(data: Any) -> Any:
+    """Inverse of compress_json. Also reads rows stored as plain JSON before compression."""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        return json.loads(data)
+    data = bytes(data)
+    if not data:
+        return None
+
+    codec, version = data[0], data[1] if len(data) > 1 else 0
+    if codec == CODEC_RAW:
+        return orjson.loads(data[2:])
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed results")
+        return orjson.loads(_zstd_decompressor(version).decompress(data[2:]))
+    if codec == CODEC_ZLIB:
+        decompressor = zlib.decompressobj(zdict=DICTIONARIES[version]) if version else zlib.decompressobj()
+        return orjson.loads(decompressor.decompress(data[2:]) + decompressor.flush())
+
+    # Legacy uncompressed JSON text stored in a binary column
+    return orjson.loads(data)
+
+def is_compressed(data: Any) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview)) and len(data) > 1 and bytes(data[:1])[0] in (
+        CODEC_RAW, CODEC_ZSTD, CODEC_ZLIB
+    )
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON column stored as compressed bytes.
+    Pair with deferred() on the mapped column so queries that don't read the value
+    never load or decompress it.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_json(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_json(value)
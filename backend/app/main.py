@@ -1,13 +1,38 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import scans, files
-from .db import Base, engine
+from contextlib import asynccontextmanager
+from .routers import scans, files, metrics, health
+from .migrate import upgrade_database
+from .services.db_writer import db_writer
+from .services.retention import retention_collector
+from .services.readiness import readiness
+from .services.scan_queue import scan_queue
+from .services.scan_service import fail_interrupted_scans
+from .services.reanalysis import reanalysis_jobs
+from .tools.zap_client import zap_client
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema is managed by Alembic (backend/migrations)
+    upgrade_database()
+    # Queued and running scans were only held in memory by the previous process
+    fail_interrupted_scans()
+    db_writer.start()
+    retention_collector.start()
+    scan_queue.start()
+    # Warms up in the background; /readyz reports 503 until it is done
+    readiness.start()
+    yield
+    await readiness.stop()
+    scan_queue.stop()
+    reanalysis_jobs.stop()
+    await retention_collector.stop()
+    await zap_client.aclose()
+    # Flush any queued scan writes before the process exits
+    db_writer.stop()
 
-app = FastAPI(title="SiteSense API")
+app = FastAPI(title="SiteSense API", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -21,6 +46,8 @@ app.add_middleware(
 # Routers
 app.include_router(scans.router)
 app.include_router(files.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 # Static files - use absolute path relative to backend directory
 import os
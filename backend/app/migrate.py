@@ -0,0 +1,32 @@
+import os
+from sqlalchemy import inspect
+from .db import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+
+# Revision that matches the schema Base.metadata.create_all used to produce
+BASELINE_REVISION = "0001"
+
+def get_alembic_config():
+    from alembic.config import Config
+    cfg = Config(ALEMBIC_INI)
+    cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    # Keep uvicorn's logging setup intact when migrating from inside the app
+    cfg.attributes["configure_logging"] = False
+    return cfg
+
+def upgrade_database():
+    """
+    Brings the database schema to the latest Alembic revision.
+    Databases created before migrations existed are stamped at the baseline first.
+    """
+    from alembic import command
+    cfg = get_alembic_config()
+
+    tables = set(inspect(engine).get_table_names())
+    if "scans" in tables and "alembic_version" not in tables:
+        print(f"Existing schema without migration history, stamping at {BASELINE_REVISION}")
+        command.stamp(cfg, BASELINE_REVISION)
+
+    command.upgrade(cfg, "head")
@@ -1,40 +1,80 @@
-from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey, JSON, LargeBinary
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, DateTime, Text, Integer, Float, ForeignKey, LargeBinary, Index, Boolean
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.sql import func, false
+from sqlalchemy.dialects import sqlite
 from .db import Base
+from .db_types import CompressedJSON
 import uuid
 
 def generate_uuid():
     return str(uuid.uuid4())
 
+# SQLite keeps server_default=func.now() values as 'YYYY-MM-DD HH:MM:SS'. Binding
+# parameters in the same text format keeps keyset comparisons on created_at exact.
+CreatedAt = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 class Scan(Base):
     __tablename__ = "scans"
+    __table_args__ = (
+        # Keyset pagination for the scan history, unfiltered and per filter column
+        Index("ix_scans_created_at_id", "created_at", "id"),
+        Index("ix_scans_url_created_at_id", "url", "created_at", "id"),
+        Index("ix_scans_domain_created_at_id", "domain", "created_at", "id"),
+        Index("ix_scans_status_created_at_id", "status", "created_at", "id"),
+    )
     id = Column(String, primary_key=True, default=generate_uuid)
     url = Column(String, nullable=False)
     normalized_url = Column(String)
+    domain = Column(String)  # hostname of url, lowercased
     status = Column(String, default="queued")  # queued, running, completed, failed
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(CreatedAt, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     error_message = Column(Text)
+    overall_score = Column(Integer)  # denormalized from the aggregated_report module result
+    pinned = Column(Boolean, nullable=False, default=False, server_default=false())  # exempt from retention
+    artifacts_purged_at = Column(DateTime(timezone=True))  # set once retention dropped files and module details
     module_results = relationship("ModuleResult", back_populates="scan", cascade="all, delete-orphan")
     files = relationship("File", back_populates="scan", cascade="all, delete-orphan")
 
 class ModuleResult(Base):
     __tablename__ = "module_results"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    scan_id = Column(String, ForeignKey("scans.id", ondelete="CASCADE"))
+    scan_id = Column(String, ForeignKey("scans.id", ondelete="CASCADE"), index=True)
     module_name = Column(String)  # ui_ux, security_hygiene, etc.
     status = Column(String)
-    result_json = Column(JSON)
+    # Compressed on disk; deferred so only reads that use it pay for loading and decompressing
+    result_json = deferred(Column(CompressedJSON))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     scan = relationship("Scan", back_populates="module_results")
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # One artifact per type per scan; also the ON CONFLICT target for save_file
+        Index("uq_files_scan_id_file_type", "scan_id", "file_type", unique=True),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     scan_id = Column(String, ForeignKey("scans.id", ondelete="CASCADE"))
-    file_type = Column(String) # screenshot, attention_heatmap, click_heatmap, lighthouse_report
+    file_type = Column(String) # screenshot, attention_heatmap, click_heatmap, lighthouse_report, profile, render_trace, snapshot
     content_type = Column(String) # image/png, image/jpeg, application/json
     data = Column(LargeBinary)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     scan = relationship("Scan", back_populates="files")
+
+class ScanTiming(Base):
+    __tablename__ = "scan_timings"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    scan_id = Column(String, ForeignKey("scans.id", ondelete="CASCADE"), index=True)
+    stage = Column(String)  # LangGraph node or analysis module, e.g. render_page, lighthouse
+    status = Column(String)
+    started_ms = Column(Float)  # offset from the scan start
+    wall_ms = Column(Float)
+    cpu_ms = Column(Float)
+    queue_wait_ms = Column(Float)
+    bytes_out = Column(Integer)
+    rss_delta_kb = Column(Integer)
@@ -0,0 +1,108 @@
+"""
+Shared compression dictionaries for ModuleResult.result_json.
+
+Each version is frozen once released: stored rows reference it by number, so editing
+an existing entry makes those rows unreadable. Add a new version instead.
+
+The content is raw text (not a trained zstd dictionary) so the same bytes can serve
+as a zlib preset dictionary. It holds the boilerplate texts ZAP and axe-core repeat in
+every scan and the keys our result dataclasses produce, written in the compact form
+orjson emits. The most common strings go last, since both codecs reach the end of the
+dictionary most cheaply.
+"""
+
+_AXE_TEXT = [
+    "Ensures ARIA attributes are allowed for an element's role",
+    "Ensures every ARIA input field has an accessible name",
+    "Ensures elements with ARIA roles have all required ARIA attributes",
+    "Ensures <meta name=\"viewport\"> does not disable text scaling and zooming",
+    "Ensure that the page, or at least one of its frames contains a level-one heading",
+    "Ensures the document has a main landmark",
+    "Ensures landmarks are unique",
+    "Ensures the order of headings is semantically correct",
+    "Ensures <html> element has a lang attribute",
+    "Ensures every id attribute value of active, focusable elements is unique",
+    "Ensures every form element has a label",
+    "Ensures buttons have discernible text",
+    "Ensures all page content is contained by landmarks",
+    "Ensures images have alternate text or a role of none or presentation",
+    "Ensures links have discernible text",
+    "Ensures the contrast between foreground and background colors meets WCAG 2 AA minimum contrast ratio thresholds",
+    "https://dequeuniversity.com/rules/axe/4.7/color-contrast?application=axeAPI",
+    "https://dequeuniversity.com/rules/axe/4.7/region?application=axeAPI",
+    "https://dequeuniversity.com/rules/axe/4.7/link-name?application=axeAPI",
+    "https://dequeuniversity.com/rules/axe/4.7/image-alt?application=axeAPI",
+]
+
+_ZAP_TEXT = [
+    "The application appears to be a modern web application. If you need to explore it automatically then the Ajax Spider may well be more effective than the standard one.",
+    "This is an informational alert and so no changes are required.",
+    "A timestamp was disclosed by the application/web server - Unix",
+    "Manually confirm that the timestamp data is not sensitive, and that the data cannot be aggregated to disclose exploitable patterns.",
+    "The response appeared to contain suspicious comments which may help an attacker. Note: Matches made within script blocks or files are against the entire content not only comments.",
+    "Remove all comments that return information that may help an attacker and fix any underlying problems they refer to.",
+    "The cache-control header has not been set properly or is missing, allowing the browser and proxies to cache content. For static assets like css, js, or image files this might be intended, however, the resources should be reviewed to ensure that no sensitive content will be cached.",
+    "For secure content, ensure the cache-control HTTP header is set with \"no-cache, no-store, must-revalidate\". If an asset should be cached consider setting the directives \"public, max-age, immutable\".",
+    "Web browser data loading may be possible, due to a Cross Origin Resource Sharing (CORS) misconfiguration on the web server.",
+    "Ensure that sensitive data is not available in an unauthenticated manner (using IP address white-listing, for instance).",
+    "The page includes one or more script files from a third-party domain.",
+    "Ensure JavaScript source files are loaded from only trusted sources, and the sources can't be controlled by end users of the application.",
+    "A cookie has been set without the SameSite attribute, which means that the cookie can be sent as a result of a 'cross-site' request. The SameSite attribute is an effective counter measure to cross-site request forgery, cross-site script inclusion, and timing attacks.",
+    "Ensure that the SameSite attribute is set to either 'lax' or ideally 'strict' for all cookies.",
+    "A cookie has been set without the secure flag, which means that the cookie can be accessed via unencrypted connections.",
+    "Whenever a cookie contains sensitive information or is a session token, then it should always be passed using an encrypted channel. Ensure that the secure flag is set for cookies containing such sensitive information.",
+    "A cookie has been set without the HttpOnly flag, which means that the cookie can be accessed by JavaScript. If a malicious script can be run on this page then the cookie will be accessible and can be transmitted to another site. If this is a session cookie then session hijacking may be possible.",
+    "Ensure that the HttpOnly flag is set for all cookies.",
+    "The web/application server is leaking version information via the \"Server\" HTTP response header. Access to such information may facilitate attackers identifying other vulnerabilities your web/application server is subject to.",
+    "Ensure that your web server, application server, load balancer, etc. is configured to suppress the \"Server\" header or provide generic details.",
+    "HTTP Strict Transport Security (HSTS) is a web security policy mechanism whereby a web server declares that complying user agents (such as a web browser) are to interact with it using only secure HTTPS connections (i.e. HTTP layered over TLS/SSL). HSTS is an IETF standards track protocol and is specified in RFC 6797.",
+    "Ensure that your web server, application server, load balancer, etc. is configured to enforce Strict-Transport-Security.",
+    "The Anti-MIME-Sniffing header X-Content-Type-Options was not set to 'nosniff'. This allows older versions of Internet Explorer and Chrome to perform MIME-sniffing on the response body, potentially causing the response body to be interpreted and displayed as a content type other than the declared content type. Current (early 2014) and legacy versions of Firefox will use the declared content type (if one is set), rather than performing MIME-sniffing.",
+    "Ensure that the application/web server sets the Content-Type header appropriately, and that it sets the X-Content-Type-Options header to 'nosniff' for all web pages. If possible, ensure that the end user uses a standards-compliant and modern web browser that does not perform MIME-sniffing at all, or that can be directed by the web application/web server to not perform MIME-sniffing.",
+    "The response does not include either Content-Security-Policy with 'frame-ancestors' directive or X-Frame-Options to protect against 'ClickJacking' attacks.",
+    "Modern Web browsers support the Content-Security-Policy and X-Frame-Options HTTP headers. Ensure one of them is set on all web pages returned by your site/app. If you expect the page to be framed only by pages on your server (e.g. it's part of a FRAMESET) then you'll want to use SAMEORIGIN, otherwise if you never expect the page to be framed, you should use DENY. Alternatively consider implementing Content Security Policy's \"frame-ancestors\" directive.",
+    "Content Security Policy (CSP) is an added layer of security that helps to detect and mitigate certain types of attacks, including Cross Site Scripting (XSS) and data injection attacks. These attacks are used for everything from data theft to site defacement or distribution of malware. CSP provides a set of standard HTTP headers that allow website owners to declare approved sources of content that browsers should be allowed to load on that page — covered types are JavaScript, CSS, HTML frames, fonts, images and embeddable objects such as Java applets, ActiveX, audio and video files.",
+    "Ensure that your web server, application server, load balancer, etc. is configured to set the Content-Security-Policy header.",
+    "Content Security Policy (CSP) Header Not Set",
+    "Missing Anti-clickjacking Header",
+    "X-Content-Type-Options Header Missing",
+    "Strict-Transport-Security Header Not Set",
+    "Server Leaks Version Information via \"Server\" HTTP Response Header Field",
+    "Cookie No HttpOnly Flag",
+    "Cookie Without Secure Flag",
+    "Cookie without SameSite Attribute",
+    "Cross-Domain JavaScript Source File Inclusion",
+    "Re-examine Cache-control Directives",
+    "Information Disclosure - Suspicious Comments",
+    "Timestamp Disclosure - Unix",
+    "Modern Web Application",
+]
+
+_JSON_FRAGMENTS = [
+    '{"score":', '"findings":[', '"recommendations":[', '"analytics_tools":[', '"seo_issues":[',
+    '"scores":{"performance":', '"accessibility":', '"best-practices":', '"seo":',
+    '"core_web_vitals":{"FCP":"', '"LCP":"', '"TBT":"', '"CLS":"', '"SI":"',
+    '"lighthouse_report_url":"/files/', '"attention_heatmap_url":"/files/', '"click_heatmap_url":"/files/',
+    '"overall_score":', '"module_scores":{"security":', '"summary":"Overall site score is ',
+    '{"category":"Security","text":"', '{"category":"SEO","text":"', '"impact":"High"}',
+    '"impact":"Medium"}', '"impact":"Low"}',
+    '{"tag":"A","text":"', '{"tag":"BUTTON","text":"', '{"tag":"INPUT","text":"',
+    '"score":0.6,"rect":{"x":', '"score":0.8,"rect":{"x":', '"score":0.5,"rect":{"x":',
+    ',"y":', ',"width":', ',"height":', '}},',
+    '{"id":"color-contrast","impact":"serious","description":"',
+    '{"id":"link-name","impact":"serious","description":"',
+    '{"id":"region","impact":"moderate","description":"',
+    '"help_url":"https://dequeuniversity.com/rules/axe/4.7/', '?application=axeAPI","nodes":["',
+    '{"risk":"Informational","confidence":"Medium","name":"',
+    '{"risk":"Low","confidence":"Medium","name":"',
+    '{"risk":"Medium","confidence":"High","name":"',
+    '{"risk":"High","confidence":"Medium","name":"',
+    '","description":"', '","url":"https://', '","solution":"',
+    '"issues":[', '"status":"completed"}', '"elements":[',
+]
+
+DICTIONARIES = {
+    1: "\n".join(_AXE_TEXT + _ZAP_TEXT + _JSON_FRAGMENTS).encode("utf-8"),
+}
+
+CURRENT_VERSION = 1
@@ -10,7 +10,8 @@ router = APIRouter(prefix="/files", tags=["files"])
 async def serve_file(scan_id: str, file_type: str, db: Session = Depends(get_db)):
     """
     Serve files from database.
-    file_type can be: screenshot, attention_heatmap, click_heatmap, lighthouse_report
+    file_type can be: screenshot, attention_heatmap, click_heatmap, lighthouse_report,
+    profile, render_trace and snapshot (zip archives, served as downloads)
     """
     # Query the file from database
     file_record = db.query(models.File).filter(
@@ -21,8 +22,13 @@ async def serve_file(scan_id: str, file_type: str, db: Session = Depends(get_db)
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
     
+    headers = {}
+    if file_record.content_type == "application/zip":
+        headers["Content-Disposition"] = f'attachment; filename="{scan_id}-{file_type}.zip"'
+
     # Return the file data with appropriate content type
     return Response(
         content=file_record.data,
-        media_type=file_record.content_type
+        media_type=file_record.content_type,
+        headers=headers
     )
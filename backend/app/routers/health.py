@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ..services.readiness import readiness
+
+router = APIRouter(tags=["health"])
+
+@router.get("/healthz")
+def read_health():
+    """Liveness: answers as soon as the process serves requests."""
+    return readiness.health()
+
+@router.get("/readyz")
+async def read_readiness():
+    """
+    Readiness for load balancers: 503 until the warm-up is done and every component in
+    READINESS_REQUIRED is ok. All components are reported either way.
+    """
+    report = await readiness.check()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
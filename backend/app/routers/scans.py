@@ -1,56 +1,347 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime, timezone
+from typing import List, Optional
+import asyncio
+import base64
+import uuid
 from .. import models, schemas
-from ..db import get_db
+from ..db import get_db, SessionLocal
+from ..config import settings
+from ..auth import is_admin, is_known_api_key, require_admin
+from ..services import retention
+from ..services.response_cache import scan_response_cache
+from ..services.scan_serializer import scan_read_dict, dump_json, make_etag
 
 router = APIRouter(
     prefix="/scan",
     tags=["scans"],
 )
 
-@router.get("/")
-async def list_scans(db: Session = Depends(get_db)):
-    """List all scans ordered by most recent first"""
-    scans = db.query(models.Scan).order_by(models.Scan.created_at.desc()).limit(50).all()
-    return scans
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-from ..services import scan_service
-import asyncio
+def _encode_cursor(created_at: datetime, scan_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{scan_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, scan_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), scan_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _as_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored in UTC (the API renders them with a 'Z' suffix)
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+@router.get("/", response_model=schemas.ScanPage)
+async def list_scans(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    url: Optional[str] = None,
+    domain: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    List scans ordered by most recent first.
+    Keyset-paginated on (created_at, id): pass next_cursor back as cursor for the next page.
+    """
+    Scan = models.Scan
+    query = db.query(
+        Scan.id, Scan.url, Scan.status, Scan.created_at, Scan.updated_at, Scan.overall_score
+    )
+
+    if url:
+        query = query.filter(Scan.url == url)
+    if domain:
+        query = query.filter(Scan.domain == domain.lower())
+    if status:
+        query = query.filter(Scan.status == status)
+    if created_after:
+        query = query.filter(Scan.created_at >= _as_utc_naive(created_after))
+    if created_before:
+        query = query.filter(Scan.created_at < _as_utc_naive(created_before))
+
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            Scan.created_at < cursor_created_at,
+            and_(Scan.created_at == cursor_created_at, Scan.id < cursor_id),
+        ))
 
-def run_scan_sync(scan_id: str, url: str):
-    """Wrapper to run async scan in background task"""
-    asyncio.run(scan_service.run_full_scan(scan_id, url))
+    rows = query.order_by(Scan.created_at.desc(), Scan.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.created_at, last.id)
+
+    return schemas.ScanPage(
+        items=[schemas.ScanSummary.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+from ..services import scan_service
+from ..services import metrics
+from ..services.scan_queue import scan_queue, client_key, ScanJob, ScanRejected
+from ..services.scan_events import scan_events, PROGRESS_STEPS
+from starlette.concurrency import run_in_threadpool
+import time
 
 @router.post("/", response_model=schemas.ScanRead)
-def create_scan(scan: schemas.ScanCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    db_scan = models.Scan(url=scan.url, status="queued")
-    db.add(db_scan)
-    db.commit()
-    db.refresh(db_scan)
+def create_scan(scan: schemas.ScanCreate, request: Request, db: Session = Depends(get_db)):
+    """
+    Queue a scan in its priority lane. 429 with Retry-After when the lane's queue is
+    full or the client (API key or IP) already has its quota of scans queued or running.
+    """
+    if scan.profile or scan.profile_trace or scan.snapshot not in (None, "off"):
+        require_admin(request)
+    client = client_key(request.headers, request.client.host if request.client else None)
+    trusted = is_admin(request) or is_known_api_key(request.headers.get(settings.SCAN_CLIENT_KEY_HEADER))
+    try:
+        lane = scan_queue.admit(client, scan.priority, exempt=is_admin(request), trusted=trusted)
+    except ScanRejected as e:
+        raise HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+    try:
+        db_scan = models.Scan(url=scan.url, domain=scan_service.extract_domain(scan.url), status="queued")
+        db.add(db_scan)
+        db.commit()
+        db.refresh(db_scan)
+    except Exception:
+        scan_queue.release(client, lane)
+        raise
     
-    background_tasks.add_task(run_scan_sync, db_scan.id, db_scan.url)
+    metrics.SCANS_QUEUED.inc()
+    queued_at = time.monotonic()
+    deadline_seconds = scan.deadline_seconds
+    if deadline_seconds and not trusted:
+        # An anonymous deadline can't beat the lane's own wait guarantee
+        deadline_seconds = max(deadline_seconds, scan_queue.max_wait(lane))
+    deadline = queued_at + deadline_seconds if deadline_seconds else None
+    scan_queue.submit(ScanJob(db_scan.id, db_scan.url, client, scan.scan_options(),
+                              lane=lane, queued_at=queued_at, deadline=deadline))
     
     return db_scan
 
 
+# Scans in these states never change again, so their serialized body can be cached
+FINAL_STATUSES = {"completed", "failed"}
+
+def _json_response(request: Request, etag: str, body: bytes, final: bool) -> Response:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=3600" if final else "no-cache",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/{scan_id}", response_model=schemas.ScanRead)
-def read_scan(scan_id: str, db: Session = Depends(get_db)):
-    db_scan = db.query(models.Scan).filter(models.Scan.id == scan_id).first()
+def read_scan(scan_id: str, request: Request, db: Session = Depends(get_db)):
+    cached = scan_response_cache.get(scan_id)
+    if cached is not None:
+        etag, body = cached
+        return _json_response(request, etag, body, final=True)
+
+    db_scan = (
+        db.query(models.Scan)
+        .options(selectinload(models.Scan.module_results).undefer(models.ModuleResult.result_json))
+        .filter(models.Scan.id == scan_id)
+        .first()
+    )
     if db_scan is None:
         raise HTTPException(status_code=404, detail="Scan not found")
-    return db_scan
+
+    body = dump_json(scan_read_dict(db_scan))
+    etag = make_etag(body)
+    final = db_scan.status in FINAL_STATUSES
+    if final:
+        scan_response_cache.set(scan_id, (etag, body))
+    return _json_response(request, etag, body, final=final)
+
+MAX_STATUS_WAIT_SECONDS = 60
+
+def _stored_status(scan_id: str) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(models.Scan.id, models.Scan.status, models.Scan.error_message)
+            .filter(models.Scan.id == scan_id)
+            .first()
+        )
+    finally:
+        db.close()
+    if row is None:
+        return None
+    done = len(PROGRESS_STEPS) if row.status == "completed" else 0
+    return {"status": row.status, "error_message": row.error_message,
+            "modules_done": done, "modules_total": len(PROGRESS_STEPS)}
+
+async def _current_status(scan_id: str) -> Optional[dict]:
+    # Live scans (and recently finished ones) are answered from memory, the rest from the database
+    return scan_events.get(scan_id) or await run_in_threadpool(_stored_status, scan_id)
+
+@router.get("/{scan_id}/status", response_model=schemas.ScanStatus)
+async def read_scan_status(
+    scan_id: str,
+    wait: float = Query(0, ge=0, le=MAX_STATUS_WAIT_SECONDS),
+    since: Optional[int] = None,
+):
+    """
+    Status, progress and error only, plus the place in the scan queue while the scan waits.
+    Long-poll with ?since=<version>&wait=<seconds>: the answer comes as soon as the scan
+    has a newer version (or is finished), else after wait seconds with the current state.
+    """
+    status = await _current_status(scan_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    if wait and since is not None and status["status"] not in FINAL_STATUSES:
+        if status.get("version") is None or status["version"] <= since:
+            await scan_events.wait(scan_id, since, wait)
+            status = await _current_status(scan_id) or status
+    if status["status"] == "queued":
+        status.update(scan_queue.position(scan_id) or {})
+    return schemas.ScanStatus(id=scan_id, **status)
+
+@router.get("/{scan_id}/timings", response_model=List[schemas.ScanTimingRead])
+def read_scan_timings(scan_id: str, db: Session = Depends(get_db)):
+    """Per-stage timings of a scan, in the order the stages started"""
+    if db.query(models.Scan.id).filter(models.Scan.id == scan_id).first() is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    return (
+        db.query(models.ScanTiming)
+        .filter(models.ScanTiming.scan_id == scan_id)
+        .order_by(models.ScanTiming.started_ms, models.ScanTiming.id)
+        .all()
+    )
+
+# Re-analysis from render snapshots (admin only)
+
+from ..services import snapshots
+from ..services.reanalysis import reanalysis_jobs, ReanalysisJob, ReanalysisBusy
+
+def _load_for_reanalysis(scan_id: str):
+    db = SessionLocal()
+    try:
+        if db.query(models.Scan.id).filter(models.Scan.id == scan_id).first() is None:
+            raise HTTPException(status_code=404, detail="Scan not found")
+        snapshot = snapshots.load_snapshot(db, scan_id)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail="Scan has no render snapshot (scan it with snapshot \"page\" or \"har\")")
+        return snapshot, snapshots.stored_results(db, [scan_id])[scan_id]
+    finally:
+        db.close()
+
+@router.post("/reanalyze", response_model=schemas.ReanalysisJobRead)
+def start_bulk_reanalysis(body: schemas.BulkReanalyzeRequest, request: Request):
+    """
+    Re-run modules over every stored snapshot matching the filters, in worker processes.
+    Poll GET /scan/reanalyze/{job_id} for progress; 409 while another job runs.
+    """
+    require_admin(request)
+    job = ReanalysisJob(
+        modules=list(body.modules or snapshots.OFFLINE_MODULES),
+        save=body.save,
+        filters={"url": body.url, "domain": body.domain,
+                 "created_after": _as_utc_naive(body.created_after),
+                 "created_before": _as_utc_naive(body.created_before)},
+        limit=body.limit,
+    )
+    try:
+        return reanalysis_jobs.start(job)
+    except ReanalysisBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/reanalyze/{job_id}", response_model=schemas.ReanalysisJobRead)
+def read_bulk_reanalysis(job_id: str, request: Request):
+    require_admin(request)
+    job = reanalysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Re-analysis job not found")
+    return job
+
+@router.delete("/reanalyze/{job_id}", response_model=schemas.ReanalysisJobRead)
+def cancel_bulk_reanalysis(job_id: str, request: Request):
+    """Stop a job after the snapshots already handed to workers"""
+    require_admin(request)
+    job = reanalysis_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Re-analysis job not found")
+    return job
+
+@router.post("/{scan_id}/reanalyze", response_model=schemas.ReanalyzeResult)
+async def reanalyze_scan(scan_id: str, body: schemas.ReanalyzeRequest, request: Request):
+    """
+    Re-run modules on the scan's render snapshot, without network access, and report
+    which results changed. With save, the new results replace the stored ones.
+    """
+    require_admin(request)
+    snapshot, stored = await run_in_threadpool(_load_for_reanalysis, scan_id)
+    if body.replay:
+        if snapshot.har is None:
+            raise HTTPException(status_code=400, detail="Snapshot has no HAR to replay (scan with snapshot \"har\")")
+        # The replay opens a browser, so it waits for a scan worker like a scan would
+        client = client_key(request.headers, request.client.host if request.client else None)
+        try:
+            lane = scan_queue.admit(client, "interactive", exempt=True, trusted=True)
+        except ScanRejected as e:
+            raise HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+        job = ScanJob(f"replay-{scan_id}-{uuid.uuid4().hex[:8]}", snapshot.url, client, lane=lane)
+        artifact = await asyncio.wrap_future(
+            scan_queue.submit_task(job, lambda: asyncio.run(snapshots.replay(snapshot))))
+    else:
+        artifact = snapshot.artifact()
+    modules = list(body.modules or snapshots.OFFLINE_MODULES)
+    result = await run_in_threadpool(snapshots.reanalyze, artifact, scan_id, modules, stored, body.save)
+    if body.save:
+        await run_in_threadpool(snapshots.save_reanalysis, result)
+    return schemas.ReanalyzeResult(scan_id=scan_id, replayed=body.replay, saved=body.save,
+                                   changed=result.changed, module_results=result.module_results)
+
+@router.delete("/clear")
+def clear_all_scans(db: Session = Depends(get_db)):
+    """
+    Clear all scans and their results from the database.
+    Deletes in small batches so running scans and readers are not locked out.
+    """
+    try:
+        while True:
+            scan_ids = db.query(models.Scan.id).limit(settings.RETENTION_BATCH_SIZE).all()
+            if not scan_ids:
+                break
+            db.rollback()  # end the read transaction before the writer deletes
+            retention.delete_scans_batch([row.id for row in scan_ids])
+        retention.delete_orphans_batch(limit=1_000_000)
+        scan_response_cache.clear()
+        return {"message": "All scans cleared successfully"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to clear scans: {str(e)}")
 
 @router.delete("/{scan_id}")
 def delete_scan(scan_id: str, db: Session = Depends(get_db)):
     """Delete a single scan and its related data"""
     try:
-        db_scan = db.query(models.Scan).filter(models.Scan.id == scan_id).first()
+        db_scan = db.query(models.Scan.id).filter(models.Scan.id == scan_id).first()
         if db_scan is None:
             raise HTTPException(status_code=404, detail="Scan not found")
-        
-        # Delete the scan (cascade will handle module_results and files)
-        db.delete(db_scan)
-        db.commit()
+        db.rollback()
+
+        # Bulk delete of the scan, its module_results and files
+        retention.delete_scans_batch([scan_id])
         return {"message": f"Scan {scan_id} deleted successfully"}
     except HTTPException:
         raise
@@ -58,18 +349,20 @@ def delete_scan(scan_id: str, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete scan: {str(e)}")
 
-@router.delete("/clear")
-def clear_all_scans(db: Session = Depends(get_db)):
-    """Clear all scans and their results from the database"""
-    try:
-        # Delete all module results first (foreign key constraint)
-        db.query(models.ModuleResult).delete()
-        # Delete all files
-        db.query(models.File).delete()
-        # Delete all scans
-        db.query(models.Scan).delete()
-        db.commit()
-        return {"message": "All scans cleared successfully"}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to clear scans: {str(e)}")
+def _set_pinned(scan_id: str, pinned: bool, db: Session):
+    db_scan = db.query(models.Scan).filter(models.Scan.id == scan_id).first()
+    if db_scan is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    db_scan.pinned = pinned
+    db.commit()
+    return {"id": scan_id, "pinned": pinned}
+
+@router.post("/{scan_id}/pin")
+def pin_scan(scan_id: str, db: Session = Depends(get_db)):
+    """Exempt a scan from retention rules"""
+    return _set_pinned(scan_id, True, db)
+
+@router.delete("/{scan_id}/pin")
+def unpin_scan(scan_id: str, db: Session = Depends(get_db)):
+    """Make a pinned scan subject to retention rules again"""
+    return _set_pinned(scan_id, False, db)
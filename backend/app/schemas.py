@@ -1,12 +1,30 @@
-from pydantic import BaseModel, HttpUrl, model_serializer
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field, HttpUrl, model_serializer
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 class ScanBase(BaseModel):
     url: str
 
 class ScanCreate(ScanBase):
-    pass
+    # Attention heatmap quality for this scan; defaults to the HEATMAP_QUALITY setting
+    heatmap_quality: Optional[Literal["fast", "balanced", "high"]] = None
+    # ZAP spider depth on top of the rendered traffic (0 = passive only); defaults to ZAP_SPIDER_DEPTH
+    zap_spider_depth: Optional[int] = Field(None, ge=0, le=10)
+    # Scheduling lane; the UI sends "interactive", scripts and CI should send "bulk".
+    # Without a known API key only SCAN_CLIENT_MAX_INTERACTIVE scans per client are interactive
+    priority: Literal["interactive", "normal", "bulk"] = "normal"
+    # Start-by deadline in seconds from now; a due scan goes ahead of the lanes' fair order.
+    # Without a known API key it is never earlier than the lane's SCAN_LANE_MAX_WAIT_SECONDS
+    deadline_seconds: Optional[int] = Field(None, ge=1, le=7 * 24 * 3600)
+    # Admin only: sample-profile the scan (saved as the "profile" file), optionally with a Playwright trace of the render
+    profile: bool = False
+    profile_trace: bool = False
+    # Admin only: store a render snapshot for /reanalyze ("page", or "har" to also keep the traffic); defaults to SCAN_SNAPSHOTS
+    snapshot: Optional[Literal["off", "page", "har"]] = None
+
+    def scan_options(self) -> Dict[str, Any]:
+        """Per-scan options passed through to the workflow state."""
+        return self.model_dump(exclude={"url", "priority", "deadline_seconds"}, exclude_none=True, exclude_defaults=True)
 
 class ModuleResultRead(BaseModel):
     id: int
@@ -46,10 +64,107 @@ class ScanRead(ScanBase):
     class Config:
         from_attributes = True
 
+class ScanSummary(BaseModel):
+    """Lightweight projection used by the scan history listing."""
+    id: str
+    url: str
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    overall_score: Optional[int] = None
+
+    @model_serializer(mode='wrap')
+    def ser_model(self, serializer):
+        data = serializer(self)
+        if data.get('created_at'):
+            data['created_at'] = data['created_at'] + 'Z' if not data['created_at'].endswith('Z') else data['created_at']
+        if data.get('updated_at'):
+            data['updated_at'] = data['updated_at'] + 'Z' if not data['updated_at'].endswith('Z') else data['updated_at']
+        return data
+
+    class Config:
+        from_attributes = True
+
+class ScanPage(BaseModel):
+    items: List[ScanSummary]
+    next_cursor: Optional[str] = None
+
 class ScanStatus(BaseModel):
     id: str
     status: str
     error_message: Optional[str] = None
+    # Finished stages out of the scan's total (render, analysis modules, report)
+    modules_done: int = 0
+    modules_total: int = 0
+    # Pass back as ?since= to long-poll for the next change; absent when read from the database
+    version: Optional[int] = None
+    # While the scan waits in the scan queue: 1-based place and a rough wait until it starts
+    queue_position: Optional[int] = None
+    lane: Optional[str] = None
+    estimated_start_seconds: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class ScanTimingRead(BaseModel):
+    stage: str
+    status: Optional[str] = None
+    started_ms: Optional[float] = None
+    wall_ms: Optional[float] = None
+    cpu_ms: Optional[float] = None
+    queue_wait_ms: Optional[float] = None
+    bytes_out: Optional[int] = None
+    rss_delta_kb: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+# Modules that can run again from a render snapshot (services.snapshots.OFFLINE_MODULES)
+OfflineModule = Literal["security_hygiene", "analytics_seo", "heatmaps"]
+
+class ReanalyzeRequest(BaseModel):
+    # Modules to run again; all offline modules when omitted. The aggregated report is always rebuilt
+    modules: Optional[List[OfflineModule]] = None
+    # Render the page again from the snapshot's HAR (SCAN_SNAPSHOTS=har) instead of using the stored DOM and screenshot
+    replay: bool = False
+    # Replace the stored results and heatmaps; otherwise the new results are only compared
+    save: bool = False
+
+class ReanalyzeResult(BaseModel):
+    scan_id: str
+    replayed: bool
+    saved: bool
+    # Results that differ from the stored ones
+    changed: List[str]
+    module_results: List[Dict[str, Any]]
+
+class BulkReanalyzeRequest(BaseModel):
+    modules: Optional[List[OfflineModule]] = None
+    save: bool = False
+    # Same filters as the scan listing; scans without a snapshot are left out
+    url: Optional[str] = None
+    domain: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    limit: Optional[int] = Field(None, ge=1)
+
+class ReanalysisJobRead(BaseModel):
+    id: str
+    status: str
+    modules: List[str]
+    save: bool
+    total: int
+    processed: int
+    failed: int
+    # Per module: scans whose result changed, and a few of their ids
+    changed: Dict[str, int]
+    changed_scans: Dict[str, List[str]]
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
 
 class ChatRequest(BaseModel):
     message: str
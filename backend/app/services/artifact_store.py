@@ -0,0 +1,121 @@
+"""
+Bounded-memory building blocks for the page artifact that a scan's analyzers share.
+
+    Blob        bytes held in memory, or spilled to a temp file in data/artifacts once
+                they are ARTIFACT_SPILL_BYTES or larger and read back only by the module
+                that needs them
+    CappedList  a list that keeps its first maxlen items and counts the rest
+
+Spill files are named after the scan, removed as soon as their part is released, and
+swept by the retention collector if a crash leaves them behind.
+"""
+import os
+import threading
+from typing import Any, Iterable, Optional
+from ..config import settings
+from . import metrics
+
+ARTIFACT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../data/artifacts"))
+
+class Blob:
+    """Bytes that can wait on disk. Thread-safe; read() after free() returns b''."""
+
+    def __init__(self, data: bytes = b""):
+        self._data: Optional[bytes] = data or b""
+        self._path: Optional[str] = None
+        self.size = len(self._data)
+        self._lock = threading.Lock()
+
+    @property
+    def spilled(self) -> bool:
+        return self._path is not None
+
+    def spill(self, name: str, threshold: Optional[int] = None) -> bool:
+        """Moves the bytes to data/artifacts/<name> when they are at least threshold long."""
+        threshold = settings.ARTIFACT_SPILL_BYTES if threshold is None else threshold
+        with self._lock:
+            if self._path is not None or not self._data or threshold <= 0 or self.size < threshold:
+                return False
+            os.makedirs(ARTIFACT_DIR, exist_ok=True)
+            path = os.path.join(ARTIFACT_DIR, name)
+            with open(path, "wb") as f:
+                f.write(self._data)
+            self._path, self._data = path, None
+        metrics.ARTIFACT_SPILLED_BYTES.inc(self.size)
+        return True
+
+    def read(self) -> bytes:
+        with self._lock:
+            if self._data is not None:
+                return self._data
+            if self._path is None:
+                return b""
+            with open(self._path, "rb") as f:
+                return f.read()
+
+    def free(self):
+        with self._lock:
+            self._data = b""
+            path, self._path = self._path, None
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class CappedList(list):
+    """
+    A list of at most maxlen items; appends past it are dropped and counted. Keeps the
+    first items rather than the latest: for a page those are the document, its scripts
+    and the elements near the top, which the analyzers care about most.
+    """
+
+    def __init__(self, maxlen: int, items: Iterable[Any] = (), dropped: int = 0):
+        super().__init__()
+        self.maxlen = maxlen
+        self.dropped = dropped
+        self.extend(items)
+
+    def append(self, item: Any):
+        if len(self) < self.maxlen:
+            super().append(item)
+        else:
+            self.dropped += 1
+
+    def extend(self, items: Iterable[Any]):
+        for item in items:
+            self.append(item)
+
+    def insert(self, index: int, item: Any):
+        if len(self) < self.maxlen:
+            super().insert(index, item)
+        else:
+            self.dropped += 1
+
+    def __iadd__(self, items: Iterable[Any]) -> "CappedList":
+        self.extend(items)
+        return self
+
+    def __imul__(self, n: int) -> "CappedList":
+        super().__imul__(n)
+        self._trim()
+        return self
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            # A slice assignment can grow the list; the overflow goes from the end
+            super().__setitem__(index, list(value))
+            self._trim()
+        else:
+            super().__setitem__(index, value)
+
+    def _trim(self):
+        excess = len(self) - self.maxlen
+        if excess > 0:
+            del self[self.maxlen:]
+            self.dropped += excess
+
+    def __reduce__(self):
+        # The default list pickling extends before maxlen is restored; LangGraph state and
+        # the re-analysis processes pickle artifacts
+        return (CappedList, (self.maxlen, list(self), self.dropped))
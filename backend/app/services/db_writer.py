@@ -0,0 +1,142 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..db import SessionLocal
+from . import metrics
+
+WriteOp = Callable[[Session], Any]
+
+_STOP = object()
+
+class DBWriter:
+    """
+    Single writer thread shared by every running scan.
+
+    Scans run in separate event loops (one per background task), so the writer is a
+    plain thread fed by a queue. It groups whatever is queued within a short window
+    into one transaction, which keeps SQLite's single write lock from being fought
+    over by dozens of short-lived sessions.
+    """
+
+    def __init__(self, batch_size: int = 100, batch_window_ms: int = 20):
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flushes pending writes and stops the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, op: WriteOp) -> Future:
+        """Queues a write. op(db) runs inside the batch transaction; do not commit in it."""
+        self.start()
+        future: Future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def _collect_batch(self, first) -> Tuple[List[Tuple[WriteOp, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stopping = self._collect_batch(item)
+            self._write_batch(batch)
+            if stopping:
+                return
+
+    def _write_batch(self, batch: List[Tuple[WriteOp, Future]]):
+        db = SessionLocal()
+        try:
+            results = []
+            for op, _ in batch:
+                results.append(op(db))
+                # Flush per op so later ops in the group see earlier rows (autoflush is off)
+                db.flush()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad write must not fail the others in the group, so retry them one by one
+            print(f"DB writer: batch of {len(batch)} failed ({e}), retrying individually")
+            for entry in batch:
+                self._write_batch([entry])
+            return
+        finally:
+            db.close()
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+db_writer = DBWriter(
+    batch_size=settings.DB_WRITER_BATCH_SIZE,
+    batch_window_ms=settings.DB_WRITER_BATCH_WINDOW_MS,
+)
+
+metrics.gauge("sitesense_db_writer_queue_depth", "Writes waiting for the shared DB writer.",
+              function=lambda: db_writer.queue_depth)
+
+def run_write(op: WriteOp) -> Any:
+    """
+    Runs a write op through the shared writer and blocks until it is committed.
+    Falls back to a private session when the writer is disabled.
+    """
+    if settings.DB_WRITER_ENABLED:
+        return db_writer.submit(op).result()
+
+    db = SessionLocal()
+    try:
+        result = op(db)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def run_write_async(op: WriteOp) -> Any:
+    """Awaitable variant of run_write for use inside the scan event loop."""
+    if settings.DB_WRITER_ENABLED:
+        return await asyncio.wrap_future(db_writer.submit(op))
+    return await asyncio.to_thread(run_write, op)
@@ -1,19 +1,39 @@
 from sqlalchemy.orm import Session
 from .. import models
-from ..db import SessionLocal
+from .db_writer import run_write
 
 def save_file(scan_id: str, file_type: str, data: bytes, content_type: str):
     """
     Saves a file to the database.
+    Goes through the shared DB writer so concurrent scans don't contend for the write lock.
     """
-    db = SessionLocal()
-    try:
-        # Check if file already exists, update if so
+    def _write(db: Session):
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            # Native upsert against the unique (scan_id, file_type) index
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(models.File).values(
+                scan_id=scan_id,
+                file_type=file_type,
+                data=data,
+                content_type=content_type
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["scan_id", "file_type"],
+                set_={"data": stmt.excluded.data, "content_type": stmt.excluded.content_type}
+            )
+            db.execute(stmt)
+            return
+
+        # Other databases: check if file already exists, update if so
         existing = db.query(models.File).filter(
             models.File.scan_id == scan_id,
             models.File.file_type == file_type
         ).first()
-        
+
         if existing:
             existing.data = data
             existing.content_type = content_type
@@ -25,14 +45,12 @@ def save_file(scan_id: str, file_type: str, data: bytes, content_type: str):
                 content_type=content_type
             )
             db.add(new_file)
-        
-        db.commit()
+
+    try:
+        run_write(_write)
     except Exception as e:
         print(f"Error saving file {file_type} for scan {scan_id}: {e}")
-        db.rollback()
         raise e
-    finally:
-        db.close()
 
 def get_file_url(scan_id: str, file_type: str) -> str:
     """
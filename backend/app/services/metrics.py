@@ -0,0 +1,200 @@
+"""
+Process-wide metrics in the Prometheus text exposition format, served at /metrics.
+
+Scans run in background threads, each with its own event loop, so every metric is a
+plain lock-protected object rather than something tied to a loop. Gauges can read
+their value from a callback at scrape time (e.g. the DB writer's queue depth).
+"""
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Scan stages run from milliseconds (analyzers) to minutes (Lighthouse, ZAP)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+        if not self.label_names:
+            # Unlabelled series are exported from the start, as 0
+            self._values[()] = self._zero()
+
+    def _zero(self):
+        return 0.0
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """The exposition lines for every series, without HELP and TYPE."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, function: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(float(self._function()))}"]
+            except Exception as e:
+                print(f"Metric {self.name} callback failed: {e}")
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DURATION_BUCKETS, **kwargs):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(*args, **kwargs)
+
+    def _zero(self):
+        # (per-bucket counts, sum, count)
+        return ([0] * len(self.buckets), 0.0, 0)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or self._zero()
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+registry = Registry()
+
+def counter(name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labels))
+
+def gauge(name: str, documentation: str, labels: Iterable[str] = (), function: Optional[Callable[[], float]] = None) -> Gauge:
+    return registry.register(Gauge(name, documentation, labels, function=function))
+
+def histogram(name: str, documentation: str, labels: Iterable[str] = (), buckets: Iterable[float] = DURATION_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, documentation, labels, buckets=buckets))
+
+# Scan pipeline
+SCANS_QUEUED = gauge("sitesense_scans_queued", "Scans created and waiting for a background worker.")
+SCANS_STARTED = counter("sitesense_scans_started_total", "Scans picked up by a background worker.")
+SCANS_FINISHED = counter("sitesense_scans_finished_total", "Scans finished, by final status.", ["status"])
+SCANS_IN_FLIGHT = gauge("sitesense_scans_in_flight", "Scans currently running.")
+SCAN_DURATION = histogram("sitesense_scan_duration_seconds", "Wall time of a whole scan.", ["status"])
+SCAN_QUEUE_WAIT = histogram("sitesense_scan_queue_wait_seconds", "Time from scan creation until a worker started it.")
+SCANS_REJECTED = counter("sitesense_scans_rejected_total", "Scan submissions refused by admission control.", ["reason"])
+SCANS_DEFERRED = counter("sitesense_scan_start_deferrals_total", "Times a queued scan was held back for lack of memory or CPU headroom.")
+SCAN_LANE_DEPTH = gauge("sitesense_scan_lane_depth", "Scans waiting in each priority lane.", ["lane"])
+SCAN_LANE_WAIT = histogram("sitesense_scan_lane_wait_seconds", "Time a scan waited in its priority lane before a worker started it.", ["lane"])
+
+# Stages: LangGraph nodes and the modules inside analyze_parallel
+STAGE_DURATION = histogram("sitesense_stage_duration_seconds", "Wall time per scan stage.", ["stage"])
+STAGE_CPU = histogram("sitesense_stage_cpu_seconds", "CPU time per scan stage.", ["stage"])
+STAGE_QUEUE_WAIT = histogram("sitesense_stage_queue_wait_seconds", "Time a stage waited for a worker thread.", ["stage"])
+STAGE_BYTES = counter("sitesense_stage_output_bytes_total", "Bytes produced per stage (result JSON and files).", ["stage"])
+STAGE_FAILURES = counter("sitesense_stage_failures_total", "Stages that raised or reported failure.", ["stage"])
+
+# Shared resources
+BROWSERS_IN_USE = gauge("sitesense_browsers_in_use", "Headless browser instances currently open.", ["purpose"])
+ARTIFACT_SPILLED_BYTES = counter("sitesense_artifact_spilled_bytes_total", "Page artifact bytes moved to temp files until their analyzers read them.")
+ARTIFACT_ITEMS_DROPPED = counter("sitesense_artifact_items_dropped_total", "Network log entries and clickable elements beyond the artifact caps.", ["part"])
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,172 @@
+"""
+Opt-in sampling profiler for a single scan (ScanCreate.profile).
+
+A background thread samples the Python stacks of the scan's own threads (its event
+loop thread plus the worker threads its stages run in) every PROFILE_SAMPLE_INTERVAL_MS.
+Sampling keeps the overhead low and works across threads, where cProfile only sees
+the thread that enabled it. Concurrent scans are not sampled, since their threads are
+never registered.
+
+The result is saved as the scan's "profile" file, a zip holding:
+    profile.pstats           loadable with pstats / snakeviz; call counts are sample counts
+    profile.collapsed.txt    collapsed stacks for flamegraph.pl / speedscope
+    profile.speedscope.json  for https://www.speedscope.app
+"""
+import io
+import json
+import marshal
+import sys
+import threading
+import time
+import zipfile
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from ..config import settings
+
+Frame = Tuple[str, int, str]  # (filename, first line, function), the pstats key
+Stack = Tuple[Frame, ...]  # root first
+
+MAX_STACK_DEPTH = 128
+
+# The profiler of the scan running in this context; copied into tasks and to_thread workers
+current_profiler: ContextVar[Optional["ScanProfiler"]] = ContextVar("current_profiler", default=None)
+
+class ScanProfiler:
+    def __init__(self, interval_ms: Optional[float] = None):
+        self.interval = (interval_ms or settings.PROFILE_SAMPLE_INTERVAL_MS) / 1000
+        self.samples: Counter = Counter()  # Stack -> count
+        self._threads: Counter = Counter()  # thread ident -> nesting depth
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> "ScanProfiler":
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="scan-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    @contextmanager
+    def track_thread(self) -> Iterator[None]:
+        """Samples the calling thread while inside the block; nesting is fine."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[ident] -= 1
+                if self._threads[ident] <= 0:
+                    del self._threads[ident]
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                idents = [i for i in self._threads if i != own]
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[self._stack(frame)] += 1
+
+    @staticmethod
+    def _stack(frame) -> Stack:
+        stack: List[Frame] = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    # Output formats
+
+    @staticmethod
+    def _label(frame: Frame) -> str:
+        filename, line, name = frame
+        return f"{name} ({filename}:{line})"
+
+    def collapsed(self) -> str:
+        return "".join(
+            ";".join(self._label(f) for f in stack) + f" {count}\n"
+            for stack, count in self.samples.most_common()
+        )
+
+    def speedscope(self, name: str = "scan") -> Dict:
+        frame_index: Dict[Frame, int] = {}
+        frames, samples, weights = [], [], []
+        for stack, count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[2], "file": frame[0], "line": frame[1]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": sum(weights),
+                "samples": samples, "weights": weights,
+            }],
+            "exporter": "sitesense",
+        }
+
+    def pstats_bytes(self) -> bytes:
+        """
+        The samples in pstats' marshalled format: tottime is time at the top of the stack,
+        cumtime time anywhere on it, and call counts are sample counts.
+        """
+        # func -> [samples on stack, samples on top, callers {caller: samples}]
+        stats: Dict[Frame, list] = {}
+        for stack, count in self.samples.items():
+            seen = set()
+            for depth, frame in enumerate(stack):
+                entry = stats.setdefault(frame, [0, 0, Counter()])
+                if depth > 0:
+                    entry[2][stack[depth - 1]] += count
+                if frame in seen:  # recursion: count cumulative time once per sample
+                    continue
+                seen.add(frame)
+                entry[0] += count
+            stats[stack[-1]][1] += count
+
+        dt = self.interval
+        return marshal.dumps({
+            frame: (on_stack, on_stack, on_top * dt, on_stack * dt,
+                    {caller: (n, n, 0.0, n * dt) for caller, n in callers.items()})
+            for frame, (on_stack, on_top, callers) in stats.items()
+        })
+
+    def archive(self, name: str = "scan") -> bytes:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("profile.pstats", self.pstats_bytes())
+            zf.writestr("profile.collapsed.txt", self.collapsed())
+            zf.writestr("profile.speedscope.json", json.dumps(self.speedscope(name)))
+        return buffer.getvalue()
+
+@contextmanager
+def track_current_thread() -> Iterator[None]:
+    """Registers the calling thread with the current scan's profiler, if any."""
+    profiler = current_profiler.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.track_thread():
+        yield
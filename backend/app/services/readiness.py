@@ -0,0 +1,260 @@
+"""
+Startup warm-up and the component checks behind /healthz and /readyz.
+
+The warm-up runs as a background task of the app lifespan, so the process answers
+/healthz right away while /readyz stays 503 until it is done. It does the first-use
+work of a scan ahead of time:
+    db_pool     opens WARMUP_DB_CONNECTIONS pool connections (and runs their PRAGMAs)
+    workflow    imports the LangGraph workflow and the analyzers it pulls in
+    rule_sets   compiles the fingerprint signatures and reads the bundled axe-core
+    browser     resolves and launches Chromium once, paging in the binary
+    lighthouse  resolves Chrome for Lighthouse and starts its CLI once
+A failed step is recorded and reported; it never stops the app from starting. With
+WARMUP_ENABLED=false the browser check only looks for Playwright's installed Chromium.
+"""
+import asyncio
+import functools
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from ..config import settings, chrome_path
+from ..db import engine
+from . import metrics
+
+@dataclass
+class ComponentStatus:
+    name: str
+    ok: bool
+    required: bool
+    detail: str = ""
+    latency_ms: float = 0.0
+
+@dataclass
+class WarmupStep:
+    name: str
+    ok: bool
+    duration_ms: float
+    detail: str = ""
+
+def _required() -> List[str]:
+    return [c.strip() for c in settings.READINESS_REQUIRED.split(",") if c.strip()]
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+# Warm-up steps (blocking ones run in a worker thread)
+
+def _open_db_connections() -> str:
+    count = max(1, min(settings.WARMUP_DB_CONNECTIONS, getattr(engine.pool, "size", lambda: 1)()))
+    conns = []
+    try:
+        for _ in range(count):
+            conn = engine.connect()
+            conns.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in conns:
+            conn.close()  # back to the pool, still open
+    return f"{count} connections"
+
+def _import_workflow() -> str:
+    importlib.import_module("app.workflow")
+    return "compiled"
+
+def _load_rule_sets() -> str:
+    from ..tools import fingerprint
+    from ..tools.accessibility_perf import axe_version
+    signatures = fingerprint.get_engine()
+    version = axe_version()
+    axe = f"axe-core {version}" if version else "axe-core from CDN"
+    return f"{len(signatures.technologies)} fingerprints, {axe}"
+
+def _start_lighthouse() -> str:
+    chrome = chrome_path()
+    binary = shutil.which("lighthouse")
+    if binary is None:
+        raise FileNotFoundError("lighthouse CLI not found in PATH")
+    out = subprocess.run([binary, "--version"], capture_output=True, text=True, check=True, timeout=60)
+    return f"lighthouse {out.stdout.strip()}, chrome {chrome or 'not found'}"
+
+@functools.lru_cache(maxsize=1)
+def playwright_browser_dir() -> str:
+    """
+    Install directory of the browser scans launch (chromium.launch(headless=True) starts
+    Playwright's headless shell; plain Chromium before Playwright 1.49). Asked of
+    Playwright's CLI, which honours PLAYWRIGHT_BROWSERS_PATH, once per process.
+    """
+    for name in ("chromium-headless-shell", "chromium"):
+        out = subprocess.run([sys.executable, "-m", "playwright", "install", "--dry-run", name],
+                             capture_output=True, text=True, timeout=60)
+        for line in out.stdout.splitlines():
+            if line.strip().startswith("Install location:"):
+                return line.split(":", 1)[1].strip()
+    return ""
+
+class Readiness:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.warmup_done = False
+        self.warmup_steps: List[WarmupStep] = []
+        self.browser_version: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if not settings.WARMUP_ENABLED:
+            self.warmup_done = True
+            # Resolved in the background so no readiness probe waits on Playwright's CLI
+            if self._task is None:
+                self._task = asyncio.create_task(asyncio.to_thread(playwright_browser_dir))
+        elif self._task is None:
+            self._task = asyncio.create_task(self.warm_up())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _step(self, name: str, work) -> bool:
+        start = time.perf_counter()
+        try:
+            detail = await work()
+            ok = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Playwright errors carry a multi-line install banner
+            detail, ok = f"{type(e).__name__}: {(str(e).splitlines() or [''])[0]}", False
+            print(f"Warm-up step {name} failed: {detail}")
+        self.warmup_steps.append(WarmupStep(name, ok, _elapsed_ms(start), detail or ""))
+        return ok
+
+    async def warm_up(self):
+        start = time.perf_counter()
+        await self._step("db_pool", lambda: asyncio.to_thread(_open_db_connections))
+        await self._step("workflow", lambda: asyncio.to_thread(_import_workflow))
+        await self._step("rule_sets", lambda: asyncio.to_thread(_load_rule_sets))
+        await self._step("browser", self._launch_browser)
+        await self._step("lighthouse", lambda: asyncio.to_thread(_start_lighthouse))
+        self.warmup_done = True
+        print(f"Warm-up finished in {_elapsed_ms(start)} ms: "
+              + ", ".join(f"{s.name}={'ok' if s.ok else 'failed'}" for s in self.warmup_steps))
+
+    async def _launch_browser(self) -> str:
+        """
+        Scans launch their own browser in their own event loop, so one can't be handed
+        over; launching once here validates the install and warms the OS page cache.
+        """
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            metrics.BROWSERS_IN_USE.inc(purpose="warmup")
+            try:
+                page = await browser.new_page()
+                await page.goto("about:blank")
+                self.browser_version = browser.version
+                return f"chromium {browser.version}"
+            finally:
+                await browser.close()
+                metrics.BROWSERS_IN_USE.dec(purpose="warmup")
+
+    # Checks
+
+    def _check_warmup(self) -> str:
+        if not self.warmup_done:
+            raise RuntimeError("warm-up in progress")
+        failed = [s.name for s in self.warmup_steps if not s.ok]
+        return f"failed steps: {', '.join(failed)}" if failed else "done"
+
+    @staticmethod
+    def _check_db() -> str:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return "reachable"
+
+    def _check_browser(self) -> str:
+        if self.browser_version is None and not settings.WARMUP_ENABLED:
+            # Nothing launched it; check Playwright's install instead so /readyz can pass
+            if self._task is not None and not self._task.done():
+                raise RuntimeError("locating Playwright's Chromium")
+            path = playwright_browser_dir()
+            # Playwright writes the marker once a browser download is fully unpacked
+            if not path or not os.path.exists(os.path.join(path, "INSTALLATION_COMPLETE")):
+                raise FileNotFoundError(f"Playwright's Chromium is not installed{' at ' + path if path else ''} "
+                                        "(not launched: warm-up disabled)")
+            return f"{path} (not launched: warm-up disabled)"
+        if self.browser_version is None:
+            raise RuntimeError("launch failed during warm-up" if self.warmup_done else "not launched yet")
+        return f"chromium {self.browser_version}"
+
+    @staticmethod
+    def _check_lighthouse() -> str:
+        binary = shutil.which("lighthouse")
+        if binary is None:
+            raise FileNotFoundError("lighthouse CLI not found in PATH")
+        return binary
+
+    @staticmethod
+    async def _check_zap() -> str:
+        from ..tools.zap_client import zap_client
+        return f"ZAP {await zap_client.version()}"
+
+    @staticmethod
+    def _check_axe() -> str:
+        from ..tools.accessibility_perf import axe_version
+        version = axe_version()
+        if version is None:
+            raise FileNotFoundError("axe-core is not installed locally; scans load it from the CDN")
+        return f"axe-core {version}"
+
+    async def _check(self, name: str, check, required: List[str]) -> ComponentStatus:
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(check):
+                call = check()
+            else:
+                call = asyncio.to_thread(check)
+            detail = await asyncio.wait_for(call, settings.READINESS_CHECK_TIMEOUT_SECONDS)
+            ok = True
+        except asyncio.TimeoutError:
+            detail, ok = "timed out", False
+        except Exception as e:
+            detail, ok = str(e) or type(e).__name__, False
+        return ComponentStatus(name, ok, name in required, detail, _elapsed_ms(start))
+
+    async def check(self) -> Dict[str, Any]:
+        """Every component's status; ready when all required ones are ok."""
+        required = _required()
+        checks = {
+            "warmup": self._check_warmup,
+            "db": self._check_db,
+            "browser": self._check_browser,
+            "lighthouse": self._check_lighthouse,
+            "zap": self._check_zap,
+            "axe_core": self._check_axe,
+        }
+        components = await asyncio.gather(*(self._check(n, c, required) for n, c in checks.items()))
+        return {
+            "ready": all(c.ok for c in components if c.required),
+            "components": {c.name: asdict(c) for c in components},
+            "warmup": [asdict(s) for s in self.warmup_steps],
+        }
+
+    def health(self) -> Dict[str, Any]:
+        """Liveness only: the process is up and serving. Touches no dependency."""
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.monotonic() - self.started, 1),
+            "warmup_done": self.warmup_done,
+        }
+
+readiness = Readiness()
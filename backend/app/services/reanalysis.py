@@ -0,0 +1,185 @@
+"""
+Bulk re-analysis: snapshots.reanalyze() over every stored render snapshot that matches
+a filter, to measure what a rule change does across thousands of scans.
+
+The analyzers are CPU-bound Python, so snapshots go to a pool of worker processes
+(REANALYSIS_WORKERS); the job thread reads them from the database in batches of
+REANALYSIS_BATCH_SIZE, keeps at most two per worker in flight, and saves results
+through the DB writer when the job asks for it. One job runs at a time; jobs are kept
+in memory and are gone after a restart.
+"""
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy.orm import Session
+from .. import models
+from ..config import settings
+from ..db import SessionLocal
+from . import snapshots
+
+# Changed scans listed per module in a job's progress; the counts cover all of them
+CHANGED_EXAMPLES = 20
+MAX_JOBS_KEPT = 20
+
+class ReanalysisBusy(Exception):
+    pass
+
+@dataclass
+class ReanalysisJob:
+    modules: List[str]
+    save: bool
+    # Scan filters: url, domain, created_after, created_before (naive UTC)
+    filters: Dict[str, Any] = field(default_factory=dict)
+    limit: Optional[int] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"  # queued, running, completed, failed, cancelled
+    total: int = 0
+    processed: int = 0
+    failed: int = 0
+    changed: Dict[str, int] = field(default_factory=dict)
+    changed_scans: Dict[str, List[str]] = field(default_factory=dict)
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    cancel_requested: bool = False
+
+def _snapshot_query(db: Session, filters: Dict[str, Any]):
+    query = (
+        db.query(models.File.scan_id)
+        .join(models.Scan, models.Scan.id == models.File.scan_id)
+        .filter(models.File.file_type == snapshots.SNAPSHOT_FILE)
+    )
+    if filters.get("url"):
+        query = query.filter(models.Scan.url == filters["url"])
+    if filters.get("domain"):
+        query = query.filter(models.Scan.domain == filters["domain"].lower())
+    if filters.get("created_after"):
+        query = query.filter(models.Scan.created_at >= filters["created_after"])
+    if filters.get("created_before"):
+        query = query.filter(models.Scan.created_at < filters["created_before"])
+    return query
+
+def _batches(job: ReanalysisJob) -> Iterator[List[tuple]]:
+    """(scan_id, snapshot, screenshot, stored results) for the job's scans, keyset-paginated on scan id."""
+    after = ""
+    remaining = job.limit
+    while remaining is None or remaining > 0:
+        size = settings.REANALYSIS_BATCH_SIZE if remaining is None else min(settings.REANALYSIS_BATCH_SIZE, remaining)
+        db = SessionLocal()
+        try:
+            scan_ids = [row.scan_id for row in _snapshot_query(db, job.filters)
+                        .filter(models.File.scan_id > after)
+                        .order_by(models.File.scan_id)
+                        .limit(size)]
+            if not scan_ids:
+                return
+            files: Dict[str, Dict[str, bytes]] = {}
+            for row in (db.query(models.File.scan_id, models.File.file_type, models.File.data)
+                        .filter(models.File.scan_id.in_(scan_ids),
+                                models.File.file_type.in_((snapshots.SNAPSHOT_FILE, "screenshot")))):
+                files.setdefault(row.scan_id, {})[row.file_type] = row.data
+            stored = snapshots.stored_results(db, scan_ids)
+        finally:
+            db.close()
+        after = scan_ids[-1]
+        if remaining is not None:
+            remaining -= len(scan_ids)
+        # A snapshot purged by retention since the id query is simply skipped
+        yield [(scan_id, files[scan_id][snapshots.SNAPSHOT_FILE], files[scan_id].get("screenshot") or b"",
+                stored[scan_id]) for scan_id in scan_ids if snapshots.SNAPSHOT_FILE in files.get(scan_id, {})]
+
+class ReanalysisJobs:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ReanalysisJob] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, job: ReanalysisJob) -> ReanalysisJob:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise ReanalysisBusy("A re-analysis job is already running")
+            db = SessionLocal()
+            try:
+                total = _snapshot_query(db, job.filters).count()
+            finally:
+                db.close()
+            job.total = min(total, job.limit) if job.limit else total
+            self._jobs[job.id] = job
+            for old in list(self._jobs)[:-MAX_JOBS_KEPT]:
+                del self._jobs[old]
+            self._thread = threading.Thread(target=self._run, args=(job,), name="reanalysis", daemon=True)
+            self._thread.start()
+        return job
+
+    def get(self, job_id: str) -> Optional[ReanalysisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ReanalysisJob]:
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel_requested = True
+        return job
+
+    def stop(self):
+        """Cancels the running job; snapshots already in the workers finish first."""
+        with self._lock:
+            thread = self._thread
+            for job in self._jobs.values():
+                job.cancel_requested = True
+        if thread is not None:
+            thread.join(timeout=30)
+
+    def _run(self, job: ReanalysisJob):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        workers = settings.REANALYSIS_WORKERS or os.cpu_count() or 1
+        print(f"Re-analysis job {job.id}: {job.total} snapshots, modules {', '.join(job.modules)}, {workers} workers")
+        try:
+            # spawn: the API process has threads (DB writer, scan workers) that fork would copy mid-state
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pending = set()
+                for batch in _batches(job):
+                    for scan_id, data, screenshot, stored in batch:
+                        if job.cancel_requested:
+                            break
+                        pending.add(pool.submit(snapshots.unpack_and_reanalyze, scan_id, data, screenshot,
+                                                job.modules, stored, job.save))
+                        if len(pending) >= 2 * workers:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            self._collect(job, done)
+                    if job.cancel_requested:
+                        break
+                self._collect(job, wait(pending).done)
+            job.status = "cancelled" if job.cancel_requested else "completed"
+        except Exception as e:
+            print(f"Re-analysis job {job.id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            print(f"Re-analysis job {job.id} {job.status}: {job.processed} processed, {job.failed} failed, "
+                  f"changed {job.changed or 'nothing'}")
+
+    def _collect(self, job: ReanalysisJob, done):
+        for future in done:
+            job.processed += 1
+            try:
+                result = future.result()
+                if job.save:
+                    snapshots.save_reanalysis(result)
+            except Exception as e:
+                print(f"Re-analysis of a snapshot failed: {e}")
+                job.failed += 1
+                continue
+            for module_name in result.changed:
+                job.changed[module_name] = job.changed.get(module_name, 0) + 1
+                examples = job.changed_scans.setdefault(module_name, [])
+                if len(examples) < CHANGED_EXAMPLES:
+                    examples.append(result.scan_id)
+
+reanalysis_jobs = ReanalysisJobs()
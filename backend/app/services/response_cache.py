@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from ..config import settings
+
+CacheEntry = Tuple[str, bytes]  # (etag, body)
+
+class _RedisBackend:
+    """Shared cache tier so every worker reuses the same serialized scan bodies."""
+
+    def __init__(self, url: str, ttl_seconds: int):
+        import redis  # optional dependency, only needed when RESPONSE_CACHE_REDIS_URL is set
+        self._client = redis.Redis.from_url(url)
+        self._ttl = ttl_seconds
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        value = self._client.get(f"sitesense:scan:{key}")
+        if not value:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return etag.decode(), body
+
+    def set(self, key: str, entry: CacheEntry):
+        etag, body = entry
+        self._client.set(f"sitesense:scan:{key}", etag.encode() + b"\n" + body, ex=self._ttl)
+
+    def delete(self, key: str):
+        self._client.delete(f"sitesense:scan:{key}")
+
+    def clear(self):
+        for key in self._client.scan_iter("sitesense:scan:*"):
+            self._client.delete(key)
+
+class ResponseCache:
+    """
+    Serialized response cache for finished scans.
+    In-process LRU bounded by entry count and total bytes, with an optional shared backend behind it.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, shared=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except Exception as e:
+                print(f"Shared response cache unavailable: {e}")
+                return None
+            if entry is not None:
+                self._store_local(key, entry)
+            return entry
+        return None
+
+    def set(self, key: str, entry: CacheEntry):
+        self._store_local(key, entry)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry)
+            except Exception as e:
+                print(f"Shared response cache unavailable: {e}")
+
+    def invalidate(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry[1])
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                print(f"Shared response cache unavailable: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.shared is not None:
+            try:
+                self.shared.clear()
+            except Exception as e:
+                print(f"Shared response cache unavailable: {e}")
+
+    def _store_local(self, key: str, entry: CacheEntry):
+        size = len(entry[1])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[key] = entry
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[1])
+
+def _build_shared_backend():
+    if not settings.RESPONSE_CACHE_REDIS_URL:
+        return None
+    try:
+        return _RedisBackend(settings.RESPONSE_CACHE_REDIS_URL, settings.RESPONSE_CACHE_TTL_SECONDS)
+    except Exception as e:
+        print(f"Shared response cache disabled: {e}")
+        return None
+
+scan_response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    shared=_build_shared_backend(),
+)
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional
+from sqlalchemy import func, select, delete, update, exists
+from sqlalchemy.orm import Session, undefer
+from .. import models
+from ..config import settings
+from ..db import SessionLocal, IS_SQLITE, engine
+from .db_writer import run_write
+from .response_cache import scan_response_cache
+
+FINAL_STATUSES = ("completed", "failed")
+
+# Lighthouse reports (data/lighthouse), ZAP HAR recordings (data/har) and spilled page
+# artifacts (data/artifacts) are written per scan and removed after use; crashes leave them behind
+_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../data"))
+SCAN_TMP_DIRS = [os.path.join(_DATA_DIR, d) for d in ("lighthouse", "har", "traces", "artifacts")]
+SCAN_TMP_MAX_AGE_SECONDS = 3600
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def delete_scans_batch(scan_ids: List[str]) -> int:
+    """
+    Deletes scans and their rows with bulk statements in one short write.
+    Avoids ORM cascades, which would load every File blob just to delete it.
+    """
+    if not scan_ids:
+        return 0
+
+    def _write(db: Session):
+        db.execute(delete(models.ModuleResult).where(models.ModuleResult.scan_id.in_(scan_ids)))
+        db.execute(delete(models.File).where(models.File.scan_id.in_(scan_ids)))
+        db.execute(delete(models.ScanTiming).where(models.ScanTiming.scan_id.in_(scan_ids)))
+        return db.execute(delete(models.Scan).where(models.Scan.id.in_(scan_ids))).rowcount
+
+    deleted = run_write(_write)
+    for scan_id in scan_ids:
+        scan_response_cache.invalidate(scan_id)
+    return deleted
+
+def _without_file_urls(value: Any) -> Any:
+    """value with every /files/... link dropped; purged scans have no files left to serve."""
+    if isinstance(value, dict):
+        return {k: _without_file_urls(v) for k, v in value.items()
+                if not (isinstance(v, str) and v.startswith("/files/"))}
+    if isinstance(value, list):
+        return [_without_file_urls(v) for v in value]
+    return value
+
+def purge_artifacts_batch(scan_ids: List[str]) -> int:
+    """
+    Drops files and per-module details, keeping the scan row and its aggregated report.
+    The report is flagged with artifacts_purged and loses its file links.
+    """
+    if not scan_ids:
+        return 0
+
+    def _write(db: Session):
+        db.execute(delete(models.File).where(models.File.scan_id.in_(scan_ids)))
+        db.execute(delete(models.ModuleResult).where(
+            models.ModuleResult.scan_id.in_(scan_ids),
+            models.ModuleResult.module_name != "aggregated_report",
+        ))
+        reports = (
+            db.query(models.ModuleResult)
+            .options(undefer(models.ModuleResult.result_json))
+            .filter(models.ModuleResult.scan_id.in_(scan_ids), models.ModuleResult.module_name == "aggregated_report")
+            .all()
+        )
+        for report in reports:
+            report.result_json = {**_without_file_urls(report.result_json or {}), "artifacts_purged": True}
+        return db.execute(
+            update(models.Scan).where(models.Scan.id.in_(scan_ids)).values(artifacts_purged_at=_utcnow())
+        ).rowcount
+
+    purged = run_write(_write)
+    for scan_id in scan_ids:
+        scan_response_cache.invalidate(scan_id)
+    return purged
+
+def find_excess_scans(db: Session, keep_per_url: int, limit: int) -> List[str]:
+    """
+    Finished, unpinned scans beyond the newest keep_per_url such scans for their URL.
+    Pinned and running scans are not counted, so each URL keeps keep_per_url finished
+    scans besides them; only URLs over the limit are ranked at all.
+    """
+    eligible = (models.Scan.pinned.is_(False), models.Scan.status.in_(FINAL_STATUSES))
+    crowded_urls = (
+        select(models.Scan.url)
+        .where(*eligible)
+        .group_by(models.Scan.url)
+        .having(func.count() > keep_per_url)
+    )
+    ranked = (
+        select(
+            models.Scan.id,
+            func.row_number().over(
+                partition_by=models.Scan.url,
+                order_by=(models.Scan.created_at.desc(), models.Scan.id.desc()),
+            ).label("rank"),
+        )
+        .where(*eligible, models.Scan.url.in_(crowded_urls))
+        .subquery()
+    )
+    rows = db.execute(
+        select(ranked.c.id)
+        .where(ranked.c.rank > keep_per_url)
+        .limit(limit)
+    ).scalars().all()
+    return list(rows)
+
+def find_expired_artifacts(db: Session, max_age_days: int, limit: int) -> List[str]:
+    cutoff = _utcnow() - timedelta(days=max_age_days)
+    rows = db.execute(
+        select(models.Scan.id)
+        .where(
+            models.Scan.created_at < cutoff,
+            models.Scan.artifacts_purged_at.is_(None),
+            models.Scan.pinned.is_(False),
+            models.Scan.status.in_(FINAL_STATUSES),
+        )
+        .order_by(models.Scan.created_at)
+        .limit(limit)
+    ).scalars().all()
+    return list(rows)
+
+def delete_orphans_batch(limit: int) -> int:
+    """Removes module results and files whose scan no longer exists."""
+    def _write(db: Session):
+        removed = 0
+        for model in (models.File, models.ModuleResult, models.ScanTiming):
+            orphan_ids = select(model.id).where(
+                ~exists().where(models.Scan.id == model.scan_id)
+            ).limit(limit)
+            removed += db.execute(delete(model).where(model.id.in_(orphan_ids))).rowcount
+        return removed
+
+    return run_write(_write)
+
+def remove_stale_scan_files() -> int:
+    removed = 0
+    now = time.time()
+    for directory in SCAN_TMP_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if now - os.path.getmtime(path) > SCAN_TMP_MAX_AGE_SECONDS:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+def incremental_vacuum(pages: int) -> int:
+    """Returns freed pages to the filesystem a slice at a time (SQLite only)."""
+    if not IS_SQLITE or pages <= 0:
+        return 0
+
+    conn = engine.raw_connection()
+    try:
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if free_before:
+            # sqlite3's execute() steps this pragma once (one page); executescript runs it to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return free_before - free_after
+    finally:
+        conn.close()
+
+class RetentionCollector:
+    """
+    Background task applying the retention rules.
+    Every batch is a separate short write through the shared DB writer, with a pause
+    between batches, so scans and readers are never blocked for long.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                stats = await self.run_once()
+                if any(stats.values()):
+                    print(f"Retention pass: {stats}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Retention pass failed: {e}")
+            await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
+
+    async def _pause(self):
+        await asyncio.sleep(settings.RETENTION_BATCH_PAUSE_MS / 1000)
+
+    async def _drain(self, find, apply) -> int:
+        total = 0
+        while True:
+            ids = await asyncio.to_thread(self._read, find)
+            if not ids:
+                return total
+            applied = await asyncio.to_thread(apply, ids)
+            total += applied
+            await self._pause()
+            if applied == 0 or len(ids) < settings.RETENTION_BATCH_SIZE:
+                return total
+
+    @staticmethod
+    def _read(find):
+        db = SessionLocal()
+        try:
+            return find(db)
+        finally:
+            db.close()
+
+    async def run_once(self) -> dict:
+        batch = settings.RETENTION_BATCH_SIZE
+        stats = {"scans_deleted": 0, "artifacts_purged": 0, "orphans_deleted": 0,
+                 "tmp_files_removed": 0, "pages_vacuumed": 0}
+
+        # The deleting rules only run once enabled; the cleanup below always does
+        if settings.RETENTION_ENABLED and settings.RETENTION_KEEP_PER_URL > 0:
+            stats["scans_deleted"] = await self._drain(
+                lambda db: find_excess_scans(db, settings.RETENTION_KEEP_PER_URL, batch),
+                delete_scans_batch,
+            )
+
+        if settings.RETENTION_ENABLED and settings.RETENTION_ARTIFACT_MAX_AGE_DAYS > 0:
+            stats["artifacts_purged"] = await self._drain(
+                lambda db: find_expired_artifacts(db, settings.RETENTION_ARTIFACT_MAX_AGE_DAYS, batch),
+                purge_artifacts_batch,
+            )
+
+        while True:
+            removed = await asyncio.to_thread(delete_orphans_batch, batch)
+            stats["orphans_deleted"] += removed
+            if removed == 0:
+                break
+            await self._pause()
+
+        stats["tmp_files_removed"] = await asyncio.to_thread(remove_stale_scan_files)
+
+        while True:
+            freed = await asyncio.to_thread(incremental_vacuum, settings.RETENTION_VACUUM_PAGES)
+            stats["pages_vacuumed"] += freed
+            if freed < settings.RETENTION_VACUUM_PAGES:
+                break
+            await self._pause()
+
+        return stats
+
+retention_collector = RetentionCollector()
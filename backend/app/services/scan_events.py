@@ -0,0 +1,119 @@
+"""
+In-process scan state notifications for GET /scan/{id}/status long-polling.
+
+Scans run in worker threads with their own event loops, while long-poll requests wait
+on the API's event loop, so waiters are (loop, future) pairs woken with
+call_soon_threadsafe. Every change bumps a process-wide version: a client passes the
+version it has seen as ?since= and is answered as soon as there is a newer one.
+
+Finished scans stay here for a while (RECENT_FINISHED); after that, and after a
+restart, the status endpoint falls back to the database.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Stages counted as scan progress: the render, the six analysis modules, the report and its save
+PROGRESS_STEPS = (
+    "render_page", "security_hygiene", "analytics_seo", "accessibility", "lighthouse",
+    "heatmaps", "zap_security", "aggregate_report", "save_results",
+)
+FINAL_STATUSES = ("completed", "failed")
+RECENT_FINISHED = 1000
+
+@dataclass
+class ScanProgress:
+    status: str
+    version: int
+    error_message: Optional[str] = None
+    done: Set[str] = field(default_factory=set)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "error_message": self.error_message,
+            "modules_done": len(PROGRESS_STEPS) if self.status == "completed" else len(self.done),
+            "modules_total": len(PROGRESS_STEPS),
+            "version": self.version,
+        }
+
+class ScanEvents:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._scans: Dict[str, ScanProgress] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+
+    def update(self, scan_id: str, status: Optional[str] = None, step: Optional[str] = None,
+               error_message: Optional[str] = None):
+        """Records a status change and/or a finished progress step, and wakes the scan's waiters."""
+        with self._lock:
+            progress = self._scans.get(scan_id)
+            if progress is None:
+                progress = self._scans[scan_id] = ScanProgress(status or "queued", 0)
+            if status is not None:
+                progress.status = status
+            if step in PROGRESS_STEPS:
+                progress.done.add(step)
+            if error_message is not None:
+                progress.error_message = error_message
+            self._bump(scan_id, progress)
+            if progress.status in FINAL_STATUSES:
+                self._retire(scan_id)
+
+    def touch(self, scan_ids):
+        """New version without a state change, e.g. queued scans whose place in the queue moved."""
+        with self._lock:
+            for scan_id in scan_ids:
+                progress = self._scans.get(scan_id)
+                if progress is not None:
+                    self._bump(scan_id, progress)
+
+    def _bump(self, scan_id: str, progress: ScanProgress):
+        self._version += 1
+        progress.version = self._version
+        for loop, future in self._waiters.pop(scan_id, []):
+            loop.call_soon_threadsafe(_wake, future)
+
+    def _retire(self, scan_id: str):
+        self._finished[scan_id] = None
+        self._finished.move_to_end(scan_id)
+        while len(self._finished) > RECENT_FINISHED:
+            old, _ = self._finished.popitem(last=False)
+            self._scans.pop(old, None)
+
+    def get(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            progress = self._scans.get(scan_id)
+            return progress.as_dict() if progress is not None else None
+
+    async def wait(self, scan_id: str, since: int, timeout: float):
+        """Returns once the scan has a version newer than since, is final, or timeout passes."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            progress = self._scans.get(scan_id)
+            if progress is not None and (progress.version > since or progress.status in FINAL_STATUSES):
+                return
+            waiter = (loop, future)
+            self._waiters.setdefault(scan_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(scan_id)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[scan_id]
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+scan_events = ScanEvents()
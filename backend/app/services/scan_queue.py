@@ -0,0 +1,434 @@
+"""
+Admission control, priority lanes and the bounded queue in front of the scan workers.
+
+A burst of submissions must not start as many scans (and browsers) as there are
+requests. POST /scan/ admits a scan into a bounded queue, or rejects it with 429 and a
+Retry-After estimate when:
+    - the queue already holds SCAN_QUEUE_MAX scans (SCAN_BULK_QUEUE_MAX for bulk), or
+    - the client already has SCAN_CLIENT_MAX_ACTIVE (SCAN_BULK_CLIENT_MAX_ACTIVE) scans
+      queued or running.
+A client is its SCAN_CLIENT_KEY_HEADER value when that is a known key (SCAN_CLIENT_API_KEYS
+or ADMIN_API_KEY), else its IP: a made-up key per request must not buy a fresh quota.
+
+Scans wait in one of three lanes (ScanCreate.priority): interactive (the UI), normal
+and bulk. Workers pick the next scan by:
+    1. overdue scans first, earliest first: past their own deadline (deadline_seconds)
+       or waiting longer than their lane's SCAN_LANE_MAX_WAIT_SECONDS, so no lane starves;
+    2. otherwise a weighted fair share between lanes (SCAN_LANE_WEIGHTS, stride
+       scheduling) and round robin between the clients inside a lane.
+SCAN_MAX_CONCURRENT workers run scans in total; SCAN_INTERACTIVE_WORKERS of them only
+take interactive scans, so someone waiting on screen starts within seconds even while
+every shared worker is busy with bulk scans.
+
+The interactive lane and deadlines can jump the fair order, so clients without a known
+key get at most SCAN_CLIENT_MAX_INTERACTIVE active interactive scans (further ones go
+to the normal lane), and their deadlines are never earlier than the lane's max wait.
+
+Each scan runs in its own event loop as before. A worker only starts the next scan
+while the box has headroom: available memory above SCAN_MIN_AVAILABLE_MEMORY_MB and the
+load average per CPU below SCAN_MAX_LOAD_PER_CPU. With nothing running a scan always
+starts, so the queue drains.
+"""
+import asyncio
+import bisect
+import concurrent.futures
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from ..auth import is_known_api_key
+from ..config import settings
+from . import metrics
+from .scan_events import scan_events
+
+LANES = ("interactive", "normal", "bulk")
+DEFAULT_LANE = "normal"
+
+HEADROOM_RECHECK_SECONDS = 1.0
+DURATION_SMOOTHING = 0.2  # weight of the newest scan in the duration estimate
+
+def parse_lane_setting(spec: str) -> Dict[str, float]:
+    """'interactive=8,normal=3,bulk=1' -> {'interactive': 8.0, ...}"""
+    values = {}
+    for part in spec.split(","):
+        if "=" in part:
+            lane, value = part.split("=", 1)
+            if lane.strip() in LANES:
+                values[lane.strip()] = float(value)
+    return values
+
+class ScanRejected(Exception):
+    """The scan was not admitted; retry_after is a wait estimate in seconds."""
+
+    def __init__(self, reason: str, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = retry_after
+
+@dataclass
+class ScanJob:
+    scan_id: str
+    url: str
+    client: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    lane: str = DEFAULT_LANE
+    queued_at: float = field(default_factory=time.monotonic)
+    deadline: Optional[float] = None  # time.monotonic() by which the scan should start
+    due: float = 0.0  # set when queued: the deadline or the lane's max wait, whichever is first
+    task: Optional[Callable[[], None]] = field(default=None, repr=False)  # runs instead of a scan (see submit_task)
+
+class LaneScheduler:
+    """Pending scans by lane, then by client; not thread-safe (ScanQueue holds the lock)."""
+
+    def __init__(self, weights: Dict[str, float], max_wait: Dict[str, float]):
+        self.weights = {lane: max(weights.get(lane, 1.0), 0.01) for lane in LANES}
+        self.max_wait = {lane: max_wait.get(lane, 3600.0) for lane in LANES}
+        # lane -> client -> jobs ordered by due; client order is the round robin
+        self._lanes: Dict[str, "OrderedDict[str, List[ScanJob]]"] = {lane: OrderedDict() for lane in LANES}
+        self._pass = {lane: 0.0 for lane in LANES}  # stride scheduling: lowest pass goes next
+        self._vtime = 0.0
+        self.counts: Counter = Counter()  # lane -> pending
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def push(self, job: ScanJob):
+        job.due = job.queued_at + self.max_wait[job.lane]
+        if job.deadline is not None:
+            job.due = min(job.due, job.deadline)
+        clients = self._lanes[job.lane]
+        if not clients:
+            # An idle lane rejoins at the current virtual time instead of cashing in its idle time
+            self._pass[job.lane] = max(self._pass[job.lane], self._vtime)
+        queue = clients.setdefault(job.client, [])
+        bisect.insort(queue, job, key=lambda j: j.due)
+        self.counts[job.lane] += 1
+
+    def scan_ids(self) -> List[str]:
+        return [job.scan_id for clients in self._lanes.values() for queue in clients.values() for job in queue]
+
+    def has(self, lanes: Sequence[str]) -> bool:
+        return any(self.counts[lane] for lane in lanes)
+
+    def _heads(self, lanes: Sequence[str]) -> Iterator[Tuple[str, str, ScanJob]]:
+        for lane in lanes:
+            for client, queue in self._lanes[lane].items():
+                yield lane, client, queue[0]
+
+    def pop(self, now: float, lanes: Sequence[str] = LANES) -> Optional[ScanJob]:
+        heads = list(self._heads(lanes))
+        if not heads:
+            return None
+        lane, client, job = min(heads, key=lambda head: head[2].due)
+        if job.due > now:
+            lane = min((l for l in lanes if self._lanes[l]), key=lambda l: (self._pass[l], LANES.index(l)))
+            client = next(iter(self._lanes[lane]))
+        return self._take(lane, client)
+
+    def _take(self, lane: str, client: str) -> ScanJob:
+        clients = self._lanes[lane]
+        queue = clients[client]
+        job = queue.pop(0)
+        if queue:
+            clients.move_to_end(client)
+        else:
+            del clients[client]
+        self.counts[lane] -= 1
+        self._vtime = self._pass[lane]
+        self._pass[lane] += 1 / self.weights[lane]
+        return job
+
+    def copy(self) -> "LaneScheduler":
+        clone = LaneScheduler(self.weights, self.max_wait)
+        clone._lanes = {lane: OrderedDict((c, list(q)) for c, q in clients.items())
+                        for lane, clients in self._lanes.items()}
+        clone._pass = dict(self._pass)
+        clone._vtime = self._vtime
+        clone.counts = Counter(self.counts)
+        return clone
+
+def client_key(headers, client_host: Optional[str]) -> str:
+    """Quota key of a request. API keys are hashed so they never sit in memory or logs."""
+    api_key = headers.get(settings.SCAN_CLIENT_KEY_HEADER)
+    if is_known_api_key(api_key):
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    return f"ip:{client_host or 'unknown'}"
+
+def available_memory_mb() -> Optional[float]:
+    """MemAvailable from /proc/meminfo; None where it can't be read (non-Linux)."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def load_per_cpu() -> Optional[float]:
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (OSError, AttributeError):  # Windows
+        return None
+
+def headroom() -> Optional[str]:
+    """None when another scan may start, else the reason it may not."""
+    memory = available_memory_mb()
+    if memory is not None and memory < settings.SCAN_MIN_AVAILABLE_MEMORY_MB:
+        return f"{memory:.0f} MB available"
+    load = load_per_cpu()
+    if load is not None and settings.SCAN_MAX_LOAD_PER_CPU > 0 and load > settings.SCAN_MAX_LOAD_PER_CPU:
+        return f"load {load:.2f} per CPU"
+    return None
+
+def run_scan_job(job: ScanJob):
+    from . import scan_service
+    asyncio.run(scan_service.run_full_scan(job.scan_id, job.url, job.options, job.queued_at))
+
+def _quota_class(lane: str) -> str:
+    """Bulk has its own queue bound and per-client quota; the other lanes share one."""
+    return "bulk" if lane == "bulk" else "default"
+
+class ScanQueue:
+    def __init__(
+        self,
+        workers: int = 3,
+        interactive_workers: int = 1,
+        client_max_interactive: int = 1,
+        max_queued: Optional[Dict[str, int]] = None,
+        client_max_active: Optional[Dict[str, int]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        max_wait: Optional[Dict[str, float]] = None,
+        run: Callable[[ScanJob], None] = run_scan_job,
+    ):
+        # Reserved interactive workers come out of the total, so it caps browsers too
+        workers = max(1, workers)
+        self.interactive_workers = max(0, min(interactive_workers, workers - 1))
+        self.workers = workers - self.interactive_workers  # shared: take any lane
+        self.client_max_interactive = client_max_interactive
+        self.max_queued = max_queued or {"default": 50, "bulk": 1000}
+        self.client_max_active = client_max_active or {"default": 5, "bulk": 500}
+        self._run = run
+        self._scheduler = LaneScheduler(weights or {}, max_wait or {})
+        self._running: Dict[str, ScanJob] = {}
+        self._reserved: Counter = Counter()  # quota class -> admitted, not yet submitted
+        self._per_client: Counter = Counter()  # (client, quota class) -> queued + running (+ reserved)
+        self._interactive: Counter = Counter()  # client -> interactive scans queued + running (+ reserved)
+        self._avg_duration = settings.SCAN_ESTIMATED_DURATION_SECONDS
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._held: Optional[str] = None  # why starts are held back, logged once per change
+
+    def start(self):
+        with self._cond:
+            self._stopping = False
+            self._threads = [t for t in self._threads if t.is_alive()]
+            if self._threads:
+                return
+            pools = [("scan-worker", LANES)] * self.workers + [("scan-worker-interactive", ("interactive",))] * self.interactive_workers
+            for i, (name, lanes) in enumerate(pools):
+                thread = threading.Thread(target=self._worker, args=(lanes,), name=f"{name}-{i}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def stop(self):
+        """Stops starting queued scans. Running scans finish in their (daemon) threads."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    # Admission
+
+    def _queued(self, quota: str) -> int:
+        lanes = [lane for lane in LANES if _quota_class(lane) == quota]
+        return sum(self._scheduler.counts[lane] for lane in lanes) + self._reserved[quota]
+
+    def admit(self, client: str, lane: str = DEFAULT_LANE, exempt: bool = False, trusted: bool = False) -> str:
+        """
+        Reserves a queue slot for client or raises ScanRejected; returns the lane the
+        scan goes to. Follow with submit(), or release() when the scan could not be
+        created. exempt skips the client quota; trusted (a known key) skips the
+        interactive limit.
+        """
+        with self._cond:
+            if (lane == "interactive" and not trusted and self.client_max_interactive > 0
+                    and self._interactive[client] >= self.client_max_interactive):
+                lane = DEFAULT_LANE
+            quota = _quota_class(lane)
+            limit = self.max_queued[quota]
+            if self._queued(quota) >= limit:
+                metrics.SCANS_REJECTED.inc(reason="queue_full")
+                raise ScanRejected("queue_full", f"Scan queue is full ({limit} waiting)",
+                                   self._retry_after(self._avg_duration / self.workers))
+            limit = self.client_max_active[quota]
+            if not exempt and limit > 0 and self._per_client[client, quota] >= limit:
+                metrics.SCANS_REJECTED.inc(reason="client_quota")
+                raise ScanRejected("client_quota", f"Too many active scans for this client (limit {limit})",
+                                   self._retry_after(self._avg_duration))
+            self._reserved[quota] += 1
+            self._per_client[client, quota] += 1
+            if lane == "interactive":
+                self._interactive[client] += 1
+            return lane
+
+    def release(self, client: str, lane: str = DEFAULT_LANE):
+        quota = _quota_class(lane)
+        with self._cond:
+            self._reserved[quota] -= 1
+            self._discount(client, quota, lane)
+
+    def submit(self, job: ScanJob):
+        """Queues an admitted scan."""
+        self.start()
+        with self._cond:
+            self._reserved[_quota_class(job.lane)] -= 1
+            self._scheduler.push(job)
+            self._update_lane_depths()
+            scan_events.update(job.scan_id, status="queued")
+            # Workers differ in the lanes they take, so wake them all
+            self._cond.notify_all()
+
+    def submit_task(self, job: ScanJob, work: Callable[[], Any]) -> concurrent.futures.Future:
+        """
+        Queues admitted work other than a scan that still opens a browser (a snapshot
+        replay), so it takes a worker slot like one. The future gets work()'s result.
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def task():
+            try:
+                future.set_result(work())
+            except BaseException as e:
+                future.set_exception(e)
+
+        job.task = task
+        self.submit(job)
+        return future
+
+    def _discount(self, client: str, quota: str, lane: str):
+        self._per_client[client, quota] -= 1
+        if self._per_client[client, quota] <= 0:
+            del self._per_client[client, quota]
+        if lane == "interactive":
+            self._interactive[client] -= 1
+            if self._interactive[client] <= 0:
+                del self._interactive[client]
+
+    def max_wait(self, lane: str) -> float:
+        """The lane's SCAN_LANE_MAX_WAIT_SECONDS."""
+        return self._scheduler.max_wait[lane]
+
+    def _update_lane_depths(self):
+        for lane in LANES:
+            metrics.SCAN_LANE_DEPTH.set(self._scheduler.counts[lane], lane=lane)
+
+    @staticmethod
+    def _retry_after(seconds: float) -> int:
+        return max(1, math.ceil(seconds))
+
+    # Status
+
+    @property
+    def depth(self) -> int:
+        return len(self._scheduler)
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def position(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        """
+        1-based place in the start order and an estimated wait, or None when the scan
+        isn't waiting here (running, finished, or queued before a restart). The order
+        is the scheduler's, replayed on a copy as of now; later arrivals can still
+        overtake a scan in a lower lane.
+        """
+        with self._cond:
+            scheduler = self._scheduler.copy()
+            busy = len(self._running) >= self.workers
+        now = time.monotonic()
+        index = 0
+        while True:
+            job = scheduler.pop(now)
+            if job is None:
+                return None
+            if job.scan_id == scan_id:
+                break
+            index += 1
+        workers = self.workers + (self.interactive_workers if job.lane == "interactive" else 0)
+        # Scans ahead start in waves of `workers`; the first wave waits for a free slot
+        waves = index // workers + (1 if busy and job.lane != "interactive" else 0)
+        return {"queue_position": index + 1, "lane": job.lane,
+                "estimated_start_seconds": round(waves * self._avg_duration)}
+
+    def is_running(self, scan_id: str) -> bool:
+        return scan_id in self._running
+
+    # Workers
+
+    def _take(self, lanes: Sequence[str]) -> Optional[ScanJob]:
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                if self._scheduler.has(lanes):
+                    blocked = headroom() if self._running else None
+                    if blocked is None:
+                        self._held = None
+                        job = self._scheduler.pop(time.monotonic(), lanes)
+                        self._update_lane_depths()
+                        self._running[job.scan_id] = job
+                        scan_events.update(job.scan_id, status="running")
+                        # Everyone behind moved up a place
+                        scan_events.touch(self._scheduler.scan_ids())
+                        return job
+                    metrics.SCANS_DEFERRED.inc()
+                    if blocked != self._held:
+                        print(f"Scan queue: {len(self._scheduler)} waiting, holding the next start ({blocked})")
+                    self._held = blocked
+                    self._cond.wait(HEADROOM_RECHECK_SECONDS)
+                else:
+                    self._cond.wait()
+
+    def _worker(self, lanes: Sequence[str]):
+        while True:
+            job = self._take(lanes)
+            if job is None:
+                return
+            started = time.monotonic()
+            metrics.SCAN_LANE_WAIT.observe(started - job.queued_at, lane=job.lane)
+            try:
+                if job.task is not None:
+                    job.task()
+                else:
+                    self._run(job)
+            except Exception as e:
+                print(f"Scan worker: scan {job.scan_id} crashed: {e}")
+            finally:
+                if job.task is not None:
+                    scan_events.update(job.scan_id, status="completed")  # no scan behind it to finish the entry
+                with self._cond:
+                    self._running.pop(job.scan_id, None)
+                    self._discount(job.client, _quota_class(job.lane), job.lane)
+                    duration = time.monotonic() - started
+                    self._avg_duration += DURATION_SMOOTHING * (duration - self._avg_duration)
+                    self._cond.notify_all()
+
+scan_queue = ScanQueue(
+    workers=settings.SCAN_MAX_CONCURRENT,
+    interactive_workers=settings.SCAN_INTERACTIVE_WORKERS,
+    client_max_interactive=settings.SCAN_CLIENT_MAX_INTERACTIVE,
+    max_queued={"default": settings.SCAN_QUEUE_MAX, "bulk": settings.SCAN_BULK_QUEUE_MAX},
+    client_max_active={"default": settings.SCAN_CLIENT_MAX_ACTIVE, "bulk": settings.SCAN_BULK_CLIENT_MAX_ACTIVE},
+    weights=parse_lane_setting(settings.SCAN_LANE_WEIGHTS),
+    max_wait=parse_lane_setting(settings.SCAN_LANE_MAX_WAIT_SECONDS),
+)
+
+metrics.gauge("sitesense_scan_queue_depth", "Admitted scans waiting for a scan worker.",
+              function=lambda: scan_queue.depth)
@@ -0,0 +1,44 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import orjson
+from .. import models
+
+def format_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """UTC ISO-8601 with a 'Z' suffix, same output as the schemas' model_serializer fix-ups."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat() + 'Z'
+
+def module_result_dict(mr: models.ModuleResult) -> Dict[str, Any]:
+    return {
+        "id": mr.id,
+        "module_name": mr.module_name,
+        "status": mr.status,
+        "result_json": mr.result_json,
+        "created_at": format_timestamp(mr.created_at),
+    }
+
+def scan_read_dict(scan: models.Scan) -> Dict[str, Any]:
+    """
+    Plain-dict equivalent of schemas.ScanRead.
+    Skips per-object pydantic validation, which dominates for large result_json blobs.
+    """
+    return {
+        "url": scan.url,
+        "id": scan.id,
+        "normalized_url": scan.normalized_url,
+        "status": scan.status,
+        "created_at": format_timestamp(scan.created_at),
+        "updated_at": format_timestamp(scan.updated_at),
+        "error_message": scan.error_message,
+        "module_results": [module_result_dict(mr) for mr in scan.module_results],
+    }
+
+def dump_json(obj: Any) -> bytes:
+    return orjson.dumps(obj)
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
@@ -1,58 +1,158 @@
 from sqlalchemy.orm import Session
-from .. import models, workflow
+from .. import models
 from ..db import SessionLocal
+from .db_writer import run_write_async
+from . import metrics
+from .timings import ScanTimings
+from .scan_events import scan_events
+from .profiling import ScanProfiler, current_profiler
+from .file_service import save_file
+from ..tools.zap_client import zap_client
 import json
 from dataclasses import asdict
+from urllib.parse import urlparse
+from typing import Any, Dict, Optional
 import asyncio
+import time
 
-async def run_full_scan(scan_id: str, url: str):
+def extract_domain(url: str):
+    """Lowercased hostname of a scan URL, stored on Scan.domain for filtering."""
+    try:
+        return (urlparse(url).hostname or "").lower() or None
+    except ValueError:
+        return None
+
+def _save_results_op(scan_id: str, results):
+    def _write(db: Session):
+        for res in results:
+            # Save module result
+            db.add(models.ModuleResult(
+                scan_id=scan_id,
+                module_name=res['module_name'],
+                status=res['status'],
+                result_json=res['result_json']
+            ))
+
+        # Update scan status
+        scan = db.query(models.Scan).filter(models.Scan.id == scan_id).first()
+        if scan:
+            scan.status = "completed"
+            # Denormalize the overall score so history listings never read the report JSON
+            report = next((r for r in results if r['module_name'] == "aggregated_report"), None)
+            if report and report.get('result_json'):
+                scan.overall_score = report['result_json'].get('overall_score')
+    return _write
+
+def _save_timings_op(scan_id: str, stages):
+    def _write(db: Session):
+        for stage in stages:
+            db.add(models.ScanTiming(scan_id=scan_id, **stage))
+    return _write
+
+def _mark_failed_op(scan_id: str, error_message: str):
+    def _write(db: Session):
+        scan = db.query(models.Scan).filter(models.Scan.id == scan_id).first()
+        if scan:
+            scan.status = "failed"
+            scan.error_message = error_message
+    return _write
+
+INTERRUPTED_MESSAGE = "Interrupted by a server restart; please run the scan again"
+
+def fail_interrupted_scans() -> int:
+    """
+    Marks scans the previous process left queued or running as failed. The scan queue
+    only lives in memory, so nothing would ever start or finish them, and retention
+    only collects finished scans. Runs at startup, before the queue takes new scans.
+    """
+    db = SessionLocal()
+    try:
+        count = (db.query(models.Scan)
+                 .filter(models.Scan.status.in_(("queued", "running")))
+                 .update({"status": "failed", "error_message": INTERRUPTED_MESSAGE}, synchronize_session=False))
+        db.commit()
+    finally:
+        db.close()
+    if count:
+        print(f"Marked {count} scan(s) interrupted by the restart as failed")
+    return count
+
+async def _save_profile(scan_id: str, url: str, profiler: ScanProfiler):
+    profiler.stop()
+    try:
+        data = await asyncio.to_thread(profiler.archive, f"scan {scan_id} {url}")
+        await asyncio.to_thread(save_file, scan_id, "profile", data, "application/zip")
+        print(f"Saved profile for scan {scan_id}: {sum(profiler.samples.values())} samples in {profiler.duration:.1f}s")
+    except Exception as e:
+        print(f"Could not save profile for scan {scan_id}: {e}")
+
+async def run_full_scan(scan_id: str, url: str, options: Optional[Dict[str, Any]] = None, queued_at: Optional[float] = None):
     """
     Executes the full scan pipeline.
+    options holds per-scan settings from ScanCreate (e.g. heatmap_quality).
+    queued_at is the time.monotonic() at which the scan was queued, for queue wait metrics.
     """
     print(f"Starting scan {scan_id} for {url}")
-    
-    # Create a new session for the background task
-    db = SessionLocal()
+    timings = ScanTimings(scan_id, queued_at)
+    if queued_at is not None:
+        metrics.SCANS_QUEUED.dec()
+        metrics.SCAN_QUEUE_WAIT.observe(timings.queue_wait_ms / 1000)
+    metrics.SCANS_STARTED.inc()
+    metrics.SCANS_IN_FLIGHT.inc()
+    status = "failed"
+    error_message = None
+    profiler = None
+    if (options or {}).get('profile'):
+        profiler = ScanProfiler().start()
+        current_profiler.set(profiler)
     
     try:
         # Initialize state
         initial_state = {
             "scan_id": scan_id,
             "url": url,
+            "options": options or {},
             "artifact": None,
-            "results": []
+            "results": [],
+            "timings": timings,
         }
         
+        # Imported on first use: langgraph and the analyzers (opencv, playwright, parsers)
+        # are the bulk of the app's import time and only scans need them
+        from .. import workflow
+
         print(f"Starting LangGraph workflow for {url}...")
         # Invoke graph
-        final_state = await workflow.app.ainvoke(initial_state)
+        if profiler is not None:
+            with profiler.track_thread():
+                final_state = await workflow.app.ainvoke(initial_state)
+        else:
+            final_state = await workflow.app.ainvoke(initial_state)
         
-        # Save results
+        # Save results in one grouped write through the shared DB writer
         print("Workflow completed. Saving results...")
-        for res in final_state['results']:
-            # Save module result
-            db.add(models.ModuleResult(
-                scan_id=scan_id,
-                module_name=res['module_name'],
-                status=res['status'],
-                result_json=res['result_json']
-            ))
-        
-        # Update scan status
-        scan = db.query(models.Scan).filter(models.Scan.id == scan_id).first()
-        if scan:
-            scan.status = "completed"
-            db.commit()
-            print(f"Scan {scan_id} completed")
+        with timings.stage("save_results"):
+            await run_write_async(_save_results_op(scan_id, final_state['results']))
+        status = "completed"
+        print(f"Scan {scan_id} completed")
             
     except Exception as e:
         print(f"Error running scan {scan_id}: {e}")
         import traceback
         traceback.print_exc()
-        scan = db.query(models.Scan).filter(models.Scan.id == scan_id).first()
-        if scan:
-            scan.status = "failed"
-            scan.error_message = str(e)
-            db.commit()
+        error_message = str(e)
+        await run_write_async(_mark_failed_op(scan_id, error_message))
     finally:
-        db.close()
+        if profiler is not None:
+            await _save_profile(scan_id, url, profiler)
+        metrics.SCANS_IN_FLIGHT.dec()
+        metrics.SCANS_FINISHED.inc(status=status)
+        metrics.SCAN_DURATION.observe(time.monotonic() - timings.started, status=status)
+        try:
+            await run_write_async(_save_timings_op(scan_id, timings.as_dicts()))
+        except Exception as e:
+            print(f"Could not save timings for scan {scan_id}: {e}")
+        # Wakes status long-polls once everything about the scan is written
+        scan_events.update(scan_id, status=status, error_message=error_message)
+        # The scan's event loop ends here; release its ZAP connections with it
+        await zap_client.aclose()
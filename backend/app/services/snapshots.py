@@ -0,0 +1,278 @@
+"""
+Render snapshots: what the offline analyzers read from a scan's page render, stored as
+the scan's "snapshot" file (a zip archive, like the profile):
+
+    snapshot.json   url, headers, cookies, viewport, network log and clickable elements
+    dom.html        the rendered DOM
+    page.har        with SCAN_SNAPSHOTS=har, the render's traffic with bodies, so the page
+                    can be rendered again through page.route_from_har
+
+The screenshot is the scan's "screenshot" file. reanalyze() runs OFFLINE_MODULES again
+on a snapshot and rebuilds the aggregated report, to see what a rule change does to
+stored scans without rescanning live sites. Snapshots are files, so retention purges
+them with the scan's other artifacts.
+"""
+import asyncio
+import io
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import orjson
+from sqlalchemy.orm import Session, undefer
+from .. import models
+from ..config import settings
+from .artifact_store import Blob, CappedList
+from .db_writer import run_write
+from .file_service import save_file, get_file_url
+from .response_cache import scan_response_cache
+
+SNAPSHOT_FILE = "snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MODES = ("off", "page", "har")
+# Modules that run from a snapshot alone; accessibility, Lighthouse and ZAP need the live site
+OFFLINE_MODULES = ("security_hygiene", "analytics_seo", "heatmaps")
+# Result fields that differ between two runs of the same code
+VOLATILE_KEYS = {"heatmaps": ("stage_timings_ms", "attention_compute_ms")}
+
+def snapshot_mode(options: Optional[Dict[str, Any]]) -> str:
+    """The scan's snapshot option, else SCAN_SNAPSHOTS."""
+    mode = (options or {}).get("snapshot") or settings.SCAN_SNAPSHOTS
+    return mode if mode in SNAPSHOT_MODES else "off"
+
+@dataclass
+class Snapshot:
+    scan_id: str
+    url: str
+    meta: Dict[str, Any]
+    dom_html: str
+    screenshot: bytes = b""
+    har: Optional[bytes] = None
+
+    def artifact(self):
+        """A PageArtifact equivalent to the one the scan's analyzers saw."""
+        # Imported on first use, like the workflow: the renderer pulls in playwright
+        from ..tools.page_renderer import PageArtifact
+        meta = self.meta
+        dropped = meta.get("dropped") or {}
+        network_logs = meta.get("network_logs") or []
+        clickable_elements = meta.get("clickable_elements") or []
+        return PageArtifact(
+            screenshot=Blob(self.screenshot),
+            viewport=meta.get("viewport") or {},
+            dom=Blob(self.dom_html.encode("utf-8")),
+            headers=meta.get("headers") or {},
+            cookies=meta.get("cookies") or [],
+            network_logs=CappedList(len(network_logs), network_logs, dropped.get("network_logs", 0)),
+            clickable_elements=CappedList(len(clickable_elements), clickable_elements,
+                                          dropped.get("clickable_elements", 0)),
+            screenshot_content_type=meta.get("screenshot_content_type", "image/png"),
+            screenshot_capture_ms=meta.get("screenshot_capture_ms", 0.0),
+        )
+
+@dataclass
+class Reanalysis:
+    scan_id: str
+    module_results: List[Dict[str, Any]]  # the modules run again, then the rebuilt aggregated_report
+    changed: List[str]  # those whose result differs from the stored one
+    files: Dict[str, Tuple[bytes, str]] = field(default_factory=dict)  # heatmap images, when kept
+
+# Capture
+
+def pack(url: str, artifact, har: Optional[bytes] = None) -> bytes:
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "url": url,
+        "captured_at": datetime.now(timezone.utc).isoformat(),
+        "viewport": artifact.viewport,
+        "headers": dict(artifact.headers or {}),
+        "cookies": artifact.cookies,
+        "network_logs": list(artifact.network_logs),
+        "clickable_elements": list(artifact.clickable_elements),
+        "dropped": artifact.dropped,
+        "screenshot_content_type": artifact.screenshot_content_type,
+        "screenshot_capture_ms": artifact.screenshot_capture_ms,
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("snapshot.json", orjson.dumps(meta))
+        zf.writestr("dom.html", artifact.dom.read())
+        if har is not None:
+            zf.writestr("page.har", har)
+    return buffer.getvalue()
+
+def unpack(scan_id: str, data: bytes, screenshot: bytes = b"") -> Snapshot:
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        names = set(zf.namelist())
+        meta = orjson.loads(zf.read("snapshot.json"))
+        dom_html = zf.read("dom.html").decode("utf-8")
+        har = zf.read("page.har") if "page.har" in names else None
+    return Snapshot(scan_id, meta.get("url", ""), meta, dom_html, screenshot, har)
+
+def save_snapshot(scan_id: str, url: str, artifact, mode: str):
+    """
+    Stores the render as the scan's snapshot. Runs right after the render, before the
+    analyzers free the artifact. A failure is logged and never fails the scan.
+    """
+    har_path = artifact.snapshot_har_path
+    try:
+        har = None
+        if mode == "har" and har_path and os.path.exists(har_path):
+            with open(har_path, "rb") as f:
+                har = f.read()
+        data = pack(url, artifact, har)
+        save_file(scan_id, SNAPSHOT_FILE, data, "application/zip")
+        print(f"Saved {mode} snapshot for scan {scan_id}: {len(data)} bytes")
+    except Exception as e:
+        print(f"Could not save snapshot for scan {scan_id}: {e}")
+    finally:
+        # ZAP's own HAR is removed by ZAP once it has imported it
+        if har_path and har_path != artifact.har_path:
+            try:
+                os.remove(har_path)
+            except OSError:
+                pass
+
+# Loading
+
+def load_snapshot(db: Session, scan_id: str) -> Optional[Snapshot]:
+    rows = (
+        db.query(models.File.file_type, models.File.data)
+        .filter(models.File.scan_id == scan_id, models.File.file_type.in_((SNAPSHOT_FILE, "screenshot")))
+        .all()
+    )
+    files = {row.file_type: row.data for row in rows}
+    if SNAPSHOT_FILE not in files:
+        return None
+    return unpack(scan_id, files[SNAPSHOT_FILE], files.get("screenshot") or b"")
+
+def stored_results(db: Session, scan_ids: Sequence[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """{scan_id: {module_name: result dict}} in the order the results were saved."""
+    rows = (
+        db.query(models.ModuleResult)
+        .options(undefer(models.ModuleResult.result_json))
+        .filter(models.ModuleResult.scan_id.in_(list(scan_ids)))
+        .order_by(models.ModuleResult.id)
+        .all()
+    )
+    stored: Dict[str, Dict[str, Dict[str, Any]]] = {scan_id: {} for scan_id in scan_ids}
+    for mr in rows:
+        stored[mr.scan_id][mr.module_name] = {
+            "module_name": mr.module_name, "status": mr.status, "result_json": mr.result_json,
+        }
+    return stored
+
+async def replay(snapshot: Snapshot):
+    """Renders the snapshot's page again with every request answered from its HAR."""
+    from ..tools import page_renderer
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "page.har")
+        await asyncio.to_thread(_write_file, path, snapshot.har)
+        return await page_renderer.render_page(snapshot.url, f"replay-{snapshot.scan_id}", replay_har=path)
+
+def _write_file(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+# Re-analysis
+
+def _failed(module_name: str, error: Exception) -> Dict[str, Any]:
+    print(f"Error in {module_name}: {error}")
+    return {"module_name": module_name, "status": "failed", "result_json": {"error": str(error), "status": "failed"}}
+
+def _run_module(module_name: str, artifact, scan_id: str, files: Optional[Dict[str, Tuple[bytes, str]]],
+                stored: Dict[str, Dict[str, Any]]):
+    from ..tools import analytics_seo, heatmaps, security_hygiene
+    try:
+        if module_name == "security_hygiene":
+            return {"module_name": module_name, "status": "completed",
+                    "result_json": asdict(security_hygiene.analyze_security_hygiene(artifact))}
+        if module_name == "analytics_seo":
+            return {"module_name": module_name, "status": "completed",
+                    "result_json": asdict(analytics_seo.analyze_analytics_seo(artifact))}
+        # The scan's own attention level, so an unchanged page compares equal
+        quality = ((stored.get("heatmaps") or {}).get("result_json") or {}).get("attention_quality")
+        result = heatmaps.generate_heatmaps(artifact.screenshot_bytes, artifact.clickable_elements, scan_id, quality)
+    except Exception as e:
+        return _failed(module_name, e)
+
+    # Same shape as the scan's heatmaps result
+    if files is not None:
+        for file_type, data in (("attention_heatmap", result.attention_heatmap_bytes),
+                                ("click_heatmap", result.click_heatmap_bytes)):
+            if data:
+                files[file_type] = (data, result.content_type)
+    hm_dict = asdict(result)
+    hm_dict['stage_timings_ms']['screenshot_capture'] = artifact.screenshot_capture_ms
+    hm_dict['attention_heatmap_url'] = get_file_url(scan_id, "attention_heatmap")
+    hm_dict['click_heatmap_url'] = get_file_url(scan_id, "click_heatmap")
+    del hm_dict['attention_heatmap_bytes']
+    del hm_dict['click_heatmap_bytes']
+    return {"module_name": module_name, "status": "completed", "result_json": hm_dict}
+
+def _comparable(module_name: str, result: Optional[Dict[str, Any]]) -> Optional[bytes]:
+    if result is None:
+        return None
+    data = dict(result.get("result_json") or {})
+    for key in VOLATILE_KEYS.get(module_name, ()):
+        data.pop(key, None)
+    return orjson.dumps({"status": result.get("status"), "result_json": data},
+                        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+def reanalyze(artifact, scan_id: str, modules: Sequence[str], stored: Dict[str, Dict[str, Any]],
+              keep_files: bool = False) -> Reanalysis:
+    """
+    Runs modules (from OFFLINE_MODULES) on artifact, then the report aggregation over
+    them and the scan's other stored results. Touches neither the network nor the
+    database; stored is the scan's results as returned by stored_results().
+    """
+    from ..tools import report_aggregator
+    files: Optional[Dict[str, Tuple[bytes, str]]] = {} if keep_files else None
+    new_results = [_run_module(name, artifact, scan_id, files, stored) for name in modules]
+
+    # Aggregated in the saved order, so an unchanged scan aggregates to the same report
+    merged = {name: result for name, result in stored.items() if name != "aggregated_report"}
+    merged.update((result["module_name"], result) for result in new_results)
+    try:
+        report = report_aggregator.aggregate_report(list(merged.values()))
+        new_results.append({"module_name": "aggregated_report", "status": "completed", "result_json": asdict(report)})
+    except Exception as e:
+        new_results.append(_failed("aggregated_report", e))
+
+    changed = [r["module_name"] for r in new_results
+               if _comparable(r["module_name"], r) != _comparable(r["module_name"], stored.get(r["module_name"]))]
+    return Reanalysis(scan_id, new_results, changed, files or {})
+
+def unpack_and_reanalyze(scan_id: str, data: bytes, screenshot: bytes, modules: Sequence[str],
+                         stored: Dict[str, Dict[str, Any]], keep_files: bool) -> Reanalysis:
+    """reanalyze() on a packed snapshot; the unit of work of bulk re-analysis processes."""
+    return reanalyze(unpack(scan_id, data, screenshot).artifact(), scan_id, modules, stored, keep_files)
+
+def _replace_results_op(scan_id: str, results: List[Dict[str, Any]]):
+    def _write(db: Session):
+        names = [res['module_name'] for res in results]
+        db.query(models.ModuleResult).filter(
+            models.ModuleResult.scan_id == scan_id, models.ModuleResult.module_name.in_(names)
+        ).delete(synchronize_session=False)
+        for res in results:
+            db.add(models.ModuleResult(
+                scan_id=scan_id,
+                module_name=res['module_name'],
+                status=res['status'],
+                result_json=res['result_json']
+            ))
+        report = next((r for r in results if r['module_name'] == "aggregated_report"), None)
+        if report and report['status'] == "completed":
+            db.query(models.Scan).filter(models.Scan.id == scan_id).update(
+                {"overall_score": report['result_json'].get('overall_score')}, synchronize_session=False
+            )
+    return _write
+
+def save_reanalysis(result: Reanalysis):
+    """Replaces the scan's stored results (and heatmap images) with the re-analysis."""
+    for file_type, (data, content_type) in result.files.items():
+        save_file(result.scan_id, file_type, data, content_type)
+    run_write(_replace_results_op(result.scan_id, result.module_results))
+    scan_response_cache.invalidate(result.scan_id)
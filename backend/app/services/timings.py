@@ -0,0 +1,130 @@
+"""
+Per-scan stage timing: wall time, CPU time, worker queue wait, bytes produced and peak
+RSS growth for every LangGraph node and analysis module. Each finished stage also
+feeds the /metrics histograms; the list is stored per scan in scan_timings.
+"""
+import asyncio
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from . import metrics
+from .profiling import track_current_thread
+from .scan_events import scan_events
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_kb() -> int:
+    """High-water mark of the process RSS in KiB (0 where unavailable)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS
+
+@dataclass
+class StageTiming:
+    stage: str
+    status: str = "running"
+    started_ms: float = 0.0  # offset from the scan start
+    wall_ms: float = 0.0
+    # Thread CPU time. Exact for stages run in a worker thread; for async stages it is
+    # the event loop thread's, so it includes work interleaved from concurrent stages.
+    cpu_ms: float = 0.0
+    queue_wait_ms: float = 0.0  # waiting for a worker thread, to_thread stages only
+    bytes_out: int = 0
+    # Growth of the process peak RSS while the stage ran; concurrent stages share it
+    rss_delta_kb: int = 0
+
+class ScanTimings:
+    def __init__(self, scan_id: str, queued_at: Optional[float] = None):
+        self.scan_id = scan_id
+        self.started = time.monotonic()
+        self.queue_wait_ms = (self.started - queued_at) * 1000 if queued_at is not None else 0.0
+        self.stages: List[StageTiming] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, queue_wait_ms: float = 0.0) -> Iterator[StageTiming]:
+        timing = StageTiming(name, started_ms=round((time.monotonic() - self.started) * 1000, 1),
+                             queue_wait_ms=round(queue_wait_ms, 1))
+        with self._lock:
+            self.stages.append(timing)
+        wall, cpu, rss = time.perf_counter(), time.thread_time(), peak_rss_kb()
+        try:
+            # Stages are where a profiled scan's worker threads get sampled
+            with track_current_thread():
+                yield timing
+        except BaseException:
+            timing.status = "failed"
+            raise
+        finally:
+            timing.wall_ms = round((time.perf_counter() - wall) * 1000, 1)
+            timing.cpu_ms = round((time.thread_time() - cpu) * 1000, 1)
+            timing.rss_delta_kb = max(0, peak_rss_kb() - rss)
+            if timing.status == "running":
+                timing.status = "completed"
+            self._observe(timing)
+            scan_events.update(self.scan_id, step=name)
+
+    async def run(self, name: str, awaitable) -> Any:
+        with self.stage(name):
+            return await awaitable
+
+    async def run_in_thread(self, name: str, fn: Callable, *args) -> Any:
+        """asyncio.to_thread with the stage measured inside the worker thread."""
+        submitted = time.perf_counter()
+
+        def call():
+            with self.stage(name, queue_wait_ms=(time.perf_counter() - submitted) * 1000):
+                return fn(*args)
+
+        return await asyncio.to_thread(call)
+
+    def _find(self, name: str) -> Optional[StageTiming]:
+        with self._lock:
+            return next((t for t in reversed(self.stages) if t.stage == name), None)
+
+    def add_bytes(self, name: str, count: int):
+        timing = self._find(name)
+        if timing is not None and count:
+            timing.bytes_out += count
+            metrics.STAGE_BYTES.inc(count, stage=name)
+
+    def set_status(self, name: str, status: str):
+        """For stages that report failure in their result instead of raising."""
+        timing = self._find(name)
+        if timing is not None and timing.status != status:
+            timing.status = status
+            if status == "failed":
+                metrics.STAGE_FAILURES.inc(stage=name)
+
+    def _observe(self, timing: StageTiming):
+        metrics.STAGE_DURATION.observe(timing.wall_ms / 1000, stage=timing.stage)
+        metrics.STAGE_CPU.observe(timing.cpu_ms / 1000, stage=timing.stage)
+        if timing.queue_wait_ms:
+            metrics.STAGE_QUEUE_WAIT.observe(timing.queue_wait_ms / 1000, stage=timing.stage)
+        if timing.status == "failed":
+            metrics.STAGE_FAILURES.inc(stage=timing.stage)
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [asdict(t) for t in self.stages]
+
+def timed_node(name: str):
+    """Wraps a LangGraph node so it runs as a stage of state['timings'] when present."""
+    def decorator(node):
+        @wraps(node)
+        async def wrapper(state):
+            timings = state.get("timings")
+            if timings is None:
+                return await node(state)
+            with timings.stage(name):
+                return await node(state)
+        return wrapper
+    return decorator
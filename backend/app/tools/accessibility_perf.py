@@ -1,6 +1,15 @@
+import functools
+import os
+import re
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 from playwright.async_api import async_playwright
+from ..config import settings
+from ..services.metrics import BROWSERS_IN_USE
+
+# npm installs axe-core with Lighthouse (package.json); the CDN is the fallback without it
+BUNDLED_AXE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../node_modules/axe-core/axe.min.js"))
+AXE_CDN_URL = "https://cdnjs.cloudflare.com/ajax/libs/axe-core/4.7.2/axe.min.js"
 
 @dataclass
 class AccessibilityIssue:
@@ -15,42 +24,63 @@ class AccessibilityResult:
     score: int
     issues: List[AccessibilityIssue]
 
+@functools.lru_cache(maxsize=1)
+def axe_source() -> Optional[str]:
+    """The local axe-core script, read once; None when it isn't installed."""
+    try:
+        with open(settings.AXE_CORE_PATH or BUNDLED_AXE_PATH, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def axe_version() -> Optional[str]:
+    source = axe_source()
+    match = re.search(r"axe v([\d.]+)", source[:200]) if source else None
+    return match.group(1) if match else None
+
 async def analyze_accessibility(url: str) -> AccessibilityResult:
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        await page.goto(url)
+        BROWSERS_IN_USE.inc(purpose="accessibility")
+        try:
+            page = await browser.new_page()
+            await page.goto(url)
         
-        # Inject axe-core
-        await page.add_script_tag(url="https://cdnjs.cloudflare.com/ajax/libs/axe-core/4.7.2/axe.min.js")
+            # Inject axe-core
+            source = axe_source()
+            if source is not None:
+                await page.add_script_tag(content=source)
+            else:
+                await page.add_script_tag(url=AXE_CDN_URL)
         
-        # Run axe
-        results = await page.evaluate("async () => await axe.run()")
+            # Run axe
+            results = await page.evaluate("async () => await axe.run()")
         
-        issues = []
-        for violation in results['violations']:
-            nodes = [node['target'][0] for node in violation['nodes']]
-            issues.append(AccessibilityIssue(
-                id=violation['id'],
-                impact=violation.get('impact', 'unknown'),
-                description=violation['description'],
-                help_url=violation['helpUrl'],
-                nodes=nodes
-            ))
+            issues = []
+            for violation in results['violations']:
+                nodes = [node['target'][0] for node in violation['nodes']]
+                issues.append(AccessibilityIssue(
+                    id=violation['id'],
+                    impact=violation.get('impact', 'unknown'),
+                    description=violation['description'],
+                    help_url=violation['helpUrl'],
+                    nodes=nodes
+                ))
             
-        # Calculate a simple score based on violations
-        # 100 - (critical * 5 + serious * 3 + moderate * 1)
-        score = 100
-        for issue in issues:
-            if issue.impact == 'critical':
-                score -= 5
-            elif issue.impact == 'serious':
-                score -= 3
-            elif issue.impact == 'moderate':
-                score -= 1
-                
-        await browser.close()
-        
+            # Calculate a simple score based on violations
+            # 100 - (critical * 5 + serious * 3 + moderate * 1)
+            score = 100
+            for issue in issues:
+                if issue.impact == 'critical':
+                    score -= 5
+                elif issue.impact == 'serious':
+                    score -= 3
+                elif issue.impact == 'moderate':
+                    score -= 1
+        finally:
+            await browser.close()
+            BROWSERS_IN_USE.dec(purpose="accessibility")
+
         return AccessibilityResult(
             score=max(0, score),
             issues=issues
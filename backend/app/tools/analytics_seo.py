@@ -1,7 +1,9 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Any
 from .page_renderer import PageArtifact
-from bs4 import BeautifulSoup
+
+# Fingerprint categories reported as analytics tools
+ANALYTICS_CATEGORIES = {"analytics", "tag_manager", "advertising"}
 
 @dataclass
 class AnalyticsSEOResult:
@@ -9,34 +11,33 @@ class AnalyticsSEOResult:
     analytics_tools: List[str]
     seo_issues: List[str]
     recommendations: List[str]
+    technologies: List[Dict[str, Any]] = field(default_factory=list)
 
 def analyze_analytics_seo(artifact: PageArtifact) -> AnalyticsSEOResult:
-    soup = BeautifulSoup(artifact.dom_html, 'html.parser')
+    doc = artifact.document
     score = 100
-    analytics_tools = []
     seo_issues = []
     recommendations = []
 
     # Title
-    title = soup.find('title')
-    if not title or not title.string:
+    title = doc.title
+    if not title:
         score -= 20
         seo_issues.append("Missing <title> tag")
         recommendations.append("Add a descriptive <title> tag.")
-    elif len(title.string) < 10:
+    elif len(title) < 10:
         score -= 5
         seo_issues.append("Title tag is too short")
         recommendations.append("Make the title tag more descriptive.")
 
     # Meta Description
-    meta_desc = soup.find('meta', attrs={'name': 'description'})
-    if not meta_desc or not meta_desc.get('content'):
+    if not doc.meta.get('description'):
         score -= 20
         seo_issues.append("Missing meta description")
         recommendations.append("Add a meta description to improve search visibility.")
 
     # H1
-    h1s = soup.find_all('h1')
+    h1s = doc.find_all('h1')
     if not h1s:
         score -= 10
         seo_issues.append("Missing <h1> tag")
@@ -46,19 +47,10 @@ def analyze_analytics_seo(artifact: PageArtifact) -> AnalyticsSEOResult:
         seo_issues.append("Multiple <h1> tags found")
         recommendations.append("Use only one <h1> tag per page.")
 
-    # Analytics detection (simple string matching in scripts)
-    scripts = soup.find_all('script')
-    for script in scripts:
-        if script.string:
-            content = script.string.lower()
-            if 'google-analytics.com' in content or 'gtag' in content:
-                analytics_tools.append("Google Analytics")
-            if 'googletagmanager.com' in content:
-                analytics_tools.append("Google Tag Manager")
-            if 'facebook.net' in content or 'fbq(' in content:
-                analytics_tools.append("Meta Pixel")
+    # Analytics detection (fingerprint engine over scripts, HTML, network log, headers and cookies)
+    technologies = artifact.technologies
+    analytics_tools = [t.name for t in technologies if t.category in ANALYTICS_CATEGORIES]
 
-    analytics_tools = list(set(analytics_tools))
     if not analytics_tools:
         recommendations.append("Consider adding analytics tools like Google Analytics.")
 
@@ -66,5 +58,6 @@ def analyze_analytics_seo(artifact: PageArtifact) -> AnalyticsSEOResult:
         score=max(0, score),
         analytics_tools=analytics_tools,
         seo_issues=seo_issues,
-        recommendations=recommendations
+        recommendations=recommendations,
+        technologies=[asdict(t) for t in technologies]
     )
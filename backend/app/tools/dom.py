@@ -0,0 +1,179 @@
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Parser backends in order of preference; each is optional and the first importable one wins.
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    lxml = None
+
+# Only these tags keep their text content; collecting it for every element would cost
+# more than the rest of the walk.
+TEXT_TAGS = frozenset({"title", "script", "style", "h1", "h2", "h3", "h4", "h5", "h6"})
+
+@dataclass
+class DomElement:
+    tag: str
+    attrs: Dict[str, str]
+    text: Optional[str] = None  # only for TEXT_TAGS
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.attrs.get(name, default)
+
+@dataclass
+class ScriptInfo:
+    src: Optional[str]
+    inline: Optional[str]
+    attrs: Dict[str, str] = field(default_factory=dict)
+
+Walk = List[DomElement]
+
+def _walk_selectolax(html: str) -> Walk:
+    elements = []
+    for node in LexborHTMLParser(html).root.traverse(include_text=False):
+        tag = node.tag
+        if not tag or tag[0] in "-!#":  # comments, doctype
+            continue
+        attrs = {k.lower(): v if v is not None else "" for k, v in node.attributes.items()}
+        text = node.text(deep=True) if tag in TEXT_TAGS else None
+        elements.append(DomElement(tag, attrs, text))
+    return elements
+
+def _walk_lxml(html: str) -> Walk:
+    elements = []
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (lxml.etree.ParserError, ValueError):
+        return elements
+    for el in root.iter():
+        if not isinstance(el.tag, str):  # comments, processing instructions
+            continue
+        tag = el.tag.lower()
+        attrs = {k.lower(): v for k, v in el.attrib.items()}
+        text = el.text_content() if tag in TEXT_TAGS else None
+        elements.append(DomElement(tag, attrs, text))
+    return elements
+
+def _walk_html_parser(html: str) -> Walk:
+    from bs4 import BeautifulSoup  # slow pure-Python fallback
+    elements = []
+    for el in BeautifulSoup(html, "html.parser").find_all(True):
+        attrs = {k.lower(): " ".join(v) if isinstance(v, list) else v for k, v in el.attrs.items()}
+        text = el.get_text() if el.name in TEXT_TAGS else None
+        elements.append(DomElement(el.name, attrs, text))
+    return elements
+
+def available_backends() -> List[Tuple[str, Callable[[str], Walk]]]:
+    backends = []
+    if LexborHTMLParser is not None:
+        backends.append(("selectolax", _walk_selectolax))
+    if lxml is not None:
+        backends.append(("lxml", _walk_lxml))
+    backends.append(("html.parser", _walk_html_parser))
+    return backends
+
+class ParsedDocument:
+    """
+    One parse of a page's DOM, shared by every analyzer.
+    The parse is a single walk that flattens elements into DomElement records; the
+    indexes below are built from it on first access. Safe to share across threads.
+    """
+
+    def __init__(self, html: str, backend: Optional[str] = None):
+        self.html = html or ""
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._elements: Optional[Walk] = None
+        self.backend_used: Optional[str] = None
+
+    @property
+    def elements(self) -> Walk:
+        if self._elements is None:
+            with self._lock:
+                if self._elements is None:
+                    self._elements = self._parse()
+        return self._elements
+
+    def _parse(self) -> Walk:
+        backends = available_backends()
+        if self._backend:
+            backends = [b for b in backends if b[0] == self._backend] or backends
+        for name, walk in backends:
+            try:
+                elements = walk(self.html)
+                self.backend_used = name
+                return elements
+            except Exception as e:
+                print(f"DOM parse with {name} failed: {e}")
+        self.backend_used = None
+        return []
+
+    # cached_property writes to the instance dict without a lock; at worst two threads
+    # build the same index once each, which is harmless.
+    @cached_property
+    def tags(self) -> Dict[str, List[DomElement]]:
+        index: Dict[str, List[DomElement]] = {}
+        for el in self.elements:
+            index.setdefault(el.tag, []).append(el)
+        return index
+
+    def find_all(self, tag: str) -> List[DomElement]:
+        return self.tags.get(tag, [])
+
+    def find(self, tag: str) -> Optional[DomElement]:
+        found = self.tags.get(tag)
+        return found[0] if found else None
+
+    @cached_property
+    def title(self) -> Optional[str]:
+        el = self.find("title")
+        return el.text if el is not None else None
+
+    @cached_property
+    def meta(self) -> Dict[str, str]:
+        """Meta content by lowercased name, property or http-equiv; the first occurrence wins."""
+        index: Dict[str, str] = {}
+        for el in self.find_all("meta"):
+            for key_attr in ("name", "property", "http-equiv"):
+                key = el.get(key_attr)
+                if key:
+                    index.setdefault(key.strip().lower(), el.get("content", ""))
+        return index
+
+    @cached_property
+    def scripts(self) -> List[ScriptInfo]:
+        return [
+            ScriptInfo(src=el.get("src") or None, inline=el.text if not el.get("src") else None, attrs=el.attrs)
+            for el in self.find_all("script")
+        ]
+
+    @cached_property
+    def script_srcs(self) -> List[str]:
+        return [s.src for s in self.scripts if s.src]
+
+    @cached_property
+    def inline_scripts(self) -> List[str]:
+        return [s.inline for s in self.scripts if s.inline]
+
+    @cached_property
+    def links(self) -> List[str]:
+        """href of every <a>."""
+        return [el.attrs["href"] for el in self.find_all("a") if el.attrs.get("href")]
+
+    @cached_property
+    def link_tags(self) -> List[DomElement]:
+        """<link> elements (stylesheets, canonical, preload, icons)."""
+        return self.find_all("link")
+
+    @cached_property
+    def html_lower(self) -> str:
+        """Lowercased raw HTML for substring checks that need the full source."""
+        return self.html.lower()
@@ -0,0 +1,282 @@
+"""
+Technology fingerprinting from signature files.
+
+Signatures live in fingerprints.json (plus any files listed in FINGERPRINT_SIGNATURES_PATH).
+Each technology has a name, a category and any of:
+    script_src  regexes matched against <script src> URLs and script requests
+    inline      regexes matched against inline script bodies
+    html        regexes matched against the raw HTML
+    urls        regexes matched against request URLs from the network log
+    headers     {header name: value regex}, "" only requires the header
+    cookies     {cookie name prefix: value regex}, "" only requires the cookie
+    meta        {meta name/property: content regex}
+    implies     names of technologies implied by this one
+A named group (?P<version>...) in any regex extracts the version. Matching is
+case-insensitive.
+
+Every regex is prefiltered by the longest literal it requires. All literals are compiled
+into one Aho-Corasick automaton (pyahocorasick; plain substring search without it) that
+scans the script srcs, inline scripts, HTML and network log in a single pass, and only
+the regexes whose literal occurred are run.
+"""
+import bisect
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import settings
+
+try:
+    import ahocorasick
+except ImportError:  # optional: falls back to one substring search per literal
+    ahocorasick = None
+
+SIGNATURES_PATH = os.path.join(os.path.dirname(__file__), "fingerprints.json")
+
+TEXT_SOURCES = ("script_src", "inline", "html", "urls")
+# Literals shorter than this match almost everywhere; such regexes simply always run
+MIN_ANCHOR_LENGTH = 3
+# Joins the scanned texts; never part of a literal, so no hit spans two sources
+_SEPARATOR = "\x00"
+
+@dataclass
+class Technology:
+    name: str
+    category: str
+    version: Optional[str] = None
+    matched_on: List[str] = field(default_factory=list)
+
+@dataclass
+class _Pattern:
+    tech: int
+    source: str
+    regex: "re.Pattern"
+    anchor: Optional[str]
+
+def literal_anchor(pattern: str) -> Optional[str]:
+    """
+    Longest literal substring every match of pattern must contain, lowercased.
+    Conservative: alternation at the top level, classes, groups and optional atoms all
+    end a literal run, so the result never rejects a text the regex would match.
+    """
+    runs: List[str] = []
+    current: List[str] = []
+    depth = 0
+    i = 0
+    n = len(pattern)
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    while i < n:
+        c = pattern[i]
+        literal = None
+        if c == "\\" and i + 1 < n:
+            nxt = pattern[i + 1]
+            literal = None if nxt.isalnum() else nxt  # \d, \b, \s are classes; \. \/ \( are literals
+            i += 2
+        elif c == "[":
+            i += 1
+            while i < n and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        elif c == "(":
+            depth += 1
+            i += 1
+        elif c == ")":
+            depth -= 1
+            i += 1
+        elif c == "|":
+            if depth == 0:
+                return None
+            i += 1
+        elif c in "*?{":
+            # The previous atom is optional (or repeated a variable number of times)
+            if current:
+                current.pop()
+            if c == "{":
+                while i < n and pattern[i] != "}":
+                    i += 1
+            i += 1
+        elif c in ".^$+":
+            i += 1
+        else:
+            literal = c
+            i += 1
+
+        if literal is not None and depth == 0:
+            current.append(literal)
+        else:
+            flush()
+    flush()
+
+    best = max(runs, key=len, default="")
+    return best.lower() if len(best) >= MIN_ANCHOR_LENGTH else None
+
+def _compile(pattern: str, where: str) -> Optional["re.Pattern"]:
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        print(f"Skipping invalid fingerprint pattern in {where}: {pattern!r} ({e})")
+        return None
+
+def _version(match: Optional["re.Match"]) -> Optional[str]:
+    if match is None or "version" not in match.re.groupindex:
+        return None
+    return match.group("version") or None
+
+class FingerprintEngine:
+    def __init__(self, technologies: List[Dict[str, Any]]):
+        self.technologies = technologies
+        self._patterns: List[_Pattern] = []
+        self._always: List[int] = []  # patterns without a usable literal
+        self._anchors: Dict[str, List[int]] = {}
+        # (tech, key, regex or None) for dictionary sources
+        self._headers: List[Tuple[int, str, Optional["re.Pattern"]]] = []
+        self._cookies: List[Tuple[int, str, Optional["re.Pattern"]]] = []
+        self._meta: List[Tuple[int, str, Optional["re.Pattern"]]] = []
+
+        for index, tech in enumerate(technologies):
+            for source in TEXT_SOURCES:
+                for raw in tech.get(source, []):
+                    regex = _compile(raw, f"{tech['name']}.{source}")
+                    if regex is None:
+                        continue
+                    pattern_id = len(self._patterns)
+                    anchor = literal_anchor(raw)
+                    self._patterns.append(_Pattern(index, source, regex, anchor))
+                    if anchor is None:
+                        self._always.append(pattern_id)
+                    else:
+                        self._anchors.setdefault(anchor, []).append(pattern_id)
+
+            for source, target in (("headers", self._headers), ("cookies", self._cookies), ("meta", self._meta)):
+                for key, raw in tech.get(source, {}).items():
+                    regex = _compile(raw, f"{tech['name']}.{source}.{key}") if raw else None
+                    if raw and regex is None:
+                        continue
+                    target.append((index, key.lower(), regex))
+
+        self._automaton = None
+        if ahocorasick is not None and self._anchors:
+            self._automaton = ahocorasick.Automaton()
+            for anchor, pattern_ids in self._anchors.items():
+                self._automaton.add_word(anchor, pattern_ids)
+            self._automaton.make_automaton()
+
+    @classmethod
+    def from_files(cls, paths: List[str]) -> "FingerprintEngine":
+        """Later files override earlier technologies with the same name."""
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not load fingerprint signatures from {path}: {e}")
+                continue
+            for tech in data.get("technologies", []):
+                by_name[tech["name"]] = tech
+        return cls(list(by_name.values()))
+
+    def _candidates(self, texts: Dict[str, str]) -> List[int]:
+        """Ids of patterns whose literal occurs in their own source."""
+        candidates = set(self._always)
+        if self._automaton is not None:
+            # One pass over all sources joined; offsets map each hit back to its source
+            starts, parts, offset = [], [], 0
+            for source in TEXT_SOURCES:
+                starts.append(offset)
+                parts.append(texts[source])
+                offset += len(texts[source]) + len(_SEPARATOR)
+            for end, pattern_ids in self._automaton.iter(_SEPARATOR.join(parts)):
+                source = TEXT_SOURCES[bisect.bisect_right(starts, end) - 1]
+                candidates.update(p for p in pattern_ids if self._patterns[p].source == source)
+        else:
+            for anchor, pattern_ids in self._anchors.items():
+                for p in pattern_ids:
+                    if anchor in texts[self._patterns[p].source]:
+                        candidates.add(p)
+        return sorted(candidates)
+
+    def detect(self, artifact) -> List[Technology]:
+        """Technologies found on a PageArtifact, in signature order."""
+        doc = artifact.document
+        network_logs = artifact.network_logs or []
+        # Scripts injected at runtime (tag managers, lazy chunks) only show up in the network log
+        script_srcs = doc.script_srcs + [log.get("url", "") for log in network_logs if log.get("resource_type") == "script"]
+        texts = {
+            "script_src": "\n".join(script_srcs).lower(),
+            "inline": "\n".join(doc.inline_scripts).lower(),
+            "html": doc.html_lower,
+            "urls": "\n".join(log.get("url", "") for log in network_logs).lower(),
+        }
+        found: Dict[int, Technology] = {}
+
+        def hit(index: int, where: str, version: Optional[str]):
+            tech = found.get(index)
+            if tech is None:
+                spec = self.technologies[index]
+                tech = found[index] = Technology(spec["name"], spec.get("category", "other"))
+            if where not in tech.matched_on:
+                tech.matched_on.append(where)
+            if version and not tech.version:
+                tech.version = version
+
+        for pattern_id in self._candidates(texts):
+            pattern = self._patterns[pattern_id]
+            if pattern.tech in found and found[pattern.tech].version and pattern.source in found[pattern.tech].matched_on:
+                continue
+            match = pattern.regex.search(texts[pattern.source])
+            if match:
+                hit(pattern.tech, pattern.source, _version(match))
+
+        headers = {k.lower(): str(v) for k, v in (artifact.headers or {}).items()}
+        for index, key, regex in self._headers:
+            if key in headers:
+                match = regex.search(headers[key]) if regex else None
+                if regex is None or match:
+                    hit(index, "headers", _version(match))
+
+        cookies = [(c.get("name", ""), str(c.get("value", ""))) for c in artifact.cookies or []]
+        for index, key, regex in self._cookies:
+            for name, value in cookies:
+                if name.lower().startswith(key) and (regex is None or regex.search(value)):
+                    hit(index, "cookies", None)
+                    break
+
+        meta = doc.meta
+        for index, key, regex in self._meta:
+            if key in meta:
+                match = regex.search(meta[key]) if regex else None
+                if regex is None or match:
+                    hit(index, "meta", _version(match))
+
+        # Implied technologies, transitively (Next.js -> React)
+        names = {spec["name"]: i for i, spec in enumerate(self.technologies)}
+        pending = list(found)
+        while pending:
+            for implied in self.technologies[pending.pop()].get("implies", []):
+                index = names.get(implied)
+                if index is not None and index not in found:
+                    hit(index, "implied", None)
+                    pending.append(index)
+
+        return [found[i] for i in sorted(found)]
+
+_engine: Optional[FingerprintEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> FingerprintEngine:
+    """Engine built from the bundled signatures plus FINGERPRINT_SIGNATURES_PATH, compiled once."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                extra = [p for p in settings.FINGERPRINT_SIGNATURES_PATH.split(os.pathsep) if p]
+                _engine = FingerprintEngine.from_files([SIGNATURES_PATH] + extra)
+    return _engine
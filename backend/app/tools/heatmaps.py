@@ -1,7 +1,11 @@
+import time
 import cv2
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Tuple, Optional
+from ..config import settings
+from . import saliency
+from .image_codec import ImageEncoding, decode_image, encode_image, encoding_from_settings
 
 @dataclass
 class ElementClickScore:
@@ -15,16 +19,12 @@ class HeatmapResult:
     attention_heatmap_bytes: bytes
     click_heatmap_bytes: bytes
     elements: List[ElementClickScore]
-
-def decode_image(image_bytes: bytes) -> np.ndarray:
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-def encode_image(image: np.ndarray) -> bytes:
-    success, encoded_image = cv2.imencode('.jpg', image)
-    if not success:
-        raise ValueError("Could not encode image")
-    return encoded_image.tobytes()
+    attention_quality: str = saliency.DEFAULT_QUALITY
+    attention_compute_ms: float = 0.0
+    content_type: str = "image/jpeg"
+    # Per-stage wall times and input/output sizes of the image pipeline
+    stage_timings_ms: Dict[str, float] = field(default_factory=dict)
+    byte_sizes: Dict[str, int] = field(default_factory=dict)
 
 def compute_attention_map(img: np.ndarray) -> np.ndarray:
     """
@@ -48,12 +48,24 @@ def compute_attention_map(img: np.ndarray) -> np.ndarray:
         h, w = img.shape[:2]
         return np.zeros((h, w), dtype="float32")
 
-def rasterize_click_map(
+def score_element(el: Dict[str, Any]) -> float:
+    # Simple heuristic: buttons and inputs are "hotter"
+    tag = el.get('tag', '').lower()
+    score = 0.5
+    if tag in ['button', 'input', 'select', 'textarea']:
+        score = 0.8
+    if el.get('href'):
+        score = 0.6
+    return score
+
+def rasterize_click_map_exact(
     img_shape: Tuple[int, int], 
     elements: List[Dict[str, Any]]
 ) -> Tuple[np.ndarray, List[ElementClickScore]]:
     """
     Creates a heatmap based on clickable elements.
+    Reference implementation: draws every element at full resolution. Kept for
+    benchmarks/bench_heatmaps.py; the pipeline uses rasterize_click_map.
     """
     try:
         h, w = img_shape
@@ -66,13 +78,8 @@ def rasterize_click_map(
             if not rect:
                 continue
                 
-            # Simple heuristic: buttons and inputs are "hotter"
             tag = el.get('tag', '').lower()
-            score = 0.5
-            if tag in ['button', 'input', 'select', 'textarea']:
-                score = 0.8
-            if el.get('href'):
-                score = 0.6
+            score = score_element(el)
                 
             # Add to map
             x = int(rect['x'])
@@ -111,6 +118,126 @@ def rasterize_click_map(
         print(f"Error rasterizing click map: {e}")
         return np.zeros(img_shape, dtype="float32"), []
 
+# Full-resolution blur of the exact rasterizer: 101x101 kernel, OpenCV's default sigma for it
+CLICK_BLUR_KSIZE = 101
+CLICK_BLUR_SIGMA = 0.3 * ((CLICK_BLUR_KSIZE - 1) * 0.5 - 1) + 0.8
+
+def _scaled_blur(grid: np.ndarray, scale: float, ksize: int, sigma: float) -> np.ndarray:
+    """Gaussian blur equivalent to (ksize, sigma) at full size, applied on a grid downsampled by scale."""
+    small_sigma = sigma * scale
+    small_ksize = max(3, int(round(ksize * scale)) | 1)
+    # GaussianBlur is separable, so this is two 1D passes over the small grid
+    return cv2.GaussianBlur(grid, (small_ksize, small_ksize), small_sigma)
+
+def _edge_segments(start: np.ndarray, end: np.ndarray, size: int):
+    """
+    Splits continuous [start, end) grid spans into (first cell, interior, last cell)
+    segments: three (begin, end_exclusive, weight) arrays for the difference-array updates.
+    """
+    first = np.clip(np.floor(start).astype(np.int64), 0, size - 1)
+    last = np.clip(np.ceil(end).astype(np.int64) - 1, 0, size - 1)
+    last = np.maximum(last, first)
+    single = first == last
+
+    first_w = np.where(single, end - start, first + 1 - start)
+    last_w = np.where(single, 0.0, end - last)
+    interior_end = np.maximum(last, first + 1)
+    return [
+        (first, first + 1, first_w),
+        (first + 1, interior_end, np.where(single, 0.0, 1.0)),
+        (last, last + 1, last_w),
+    ]
+
+def rasterize_click_grid(
+    img_shape: Tuple[int, int],
+    elements: List[Dict[str, Any]],
+    scale: float
+) -> Tuple[np.ndarray, List[ElementClickScore]]:
+    """
+    Click map on a grid downsampled by scale, blurred and normalized to 0-1.
+
+    Rectangles are accumulated with a 2D difference array (corner updates via np.add.at,
+    then a cumulative sum, i.e. a summed-area table), once per distinct score. Cells on a
+    rectangle's edge get its fractional coverage, so downsampling does not fatten small
+    elements. Where rectangles overlap the highest score wins, so the result does not
+    depend on draw order.
+    """
+    h, w = img_shape
+    gh, gw = max(1, int(np.ceil(h * scale))), max(1, int(np.ceil(w * scale)))
+
+    rect_elements = [el for el in elements if el.get('rect')]
+    scored_elements = []
+    if not rect_elements:
+        return np.zeros((gh, gw), dtype="float32"), scored_elements
+
+    scores = np.empty(len(rect_elements), dtype="float32")
+    boxes = np.empty((len(rect_elements), 4), dtype="float64")
+    for i, el in enumerate(rect_elements):
+        rect = el['rect']
+        score = score_element(el)
+        scores[i] = score
+        boxes[i] = (rect['x'], rect['y'], rect['width'], rect['height'])
+        scored_elements.append(ElementClickScore(
+            tag=el.get('tag', '').lower(),
+            text=el.get('text', '')[:50],
+            score=score,
+            rect=rect
+        ))
+
+    # Same clamping as the exact rasterizer (int() truncation, inclusive far edge)
+    xy = np.trunc(boxes).astype(np.int64)
+    x1 = np.clip(xy[:, 0], 0, w - 1)
+    y1 = np.clip(xy[:, 1], 0, h - 1)
+    x2 = np.clip(x1 + xy[:, 2], 0, w - 1) + 1
+    y2 = np.clip(y1 + xy[:, 3], 0, h - 1) + 1
+
+    intensities = np.clip((scores * 255).astype(np.int64), 0, 255).astype("float32")
+    xs = _edge_segments(x1 * scale, x2 * scale, gw)
+    ys = _edge_segments(y1 * scale, y2 * scale, gh)
+
+    grid = np.zeros((gh, gw), dtype="float32")
+    for level in np.unique(intensities):
+        sel = intensities == level
+        diff = np.zeros((gh + 1, gw + 1), dtype="float64")
+        # Each rectangle's coverage is the outer product of its row and column segments
+        # (partial first cell, full interior, partial last cell): 9 weighted sub-rectangles.
+        for ys0, ys1, yw in ys:
+            for xs0, xs1, xw in xs:
+                weight = (yw * xw)[sel]
+                r0, r1, c0, c1 = ys0[sel], ys1[sel], xs0[sel], xs1[sel]
+                np.add.at(diff, (r0, c0), weight)
+                np.add.at(diff, (r0, c1), -weight)
+                np.add.at(diff, (r1, c0), -weight)
+                np.add.at(diff, (r1, c1), weight)
+        coverage = diff.cumsum(axis=0).cumsum(axis=1)[:gh, :gw]
+        np.maximum(grid, (np.clip(coverage, 0, 1) * level).astype("float32"), out=grid)
+
+    grid = _scaled_blur(grid, scale, CLICK_BLUR_KSIZE, CLICK_BLUR_SIGMA)
+
+    peak = grid.max()
+    if peak > 0:
+        grid /= peak
+    return grid, scored_elements
+
+def rasterize_click_map(
+    img_shape: Tuple[int, int], 
+    elements: List[Dict[str, Any]],
+    scale: Optional[float] = None
+) -> Tuple[np.ndarray, List[ElementClickScore]]:
+    """
+    Creates a heatmap based on clickable elements.
+    Rasterizes and blurs on a downsampled grid, then upsamples to the image size.
+    """
+    scale = scale if scale is not None else settings.HEATMAP_CLICK_SCALE
+    try:
+        h, w = img_shape
+        grid, scored_elements = rasterize_click_grid(img_shape, elements, scale)
+        click_map = cv2.resize(grid, (w, h), interpolation=cv2.INTER_LINEAR)
+        return click_map, scored_elements
+    except Exception as e:
+        print(f"Error rasterizing click map: {e}")
+        return np.zeros(img_shape, dtype="float32"), []
+
 def overlay_heatmap(original: np.ndarray, heatmap: np.ndarray) -> np.ndarray:
     try:
         # Normalize heatmap to 0-255
@@ -123,34 +250,147 @@ def overlay_heatmap(original: np.ndarray, heatmap: np.ndarray) -> np.ndarray:
         print(f"Error overlaying heatmap: {e}")
         return original
 
-def generate_heatmaps(screenshot_bytes: bytes, clickable_elements: List[Dict[str, Any]], scan_id: str) -> HeatmapResult:
+def overlay_grid(original: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    Like overlay_heatmap, for a heatmap computed on a downsampled grid.
+    Quantizes on the grid and upsamples 8-bit values, so no full-size float map is built.
+    """
+    try:
+        h, w = original.shape[:2]
+        grid_uint8 = (grid * 255).astype(np.uint8)
+        heatmap_uint8 = cv2.resize(grid_uint8, (w, h), interpolation=cv2.INTER_LINEAR)
+        heatmap_color = cv2.applyColorMap(heatmap_uint8, cv2.COLORMAP_JET)
+        return cv2.addWeighted(original, 0.6, heatmap_color, 0.4, 0)
+    except Exception as e:
+        print(f"Error overlaying heatmap: {e}")
+        return original
+
+# Per-pixel bytes of band temporaries: float32 rows, uint8 heat, BGR colormap
+STRIP_BYTES_PER_PIXEL = 4 + 1 + 3
+# Whole-image buffers that exist regardless of band size: decoded screenshot + one overlay
+FULL_BUFFERS_BYTES_PER_PIXEL = 3 + 3
+# Below this, per-band overhead dominates; budgets under the full-buffer floor get this size
+MIN_BAND_ROWS = 256
+
+def band_rows_for_budget(img_shape: Tuple[int, int], budget_bytes: int) -> int:
+    """Rows per band so band temporaries fit in what the budget leaves after the full-size buffers."""
+    h, w = img_shape[:2]
+    available = budget_bytes - h * w * FULL_BUFFERS_BYTES_PER_PIXEL
+    rows = available // max(1, w * STRIP_BYTES_PER_PIXEL)
+    return int(max(MIN_BAND_ROWS, min(h, rows)))
+
+def _upsample_rows(grid_wide: np.ndarray, h: int, y0: int, y1: int) -> np.ndarray:
+    """
+    Vertical linear interpolation of output rows [y0, y1) from a grid already stretched to
+    full width. Uses the same half-pixel mapping as cv2.resize; each band reads one grid
+    row of halo on either side, so bands join without seams.
+    """
+    gh = grid_wide.shape[0]
+    src = (np.arange(y0, y1, dtype="float32") + 0.5) * (gh / h) - 0.5
+    src = np.clip(src, 0, gh - 1)
+    i0 = np.floor(src).astype(np.int64)
+    i1 = np.minimum(i0 + 1, gh - 1)
+    frac = (src - i0)[:, None]
+    return grid_wide[i0] * (1 - frac) + grid_wide[i1] * frac
+
+def overlay_grid_pair_strips(
+    img: np.ndarray,
+    attention_grid: np.ndarray,
+    click_grid: np.ndarray,
+    band_rows: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Both overlays in a single pass over the screenshot, band by band.
+    Each band of img is read once for the attention blend and then overwritten with the
+    click blend, and the colormap scratch buffers are shared between the two.
+    Returns (attention_overlay, click_overlay); the click overlay is img itself.
+    """
+    h, w = img.shape[:2]
+    attention_out = np.empty_like(img)
+    # Horizontal pass once on the small grids (gh x w), vertical pass per band
+    wide = [cv2.resize(grid, (w, grid.shape[0]), interpolation=cv2.INTER_LINEAR)
+            for grid in (attention_grid, click_grid)]
+    heat = np.empty((band_rows, w), np.uint8)
+    heat_color = np.empty((band_rows, w, 3), np.uint8)
+
+    for y0 in range(0, h, band_rows):
+        y1 = min(h, y0 + band_rows)
+        rows = y1 - y0
+        for grid_wide, out in zip(wide, (attention_out, img)):
+            np.copyto(heat[:rows], _upsample_rows(grid_wide, h, y0, y1) * 255, casting="unsafe")
+            cv2.applyColorMap(heat[:rows], cv2.COLORMAP_JET, dst=heat_color[:rows])
+            cv2.addWeighted(img[y0:y1], 0.6, heat_color[:rows], 0.4, 0, dst=out[y0:y1])
+    return attention_out, img
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+def generate_heatmaps(
+    screenshot_bytes: bytes,
+    clickable_elements: List[Dict[str, Any]],
+    scan_id: str,
+    quality: Optional[str] = None,
+    encoding: Optional[ImageEncoding] = None
+) -> HeatmapResult:
     """
     Generates attention and click heatmaps.
+    quality selects the saliency level (fast / balanced / high), defaulting to HEATMAP_QUALITY.
+    encoding defaults to the IMAGE_* settings. The screenshot is decoded once and both
+    overlays are built from it in one banded pass.
     """
+    quality = saliency.resolve_quality(quality or settings.HEATMAP_QUALITY)
+    encoding = encoding or encoding_from_settings()
+    timings: Dict[str, float] = {}
     try:
+        start = time.perf_counter()
         img = decode_image(screenshot_bytes)
         if img is None:
              raise ValueError("Could not decode screenshot bytes")
+        timings["decode"] = _elapsed_ms(start)
+        
+        # 1. Attention and click maps on small grids
+        attention_grid, _, attention_ms = saliency.timed_attention_grid(img, quality)
+        timings["attention_grid"] = round(attention_ms, 1)
+        start = time.perf_counter()
+        click_grid, scored_elements = rasterize_click_grid(img.shape[:2], clickable_elements, settings.HEATMAP_CLICK_SCALE)
+        timings["click_grid"] = _elapsed_ms(start)
         
-        # 1. Attention Map
-        attention_map = compute_attention_map(img)
-        attention_overlay = overlay_heatmap(img, attention_map)
-        attention_bytes = encode_image(attention_overlay)
+        # 2. Full-size colormap and blend, in bands sized to HEATMAP_MEMORY_BUDGET_MB
+        start = time.perf_counter()
+        band_rows = band_rows_for_budget(img.shape[:2], settings.HEATMAP_MEMORY_BUDGET_MB * 1024 * 1024)
+        attention_overlay, click_overlay = overlay_grid_pair_strips(img, attention_grid, click_grid, band_rows)
+        timings["overlay"] = _elapsed_ms(start)
         
-        # 2. Click Map
-        click_map, scored_elements = rasterize_click_map(img.shape[:2], clickable_elements)
-        click_overlay = overlay_heatmap(img, click_map)
-        click_bytes = encode_image(click_overlay)
+        # 3. Encode
+        start = time.perf_counter()
+        attention_bytes = encode_image(attention_overlay, encoding)
+        del attention_overlay
+        timings["encode_attention"] = _elapsed_ms(start)
+        start = time.perf_counter()
+        click_bytes = encode_image(click_overlay, encoding)
+        timings["encode_click"] = _elapsed_ms(start)
         
         return HeatmapResult(
             attention_heatmap_bytes=attention_bytes,
             click_heatmap_bytes=click_bytes,
-            elements=scored_elements
+            elements=scored_elements,
+            attention_quality=quality,
+            attention_compute_ms=round(attention_ms, 1),
+            content_type=encoding.content_type,
+            stage_timings_ms=timings,
+            byte_sizes={
+                "screenshot": len(screenshot_bytes),
+                "attention_heatmap": len(attention_bytes),
+                "click_heatmap": len(click_bytes),
+            }
         )
     except Exception as e:
         print(f"Error generating heatmaps: {e}")
         return HeatmapResult(
             attention_heatmap_bytes=b"",
             click_heatmap_bytes=b"",
-            elements=[]
+            elements=[],
+            attention_quality=quality,
+            content_type=encoding.content_type,
+            stage_timings_ms=timings
         )
@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional
+from ..config import settings
+
+CONTENT_TYPES = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "png": "image/png",
+}
+
+@dataclass(frozen=True)
+class ImageEncoding:
+    format: str = "jpeg"  # jpeg, webp or png
+    quality: int = 80  # 1-100 for jpeg and webp; ignored for png
+    progressive: bool = False  # jpeg only
+    optimize: bool = True  # jpeg only: optimized Huffman tables
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.format]
+
+    @property
+    def extension(self) -> str:
+        return ".jpg" if self.format == "jpeg" else f".{self.format}"
+
+    def imwrite_params(self) -> List[int]:
+        if self.format == "jpeg":
+            return [
+                cv2.IMWRITE_JPEG_QUALITY, self.quality,
+                cv2.IMWRITE_JPEG_PROGRESSIVE, int(self.progressive),
+                cv2.IMWRITE_JPEG_OPTIMIZE, int(self.optimize),
+            ]
+        if self.format == "webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        return [cv2.IMWRITE_PNG_COMPRESSION, 3]
+
+def encoding_from_settings() -> ImageEncoding:
+    fmt = settings.IMAGE_FORMAT.lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in CONTENT_TYPES:
+        print(f"Unknown IMAGE_FORMAT '{settings.IMAGE_FORMAT}', using jpeg")
+        fmt = "jpeg"
+    return ImageEncoding(
+        format=fmt,
+        quality=max(1, min(100, settings.IMAGE_QUALITY)),
+        progressive=settings.IMAGE_JPEG_PROGRESSIVE,
+        optimize=settings.IMAGE_JPEG_OPTIMIZE,
+    )
+
+def decode_image(image_bytes: bytes) -> Optional[np.ndarray]:
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def encode_image(image: np.ndarray, encoding: Optional[ImageEncoding] = None) -> bytes:
+    encoding = encoding or encoding_from_settings()
+    success, encoded_image = cv2.imencode(encoding.extension, image, encoding.imwrite_params())
+    if not success:
+        raise ValueError("Could not encode image")
+    return encoded_image.tobytes()
@@ -3,6 +3,7 @@ import json
 import os
 from dataclasses import dataclass
 from typing import List, Dict, Any
+from ..services.metrics import BROWSERS_IN_USE
 
 @dataclass
 class PerformanceResult:
@@ -21,8 +22,8 @@ def run_lighthouse(url: str, scan_id: str) -> PerformanceResult:
     
     # Set CHROME_PATH for lighthouse to find the browser
     env = os.environ.copy()
-    from ..config import settings
-    env["CHROME_PATH"] = settings.CHROME_PATH
+    from ..config import chrome_path
+    env["CHROME_PATH"] = chrome_path()
     
     # Check if lighthouse is installed
     import shutil
@@ -40,7 +41,12 @@ def run_lighthouse(url: str, scan_id: str) -> PerformanceResult:
     ]
     
     try:
-        subprocess.run(cmd, check=True, capture_output=True, env=env)
+        # Lighthouse launches its own Chrome for the duration of the run
+        BROWSERS_IN_USE.inc(purpose="lighthouse")
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, env=env)
+        finally:
+            BROWSERS_IN_USE.dec(purpose="lighthouse")
         
         with open(output_path, 'r') as f:
             lhr = json.load(f)
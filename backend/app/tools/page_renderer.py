@@ -1,53 +1,219 @@
 from playwright.async_api import async_playwright, Page
+from collections import Counter
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from functools import cached_property
+from typing import List, Dict, Any, Tuple, Optional
+import base64
 import os
 import json
+import threading
+import time
+from .image_codec import ImageEncoding, encoding_from_settings
+from .dom import ParsedDocument
+from . import fingerprint
+from .zap_client import zap_client
+from ..config import settings
+from ..services.artifact_store import Blob, CappedList
+from ..services.metrics import BROWSERS_IN_USE, ARTIFACT_ITEMS_DROPPED
+
+# HAR recordings for ZAP_TRAFFIC_MODE=har; removed once ZAP has imported them
+HAR_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../data/har"))
+TRACE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../data/traces"))
+
+# The artifact parts each analyzer reads; a part is freed as soon as its last reader is done
+ARTIFACT_READERS = {
+    "security_hygiene": ("dom", "network_logs"),
+    "analytics_seo": ("dom", "network_logs"),
+    "heatmaps": ("screenshot", "clickable_elements"),
+}
 
 @dataclass
 class PageArtifact:
-    screenshot_bytes: bytes
+    screenshot: Blob
     viewport: dict
-    dom_html: str
+    dom: Blob  # page.content(), utf-8
     headers: dict
     cookies: List[Dict[str, Any]]
-    network_logs: List[Dict[str, Any]]
-    clickable_elements: List[Dict[str, Any]]
+    network_logs: List[Dict[str, Any]]  # a CappedList from render_page
+    clickable_elements: List[Dict[str, Any]]  # likewise
+    screenshot_content_type: str = "image/png"
+    screenshot_capture_ms: float = 0.0
+    # How ZAP can see this render's traffic: it went through the ZAP proxy, or was recorded to a HAR
+    zap_proxied: bool = False
+    trace_path: Optional[str] = None  # Playwright trace of the render, when requested
+    har_path: Optional[str] = None
+    snapshot_har_path: Optional[str] = None  # HAR for the scan's render snapshot (may be har_path)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._document: Optional[ParsedDocument] = None
+        self._readers = Counter(part for parts in ARTIFACT_READERS.values() for part in parts)
+
+    @property
+    def screenshot_bytes(self) -> bytes:
+        return self.screenshot.read()
+
+    @screenshot_bytes.setter
+    def screenshot_bytes(self, value: bytes):
+        self.screenshot = Blob(value)
+
+    @property
+    def dom_html(self) -> str:
+        return self.dom.read().decode("utf-8")
+
+    @property
+    def document(self) -> ParsedDocument:
+        """Shared parse of the DOM; built on first use by any analyzer."""
+        with self._lock:
+            if self._document is None:
+                self._document = ParsedDocument(self.dom_html)
+            return self._document
+
+    @document.setter
+    def document(self, value: ParsedDocument):
+        self._document = value
+
+    @cached_property
+    def technologies(self) -> List[fingerprint.Technology]:
+        """Detected tech stack, computed once and shared by the analyzers."""
+        return fingerprint.get_engine().detect(self)
+
+    @property
+    def dropped(self) -> Dict[str, int]:
+        """Items beyond the network log and clickable element caps."""
+        return {part: getattr(getattr(self, part), "dropped", 0) for part in ("network_logs", "clickable_elements")}
 
-async def render_page(url: str, scan_id: str) -> PageArtifact:
+    def spill(self, name: str):
+        """Moves a large screenshot and DOM to temp files until their analyzers read them."""
+        self.screenshot.spill(f"{name}-screenshot")
+        self.dom.spill(f"{name}-dom")
+
+    def release(self, module: str):
+        """Called when an analyzer is done with the artifact; frees the parts nothing else reads."""
+        with self._lock:
+            freed = []
+            for part in ARTIFACT_READERS.get(module, ()):
+                self._readers[part] -= 1
+                if self._readers[part] == 0:
+                    freed.append(part)
+        for part in freed:
+            self._free_part(part)
+
+    def free(self):
+        """Frees every large part, e.g. once the analysis is over whatever its outcome."""
+        for part in ("screenshot", "dom", "network_logs", "clickable_elements"):
+            self._free_part(part)
+
+    def _free_part(self, part: str):
+        if part == "screenshot":
+            self.screenshot.free()
+        elif part == "dom":
+            self.dom.free()
+            with self._lock:
+                self._document = None
+        else:
+            getattr(self, part).clear()
+
+async def capture_screenshot(page: Page, encoding: ImageEncoding) -> Tuple[bytes, str]:
+    """
+    Captures the viewport directly in the output format, so the stored screenshot is never re-encoded.
+    Playwright only exposes png/jpeg; webp goes through the DevTools protocol.
+    Returns (bytes, content_type).
+    """
+    if encoding.format == "jpeg":
+        return await page.screenshot(type="jpeg", quality=encoding.quality), encoding.content_type
+    if encoding.format == "webp":
+        try:
+            cdp = await page.context.new_cdp_session(page)
+            shot = await cdp.send("Page.captureScreenshot", {"format": "webp", "quality": encoding.quality})
+            await cdp.detach()
+            return base64.b64decode(shot["data"]), encoding.content_type
+        except Exception as e:
+            print(f"WebP capture unavailable, falling back to png: {e}")
+    return await page.screenshot(), "image/png"
+
+async def _zap_reachable() -> bool:
+    try:
+        await zap_client.version()
+        return True
+    except Exception:
+        return False
+
+async def render_page(url: str, scan_id: str, trace: bool = False, record_har: bool = False,
+                      replay_har: Optional[str] = None) -> PageArtifact:
     """
     Renders a page using Playwright, captures a screenshot, and extracts metadata.
+    Depending on ZAP_TRAFFIC_MODE the traffic is routed through the ZAP proxy or recorded
+    as a HAR, so ZAP's passive rules can run on it without fetching the site again.
+    With trace=True a Playwright trace of the render is written to artifact.trace_path.
+    With record_har=True a HAR of the render is left at artifact.snapshot_har_path.
+    With replay_har every request is answered from that HAR and nothing goes to the
+    network (requests it has no entry for are aborted); ZAP sees none of it.
     """
+    launch_args = []
+    context_args: Dict[str, Any] = {"viewport": {"width": 1440, "height": 900}}
+    zap_proxied = False
+    har_path = None
+    snapshot_har_path = None
+    zap_mode = "none" if replay_har else settings.ZAP_TRAFFIC_MODE
+    if zap_mode == "proxy" and await _zap_reachable():
+        # ZAP intercepts TLS with its own CA, and Chromium skips proxies for loopback by default
+        context_args.update(proxy={"server": zap_client.proxy_url}, ignore_https_errors=True)
+        launch_args.append("--proxy-bypass-list=<-loopback>")
+        zap_proxied = True
+    elif zap_mode == "har":
+        os.makedirs(HAR_DIR, exist_ok=True)
+        har_path = os.path.join(HAR_DIR, f"{scan_id}.har")
+        # Bodies are embedded because passive rules inspect them
+        context_args.update(record_har_path=har_path, record_har_content="embed")
+    if record_har and not replay_har:
+        # ZAP's HAR serves both when there is one; it is removed only after ZAP imported it
+        snapshot_har_path = har_path
+        if snapshot_har_path is None:
+            os.makedirs(HAR_DIR, exist_ok=True)
+            snapshot_har_path = os.path.join(HAR_DIR, f"{scan_id}-snapshot.har")
+            context_args.update(record_har_path=snapshot_har_path, record_har_content="embed")
+
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(viewport={"width": 1440, "height": 900})
+        browser = await p.chromium.launch(headless=True, args=launch_args)
+        context = await browser.new_context(**context_args)
+        if replay_har:
+            await context.route_from_har(replay_har, not_found="abort")
+        trace_path = None
+        if trace:
+            await context.tracing.start(screenshots=True, snapshots=True)
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            trace_path = os.path.join(TRACE_DIR, f"{scan_id}.zip")
         page = await context.new_page()
         
-        network_logs = []
+        network_logs = CappedList(settings.ARTIFACT_MAX_NETWORK_LOGS)
         
-        # Capture network logs
+        # Capture network logs (the first ARTIFACT_MAX_NETWORK_LOGS; the rest are counted)
         page.on("request", lambda request: network_logs.append({
             "url": request.url,
             "method": request.method,
             "resource_type": request.resource_type
         }))
 
+        BROWSERS_IN_USE.inc(purpose="render")
         try:
             response = await page.goto(url, wait_until="networkidle")
             headers = response.headers if response else {}
             
-            # Capture screenshot as bytes
-            screenshot_bytes = await page.screenshot()
+            # Capture screenshot as bytes, already in the configured output format
+            capture_start = time.perf_counter()
+            screenshot_bytes, screenshot_content_type = await capture_screenshot(page, encoding_from_settings())
+            screenshot_capture_ms = (time.perf_counter() - capture_start) * 1000
             
             dom_html = await page.content()
             cookies = await context.cookies()
             viewport = page.viewport_size
             
-            # Extract clickable elements
-            clickable_elements = await page.evaluate("""
-                () => {
-                    const elements = Array.from(document.querySelectorAll('a, button, input, [onclick], [role="button"]'));
-                    return elements.map(el => {
+            # Extract clickable elements; only the first max are laid out and sent back
+            clickables = await page.evaluate("""
+                (max) => {
+                    const elements = document.querySelectorAll('a, button, input, [onclick], [role="button"]');
+                    const items = Array.from(elements).slice(0, max).map(el => {
                         const rect = el.getBoundingClientRect();
                         return {
                             tag: el.tagName,
@@ -61,18 +227,36 @@ async def render_page(url: str, scan_id: str) -> PageArtifact:
                             }
                         };
                     });
+                    return {total: elements.length, items: items};
                 }
-            """)
+            """, settings.ARTIFACT_MAX_CLICKABLE_ELEMENTS)
+            clickable_elements = CappedList(settings.ARTIFACT_MAX_CLICKABLE_ELEMENTS, clickables["items"],
+                                            dropped=clickables["total"] - len(clickables["items"]))
+            for part, items in (("network_logs", network_logs), ("clickable_elements", clickable_elements)):
+                if items.dropped:
+                    ARTIFACT_ITEMS_DROPPED.inc(items.dropped, part=part)
+                    print(f"Render of {url}: kept {len(items)} {part}, dropped {items.dropped}")
             
             return PageArtifact(
-                screenshot_bytes=screenshot_bytes,
+                screenshot=Blob(screenshot_bytes),
                 viewport=viewport,
-                dom_html=dom_html,
+                dom=Blob(dom_html.encode("utf-8")),
                 headers=headers,
                 cookies=cookies,
                 network_logs=network_logs,
-                clickable_elements=clickable_elements
+                clickable_elements=clickable_elements,
+                screenshot_content_type=screenshot_content_type,
+                screenshot_capture_ms=round(screenshot_capture_ms, 1),
+                zap_proxied=zap_proxied,
+                har_path=har_path,
+                trace_path=trace_path,
+                snapshot_har_path=snapshot_har_path
             )
             
         finally:
+            if trace_path:
+                await context.tracing.stop(path=trace_path)
+            # Closing the context writes the HAR
+            await context.close()
             await browser.close()
+            BROWSERS_IN_USE.dec(purpose="render")
@@ -55,7 +55,9 @@ def aggregate_report(module_results: List[Any]) -> SiteReport:
                 recommendations.append(Recommendation("Security", rec, "High"))
                 
         elif name == "zap_security":
-            # ZAP doesn't return a simple score, but we can deduct based on issues
+            # ZAP doesn't return a simple score, but we can deduct based on issues.
+            # Issues are deduplicated alert types, so a header missing on 500 pages
+            # costs the same as on one; the instance count only shows in the text.
             issues = data.get("issues", [])
             zap_score = 100
             for issue in issues:
@@ -66,7 +68,9 @@ def aggregate_report(module_results: List[Any]) -> SiteReport:
             scores["security"] += max(0, zap_score) * 0.5 # 50% of security score
             
             for issue in issues:
-                recommendations.append(Recommendation("Security", f"{issue.get('name')}: {issue.get('solution')}", issue.get("risk", "Low")))
+                count = issue.get("count", 1)
+                where = f" ({count} instances)" if count > 1 else ""
+                recommendations.append(Recommendation("Security", f"{issue.get('name')}{where}: {issue.get('solution')}", issue.get("risk", "Low")))
 
         elif name == "analytics_seo":
             scores["seo"] = data.get("score", 0)
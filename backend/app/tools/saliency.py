@@ -0,0 +1,107 @@
+import time
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+@dataclass(frozen=True)
+class SaliencyQuality:
+    # Working-resolution budget in pixels: the grid is scaled down until it fits, so
+    # compute cost stays flat as screenshots grow.
+    max_pixels: int
+    # Upper bound on the scale, so small screenshots are still downsampled
+    max_scale: float
+    use_contrast: bool
+    use_color: bool
+    # Extra coarser pyramid levels whose features are added back (center-surround at several sizes)
+    extra_levels: int
+
+QUALITY_LEVELS: Dict[str, SaliencyQuality] = {
+    "fast": SaliencyQuality(max_pixels=120_000, max_scale=0.125, use_contrast=False, use_color=False, extra_levels=0),
+    "balanced": SaliencyQuality(max_pixels=400_000, max_scale=0.25, use_contrast=True, use_color=True, extra_levels=0),
+    "high": SaliencyQuality(max_pixels=1_500_000, max_scale=0.5, use_contrast=True, use_color=True, extra_levels=2),
+}
+
+DEFAULT_QUALITY = "balanced"
+
+# Final smoothing of the original attention map: 51x51 Gaussian with OpenCV's default sigma
+ATTENTION_BLUR_SIGMA = 0.3 * ((51 - 1) * 0.5 - 1) + 0.8
+
+def resolve_quality(quality: str) -> str:
+    return quality if quality in QUALITY_LEVELS else DEFAULT_QUALITY
+
+def working_factor(img_shape: Tuple[int, int], quality: str) -> int:
+    """
+    Integer downsampling factor for the working grid.
+    Integer factors hit OpenCV's fast INTER_AREA path, about the cost of one copy of the image.
+    """
+    level = QUALITY_LEVELS[resolve_quality(quality)]
+    h, w = img_shape[:2]
+    scale = min(level.max_scale, (level.max_pixels / float(h * w)) ** 0.5)
+    return max(1, int(np.ceil(1.0 / scale)))
+
+def _normalize(feature: np.ndarray) -> np.ndarray:
+    lo, hi = float(feature.min()), float(feature.max())
+    if hi - lo < 1e-6:
+        return np.zeros_like(feature, dtype="float32")
+    return ((feature - lo) / (hi - lo)).astype("float32")
+
+def _surround(channel: np.ndarray, sigma: float) -> np.ndarray:
+    return cv2.GaussianBlur(channel, (0, 0), sigma)
+
+def _features(small_bgr: np.ndarray, level: SaliencyQuality) -> np.ndarray:
+    bgr = small_bgr.astype("float32") / 255.0
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+    surround_sigma = max(2.0, min(gray.shape) / 32.0)
+
+    # Edges: Sobel gradient magnitude, a continuous stand-in for Canny that survives downsampling
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+    combined = _normalize(cv2.magnitude(gx, gy))
+    weights = 1.0
+
+    if level.use_contrast:
+        # Luminance center-surround contrast
+        combined += _normalize(np.abs(gray - _surround(gray, surround_sigma)))
+        weights += 1.0
+
+    if level.use_color:
+        # Red-green and blue-yellow opponency, center-surround
+        b, g, r = cv2.split(bgr)
+        rg = r - g
+        by = b - (r + g) * 0.5
+        opponency = np.abs(rg - _surround(rg, surround_sigma)) + np.abs(by - _surround(by, surround_sigma))
+        combined += 0.5 * _normalize(opponency)
+        weights += 0.5
+
+    return combined / weights
+
+def compute_attention_grid(img: np.ndarray, quality: str = DEFAULT_QUALITY) -> Tuple[np.ndarray, float]:
+    """
+    Saliency map on a downsampled grid, normalized to 0-1.
+    Returns (grid, scale) where scale maps full-size pixels to grid cells.
+    """
+    level = QUALITY_LEVELS[resolve_quality(quality)]
+    h, w = img.shape[:2]
+    factor = working_factor((h, w), quality)
+    scale = 1.0 / factor
+    gw, gh = max(1, w // factor), max(1, h // factor)
+    # Crop the (< factor px) remainder so the reduction is an exact integer ratio
+    small = cv2.resize(img[:gh * factor, :gw * factor], (gw, gh), interpolation=cv2.INTER_AREA)
+
+    saliency = _features(small, level)
+    coarse = small
+    for _ in range(level.extra_levels):
+        if min(coarse.shape[:2]) < 16:
+            break
+        coarse = cv2.pyrDown(coarse)
+        saliency += cv2.resize(_features(coarse, level), (gw, gh), interpolation=cv2.INTER_LINEAR)
+
+    saliency = cv2.GaussianBlur(saliency, (0, 0), max(0.5, ATTENTION_BLUR_SIGMA * scale))
+    return _normalize(saliency), scale
+
+def timed_attention_grid(img: np.ndarray, quality: str = DEFAULT_QUALITY) -> Tuple[np.ndarray, float, float]:
+    """compute_attention_grid plus its wall time in milliseconds."""
+    start = time.perf_counter()
+    grid, scale = compute_attention_grid(img, quality)
+    return grid, scale, (time.perf_counter() - start) * 1000
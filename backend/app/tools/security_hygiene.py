@@ -3,6 +3,8 @@ from typing import List
 from .page_renderer import PageArtifact
 import re
 
+JS_CATEGORIES = {"js_library", "js_framework"}
+
 @dataclass
 class SecurityHygieneResult:
     score: int
@@ -54,15 +56,13 @@ def analyze_security_hygiene(artifact: PageArtifact) -> SecurityHygieneResult:
             findings.append(f"Cookie '{cookie['name']}' is not HttpOnly")
             recommendations.append(f"Set the HttpOnly flag for cookie '{cookie['name']}'.")
             
-    # JS Libs (simple regex on DOM)
-    # This is a basic check
-    if 'jquery' in artifact.dom_html.lower():
-        findings.append("jQuery detected")
-    if 'react' in artifact.dom_html.lower():
-        findings.append("React detected")
+    # JS Libs and frameworks from the shared fingerprint scan, with versions where known
+    for tech in artifact.technologies:
+        if tech.category in JS_CATEGORIES:
+            findings.append(f"{tech.name} {tech.version} detected" if tech.version else f"{tech.name} detected")
 
     return SecurityHygieneResult(
         score=max(0, score),
         findings=findings,
-        recommendations=list(set(recommendations))
+        recommendations=list(dict.fromkeys(recommendations))
     )
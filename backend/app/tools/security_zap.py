@@ -1,93 +1,147 @@
-import requests
+import asyncio
+import os
 import time
-from dataclasses import dataclass
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
 from ..config import settings
+from .zap_client import zap_client, ZapError, ZapUnavailable, ZapDeadlineExceeded
+
+RISK_ORDER = {"High": 0, "Medium": 1, "Low": 2, "Informational": 3}
 
 @dataclass
 class ZapIssue:
+    """One ZAP alert type, deduplicated across every URL it was raised on."""
     risk: str
     confidence: str
     name: str
     description: str
-    url: str
+    url: str # first URL it was raised on
     solution: str
+    plugin_id: str = ""
+    count: int = 1 # instances
+    sample_urls: List[str] = field(default_factory=list)
 
 @dataclass
 class ZapResult:
     issues: List[ZapIssue]
-    status: str # "completed", "failed", "skipped"
+    status: str # "completed", "failed", "skipped", "timeout" (partial alerts)
+    traffic_source: str = "" # "proxy", "har", "spider", or "proxy+spider" / "har+spider"
+    alert_count: int = 0 # instances before deduplication
 
-def run_zap_scan(url: str, scan_id: str) -> ZapResult:
-    base_url = f"http://{settings.ZAP_HOST}:{settings.ZAP_PORT}"
-    headers = {"X-ZAP-API-Key": settings.ZAP_API_KEY}
-    
-    # 1. Check if ZAP is running
-    try:
-        resp = requests.get(f"{base_url}/JSON/core/view/version/", headers=headers, timeout=2)
-        if resp.status_code != 200:
-            print("ZAP is not running or reachable.")
-            return ZapResult(issues=[], status="skipped")
-    except requests.exceptions.ConnectionError:
-        print("ZAP is not running (connection error).")
-        return ZapResult(issues=[], status="skipped")
-    except Exception as e:
-        print(f"Error checking ZAP status: {e}")
-        return ZapResult(issues=[], status="failed")
+class AlertGroups:
+    """
+    Streaming deduplication of ZAP alerts by plugin id and alert name. Long description
+    and solution texts are kept once per group, and only a few sample URLs, so the
+    result size depends on the number of distinct alert types, not on the site size.
+    """
 
-    print(f"ZAP is running. Starting scan for {url}...")
+    def __init__(self, sample_urls: Optional[int] = None):
+        self.sample_urls = settings.ZAP_ALERT_SAMPLE_URLS if sample_urls is None else sample_urls
+        self.groups: Dict[Tuple[str, str], ZapIssue] = {}
+        self.total = 0
 
-    # 2. Trigger Spider
-    try:
-        # Start spider
-        resp = requests.get(
-            f"{base_url}/JSON/spider/action/scan/",
-            params={"url": url},
-            headers=headers
-        )
-        scan_id_zap = resp.json().get("scan")
-        if not scan_id_zap:
-             print("Failed to start ZAP spider.")
-             return ZapResult(issues=[], status="failed")
-             
-        # Poll for spider completion
-        while True:
-            resp = requests.get(
-                f"{base_url}/JSON/spider/view/status/",
-                params={"scanId": scan_id_zap},
-                headers=headers
-            )
-            status = int(resp.json().get("status", 0))
-            if status >= 100:
-                break
-            time.sleep(1)
-            
-        print("ZAP Spider completed.")
-        
-        # 3. Active Scan (Optional - skipping for now to keep it fast/safe, or make it configurable)
-        # To enable: /JSON/ascan/action/scan/
-        
-        # 4. Fetch Alerts
-        resp = requests.get(
-            f"{base_url}/JSON/core/view/alerts/",
-            params={"baseurl": url},
-            headers=headers
-        )
-        alerts = resp.json().get("alerts", [])
-        
-        issues = []
-        for alert in alerts:
-            issues.append(ZapIssue(
+    def add(self, alert: Dict[str, Any]):
+        self.total += 1
+        name = alert.get("alert") or alert.get("name") or ""
+        key = (str(alert.get("pluginId", "")), name)
+        url = alert.get("url") or ""
+        issue = self.groups.get(key)
+        if issue is None:
+            self.groups[key] = ZapIssue(
                 risk=alert.get("risk"),
                 confidence=alert.get("confidence"),
-                name=alert.get("alert"),
+                name=name,
                 description=alert.get("description"),
-                url=alert.get("url"),
-                solution=alert.get("solution")
-            ))
-            
-        return ZapResult(issues=issues, status="completed")
-        
-    except Exception as e:
+                url=url,
+                solution=alert.get("solution"),
+                plugin_id=key[0],
+                sample_urls=[url] if url and self.sample_urls else [],
+            )
+            return
+        issue.count += 1
+        # A rule can raise the same alert at different risks; the group reports the worst
+        if RISK_ORDER.get(alert.get("risk"), 9) < RISK_ORDER.get(issue.risk, 9):
+            issue.risk = alert.get("risk")
+        if url and len(issue.sample_urls) < self.sample_urls and url not in issue.sample_urls:
+            issue.sample_urls.append(url)
+
+    def issues(self) -> List[ZapIssue]:
+        """Highest risk first, then most instances."""
+        return sorted(self.groups.values(), key=lambda i: (RISK_ORDER.get(i.risk, 9), -i.count, i.name))
+
+async def _feed_traffic(artifact) -> str:
+    """Gets the render's traffic into ZAP. Returns the source used, or "none"."""
+    if artifact is None:
+        return "none"
+    if artifact.zap_proxied:
+        # Already recorded by ZAP while the page rendered
+        return "proxy"
+    if artifact.har_path and os.path.exists(artifact.har_path):
+        await zap_client.import_har(artifact.har_path)
+        return "har"
+    return "none"
+
+async def run_zap_scan(url: str, scan_id: str, artifact=None, spider_depth: Optional[int] = None) -> ZapResult:
+    """
+    Passive ZAP scan of the traffic from render_page (proxied or imported as a HAR).
+    The spider only runs when opted into with spider_depth / ZAP_SPIDER_DEPTH > 0, or
+    when no rendered traffic reached ZAP (ZAP_TRAFFIC_MODE=spider, or ZAP was down at render time).
+    """
+    deadline = time.monotonic() + settings.ZAP_SCAN_DEADLINE_SECONDS
+    depth = settings.ZAP_SPIDER_DEPTH if spider_depth is None else spider_depth
+
+    try:
+        # 1. Check if ZAP is running
+        try:
+            await zap_client.version()
+        except ZapUnavailable:
+            print("ZAP is not running (connection error).")
+            return ZapResult(issues=[], status="skipped")
+        except Exception as e:
+            print(f"Error checking ZAP status: {e}")
+            return ZapResult(issues=[], status="failed")
+
+        status = "completed"
+        source = "none"
+        try:
+            # 2. Rendered traffic, then the optional spider on top of it
+            source = await _feed_traffic(artifact)
+            if source == "none" or depth > 0:
+                print(f"ZAP is running. Spidering {url} (depth {depth or 'default'})...")
+                zap_scan_id = await zap_client.start_spider(url, max_depth=depth or None)
+                source = "spider" if source == "none" else f"{source}+spider"
+                await zap_client.wait_for_spider(zap_scan_id, deadline)
+                print("ZAP Spider completed.")
+            else:
+                print(f"ZAP is running. Passive scan of rendered traffic ({source}) for {url}...")
+
+            # 3. Passive rules run asynchronously in ZAP; wait for its queue to drain
+            await zap_client.wait_for_passive_scan(deadline, url)
+        except ZapDeadlineExceeded as e:
+            print(f"{e}; reporting partial alerts")
+            status = "timeout"
+
+        # 4. Active Scan (Optional - skipping for now to keep it fast/safe, or make it configurable)
+        # To enable: /JSON/ascan/action/scan/
+
+        # 5. Fetch Alerts (raised so far, even after a timeout), one page at a time
+        groups = AlertGroups()
+        async for page in zap_client.iter_alerts(url):
+            for alert in page:
+                groups.add(alert)
+        return ZapResult(issues=groups.issues(), status=status, traffic_source=source, alert_count=groups.total)
+
+    except asyncio.CancelledError:
+        raise
+    except ZapError as e:
         print(f"Error running ZAP scan: {e}")
         return ZapResult(issues=[], status="failed")
+    except Exception as e:
+        print(f"Error running ZAP scan: {e!r}")
+        return ZapResult(issues=[], status="failed")
+    finally:
+        if artifact is not None and artifact.har_path:
+            try:
+                os.remove(artifact.har_path)
+            except OSError:
+                pass
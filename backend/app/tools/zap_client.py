@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional
+import httpx
+from ..config import settings
+
+class ZapError(Exception):
+    """ZAP answered with an error or could not be reached after retries."""
+
+class ZapUnavailable(ZapError):
+    """ZAP is not running or not reachable."""
+
+class ZapDeadlineExceeded(ZapError):
+    pass
+
+# The spider depth is a daemon-wide ZAP option read when a spider starts, so setting it
+# and starting the spider is one step across every scan thread
+_spider_start_lock = threading.Lock()
+
+class ZapClient:
+    """
+    Async client for the ZAP JSON API.
+    Requests share one httpx.AsyncClient connection pool per event loop (background scans
+    each run in their own loop, and httpx connections can't cross loops); call aclose()
+    when a loop is done with it. Pass base_url/transport to point it at a fake server.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url or f"http://{settings.ZAP_HOST}:{settings.ZAP_PORT}"
+        self.api_key = settings.ZAP_API_KEY if api_key is None else api_key
+        self._transport = transport
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"X-ZAP-API-Key": self.api_key},
+                timeout=httpx.Timeout(settings.ZAP_REQUEST_TIMEOUT_SECONDS, connect=2.0),
+                limits=httpx.Limits(
+                    max_connections=settings.ZAP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.ZAP_MAX_CONNECTIONS,
+                ),
+                transport=self._transport,
+            )
+        return client
+
+    async def aclose(self):
+        """Closes the current event loop's connection pool."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        retries: Optional[int] = None,
+        retry_connect: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        GET a JSON API path, retrying transport errors and 5xx with exponential backoff.
+        retry_connect=False fails fast when nothing is listening at all.
+        """
+        retries = settings.ZAP_REQUEST_RETRIES if retries is None else retries
+        delay = settings.ZAP_POLL_INITIAL_SECONDS
+        for attempt in range(retries + 1):
+            try:
+                resp = await self.client.get(path, params=params)
+                if resp.status_code < 500:
+                    break
+                error: Exception = ZapError(f"ZAP returned {resp.status_code} for {path}")
+            except httpx.ConnectError as e:
+                error = ZapUnavailable(f"ZAP is not reachable at {self.base_url}: {e}")
+                if not retry_connect:
+                    raise error
+            except httpx.TransportError as e:
+                error = ZapError(f"ZAP request {path} failed: {e!r}")
+            if attempt == retries:
+                raise error
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.ZAP_POLL_MAX_SECONDS)
+
+        if resp.status_code != 200:
+            raise ZapError(f"ZAP returned {resp.status_code} for {path}: {resp.text[:200]}")
+        return resp.json()
+
+    async def version(self) -> str:
+        return (await self.get("/JSON/core/view/version/", retry_connect=False)).get("version", "")
+
+    @property
+    def proxy_url(self) -> str:
+        """ZAP serves its API and its intercepting proxy on the same port."""
+        return self.base_url
+
+    async def start_spider(self, url: str, max_depth: Optional[int] = None) -> str:
+        # Polled rather than awaited in a thread, so a cancelled scan never holds the lock
+        while not _spider_start_lock.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+        try:
+            if max_depth is not None:
+                await self.get("/JSON/spider/action/setOptionMaxDepth/", {"Integer": max_depth})
+            scan = (await self.get("/JSON/spider/action/scan/", {"url": url})).get("scan")
+        finally:
+            _spider_start_lock.release()
+        if scan in (None, ""):
+            raise ZapError("ZAP did not return a spider scan id")
+        return str(scan)
+
+    async def spider_status(self, zap_scan_id: str) -> int:
+        return int((await self.get("/JSON/spider/view/status/", {"scanId": zap_scan_id})).get("status", 0))
+
+    async def stop_spider(self, zap_scan_id: str):
+        await self.get("/JSON/spider/action/stop/", {"scanId": zap_scan_id}, retries=0)
+
+    async def import_har(self, path: str):
+        """Imports a HAR file (a path readable by the ZAP process); its messages go through passive scan."""
+        await self.get("/JSON/exim/action/importHar/", {"filePath": path})
+
+    async def records_to_scan(self) -> int:
+        return int((await self.get("/JSON/pscan/view/recordsToScan/")).get("recordsToScan", 0))
+
+    async def last_message_id(self, base_url: Optional[str] = None) -> int:
+        """Newest history id in ZAP, or among the messages under base_url; 0 when there are none."""
+        params = {"baseurl": base_url} if base_url else {}
+        count = int((await self.get("/JSON/core/view/numberOfMessages/", params)).get("numberOfMessages", 0))
+        if count == 0:
+            return 0
+        # The last two, whether start counts from 0 or 1
+        page = (await self.get("/JSON/core/view/messages/", {**params, "start": max(count - 2, 0), "count": 2}))
+        return max((int(m.get("id", 0)) for m in page.get("messages", [])), default=0)
+
+    async def alerts(self, base_url: str, start: int = 0, count: int = 0) -> List[Dict[str, Any]]:
+        """One page of alerts; count=0 means all of them."""
+        params = {"baseurl": base_url, "start": start, "count": count}
+        return (await self.get("/JSON/core/view/alerts/", params)).get("alerts", [])
+
+    async def iter_alerts(self, base_url: str, page_size: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yields alerts page by page, so callers never hold more than one page."""
+        page_size = page_size or settings.ZAP_ALERTS_PAGE_SIZE
+        start = 0
+        while True:
+            page = await self.alerts(base_url, start, page_size)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            start += len(page)
+
+    async def wait_for_spider(self, zap_scan_id: str, deadline: float):
+        """
+        Polls spider status with exponential backoff until it reaches 100 or the deadline
+        (a time.monotonic() value) passes. On timeout or cancellation the spider is
+        stopped in ZAP, so it doesn't keep crawling for a scan nobody is waiting on.
+        """
+        delay = settings.ZAP_POLL_INITIAL_SECONDS
+        try:
+            while True:
+                if await self.spider_status(zap_scan_id) >= 100:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ZapDeadlineExceeded(f"ZAP spider {zap_scan_id} did not finish before the deadline")
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, settings.ZAP_POLL_MAX_SECONDS)
+        except (asyncio.CancelledError, ZapDeadlineExceeded):
+            await self._stop_quietly(zap_scan_id)
+            raise
+
+    async def wait_for_passive_scan(self, deadline: float, base_url: Optional[str] = None):
+        """
+        Polls with backoff until ZAP's passive scanner is past the messages under base_url
+        (all of them without one) or the deadline passes. The scanner works through the
+        history in id order, so messages other scans add later don't hold this one up.
+        """
+        own_last = await self.last_message_id(base_url) if base_url else None
+        if own_last == 0:
+            return
+        delay = settings.ZAP_POLL_INITIAL_SECONDS
+        while True:
+            # The newest id first: records that arrive in between only make the check stricter
+            behind = await self.last_message_id() - own_last if own_last is not None else 0
+            if await self.records_to_scan() <= behind:
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ZapDeadlineExceeded("ZAP passive scan queue did not drain before the deadline")
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, settings.ZAP_POLL_MAX_SECONDS)
+
+    async def _stop_quietly(self, zap_scan_id: str):
+        # Shielded so the stop request still goes out while the caller is being cancelled
+        try:
+            await asyncio.shield(asyncio.wait_for(self.stop_spider(zap_scan_id), settings.ZAP_REQUEST_TIMEOUT_SECONDS))
+        except Exception as e:
+            print(f"Could not stop ZAP spider {zap_scan_id}: {e!r}")
+
+zap_client = ZapClient()
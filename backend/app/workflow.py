@@ -12,24 +12,50 @@ from .tools import (
 )
 from .models import ModuleResult
 from .services.file_service import save_file, get_file_url
+from .services import snapshots
+from .services.scan_serializer import dump_json
+from .services.timings import ScanTimings, timed_node
 from dataclasses import asdict
 import asyncio
 import json
+import os
 
 class ScanState(TypedDict):
     scan_id: str
     url: str
+    options: Dict[str, Any] # per-scan options from ScanCreate
     artifact: Optional[Any] # PageArtifact
     results: List[Dict[str, Any]] # List of ModuleResult dicts (to be saved)
+    timings: Optional[Any] # ScanTimings
+
+def _save_trace(scan_id: str, path: str):
+    try:
+        with open(path, "rb") as f:
+            save_file(scan_id, "render_trace", f.read(), "application/zip")
+    finally:
+        os.remove(path)
 
 # Nodes
+@timed_node("render_page")
 async def render_page_node(state: ScanState):
     print(f"Graph: Rendering page for {state['url']}")
-    artifact = await page_renderer.render_page(state['url'], state['scan_id'])
+    snapshot = snapshots.snapshot_mode(state.get('options'))
+    artifact = await page_renderer.render_page(
+        state['url'], state['scan_id'], trace=bool(state.get('options', {}).get('profile_trace')),
+        record_har=snapshot == "har"
+    )
     
     # Save screenshot to DB
     if artifact.screenshot_bytes:
-        await asyncio.to_thread(save_file, state['scan_id'], "screenshot", artifact.screenshot_bytes, "image/png")
+        await asyncio.to_thread(save_file, state['scan_id'], "screenshot", artifact.screenshot_bytes, artifact.screenshot_content_type)
+    if artifact.trace_path:
+        await asyncio.to_thread(_save_trace, state['scan_id'], artifact.trace_path)
+    if snapshot != "off":
+        await asyncio.to_thread(snapshots.save_snapshot, state['scan_id'], state['url'], artifact, snapshot)
+    if state.get('timings'):
+        state['timings'].add_bytes("render_page", artifact.screenshot.size + artifact.dom.size)
+    # Large parts wait on disk until the analyzers that read them run
+    await asyncio.to_thread(artifact.spill, state['scan_id'])
         
     return {"artifact": artifact}
 
@@ -85,7 +111,8 @@ async def analyze_heatmaps_node(state: ScanState):
         heatmaps.generate_heatmaps, 
         state['artifact'].screenshot_bytes, 
         state['artifact'].clickable_elements, 
-        state['scan_id']
+        state['scan_id'],
+        state.get('options', {}).get('heatmap_quality')
     )
     return {"results": [
         {
@@ -97,8 +124,12 @@ async def analyze_heatmaps_node(state: ScanState):
 
 async def analyze_zap_node(state: ScanState):
     print("Graph: Analyzing ZAP Security")
-    # Run in thread as it uses requests blocking
-    result = await asyncio.to_thread(security_zap.run_zap_scan, state['url'], state['scan_id'])
+    result = await security_zap.run_zap_scan(
+        state['url'],
+        state['scan_id'],
+        state['artifact'],
+        state.get('options', {}).get('zap_spider_depth')
+    )
     return {"results": [
         {
             "module_name": "zap_security",
@@ -107,6 +138,7 @@ async def analyze_zap_node(state: ScanState):
         }
     ]}
 
+@timed_node("aggregate_report")
 async def aggregate_report_node(state: ScanState):
     print("Graph: Aggregating Report")
     # Convert dicts back to objects or just pass dicts if aggregator supports it
@@ -147,36 +179,48 @@ workflow.add_edge("render_page", "analyze_performance")
 workflow.add_edge("render_page", "analyze_heatmaps")
 workflow.add_edge("render_page", "analyze_zap")
 
+@timed_node("analyze_parallel")
 async def analyze_parallel_node(state: ScanState):
     print("Graph: Running parallel analysis")
     
-    # Helper function to safely run a module
+    artifact = state['artifact']
+
+    # Helper function to safely run a module; the artifact parts it read are freed as it finishes
     async def safe_run(module_name, func):
         try:
             return await func
         except Exception as e:
             print(f"Error in {module_name}: {e}")
             return {"error": str(e), "status": "failed"}
+        finally:
+            artifact.release(module_name)
     
+    # Each module is timed as its own stage; to_thread modules are measured in their worker thread
+    timings = state.get('timings') or ScanTimings(state['scan_id'])
+    options = state.get('options', {})
+
     # 1. Security
-    f1 = safe_run("security_hygiene", asyncio.to_thread(lambda: security_hygiene.analyze_security_hygiene(state['artifact'])))
+    f1 = safe_run("security_hygiene", timings.run_in_thread("security_hygiene", security_hygiene.analyze_security_hygiene, artifact))
     
     # 2. SEO
-    f2 = safe_run("analytics_seo", asyncio.to_thread(lambda: analytics_seo.analyze_analytics_seo(state['artifact'])))
+    f2 = safe_run("analytics_seo", timings.run_in_thread("analytics_seo", analytics_seo.analyze_analytics_seo, artifact))
     
     # 3. Accessibility
-    f3 = safe_run("accessibility", accessibility_perf.analyze_accessibility(state['url']))
+    f3 = safe_run("accessibility", timings.run("accessibility", accessibility_perf.analyze_accessibility(state['url'])))
     
     # 4. Lighthouse
-    f4 = safe_run("lighthouse", asyncio.to_thread(lighthouse.run_lighthouse, state['url'], state['scan_id']))
+    f4 = safe_run("lighthouse", timings.run_in_thread("lighthouse", lighthouse.run_lighthouse, state['url'], state['scan_id']))
     
-    # 5. Heatmaps (with extra error handling)
-    f5 = safe_run("heatmaps", asyncio.to_thread(heatmaps.generate_heatmaps, state['artifact'].screenshot_bytes, state['artifact'].clickable_elements, state['scan_id']))
+    # 5. Heatmaps (with extra error handling); a spilled screenshot is read back in the worker thread
+    f5 = safe_run("heatmaps", timings.run_in_thread("heatmaps", lambda: heatmaps.generate_heatmaps(artifact.screenshot_bytes, artifact.clickable_elements, state['scan_id'], options.get('heatmap_quality'))))
     
     # 6. ZAP
-    f6 = safe_run("zap_security", asyncio.to_thread(security_zap.run_zap_scan, state['url'], state['scan_id']))
+    f6 = safe_run("zap_security", timings.run("zap_security", security_zap.run_zap_scan(state['url'], state['scan_id'], artifact, options.get('zap_spider_depth'))))
     
-    results = await asyncio.gather(f1, f2, f3, f4, f5, f6)
+    try:
+        results = await asyncio.gather(f1, f2, f3, f4, f5, f6)
+    finally:
+        artifact.free()
     
     # Unpack results
     sec_res, seo_res, acc_res, lh_res, hm_res, zap_res = results
@@ -209,6 +253,7 @@ async def analyze_parallel_node(state: ScanState):
         if lh_res.full_report:
             report_bytes = json.dumps(lh_res.full_report).encode('utf-8')
             await asyncio.to_thread(save_file, state['scan_id'], "lighthouse_report", report_bytes, "application/json")
+            timings.add_bytes("lighthouse", len(report_bytes))
             
         lh_dict = asdict(lh_res)
         lh_dict['lighthouse_report_url'] = get_file_url(state['scan_id'], "lighthouse_report")
@@ -222,11 +267,13 @@ async def analyze_parallel_node(state: ScanState):
     else:
         # Save heatmaps
         if hm_res.attention_heatmap_bytes:
-            await asyncio.to_thread(save_file, state['scan_id'], "attention_heatmap", hm_res.attention_heatmap_bytes, "image/jpeg")
+            await asyncio.to_thread(save_file, state['scan_id'], "attention_heatmap", hm_res.attention_heatmap_bytes, hm_res.content_type)
         if hm_res.click_heatmap_bytes:
-            await asyncio.to_thread(save_file, state['scan_id'], "click_heatmap", hm_res.click_heatmap_bytes, "image/jpeg")
+            await asyncio.to_thread(save_file, state['scan_id'], "click_heatmap", hm_res.click_heatmap_bytes, hm_res.content_type)
+        timings.add_bytes("heatmaps", len(hm_res.attention_heatmap_bytes or b"") + len(hm_res.click_heatmap_bytes or b""))
             
         hm_dict = asdict(hm_res)
+        hm_dict['stage_timings_ms']['screenshot_capture'] = artifact.screenshot_capture_ms
         hm_dict['attention_heatmap_url'] = get_file_url(state['scan_id'], "attention_heatmap")
         hm_dict['click_heatmap_url'] = get_file_url(state['scan_id'], "click_heatmap")
         del hm_dict['attention_heatmap_bytes']
@@ -239,8 +286,14 @@ async def analyze_parallel_node(state: ScanState):
         result_list.append({"module_name": "zap_security", "status": "failed", "result_json": zap_res})
     else:
         result_list.append({"module_name": "zap_security", "status": zap_res.status, "result_json": asdict(zap_res)})
+
+    for res in result_list:
+        timings.add_bytes(res['module_name'], len(dump_json(res['result_json'])))
+        if res['status'] != "completed":
+            timings.set_status(res['module_name'], res['status'])
     
-    return {"results": result_list}
+    # Nothing after this node reads the artifact; dropping it from the state lets it go
+    return {"results": result_list, "artifact": None}
 
 # Redefine graph with super node
 workflow_parallel = StateGraph(ScanState)
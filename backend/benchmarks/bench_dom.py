@@ -0,0 +1,151 @@
+"""
+DOM analysis: the previous per-analyzer BeautifulSoup(html.parser) parse vs one shared
+ParsedDocument per page, for each available parser backend.
+
+Synthetic pages mimic large real-world DOMs: deep div nesting, card grids, long nav
+menus, dozens of external and inline scripts (including big JSON state blobs) and
+meta/link tags. Saved pages can be added with --files, e.g. from
+`curl -L https://example.com > page.html`.
+
+"legacy" runs the old analytics_seo parse plus the two whole-DOM lowercasings of
+security_hygiene; the other rows run both analyzers on one shared document, including
+the fingerprint scan that replaced those substring checks. Parse-derived results (title,
+meta description, h1 count, inline scripts) are checked against legacy so a faster
+backend can't silently change findings.
+
+Run from the backend directory:
+    python -m benchmarks.bench_dom [--rounds 3] [--files page1.html page2.html]
+"""
+import argparse
+import json
+import random
+import time
+
+from bs4 import BeautifulSoup
+
+from app.tools import analytics_seo, security_hygiene, dom
+from app.services.artifact_store import Blob
+from app.tools.page_renderer import PageArtifact
+
+def make_page(cards: int, scripts: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    parts = [
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'>",
+        "<title>Example Store - Shoes, Bags and Accessories</title>",
+        "<meta name='description' content='Find the best shoes and bags.'>",
+        "<meta property='og:title' content='Example Store'>",
+        "<link rel='canonical' href='https://example.com/'>",
+    ]
+    for i in range(20):
+        parts.append(f"<link rel='stylesheet' href='/static/css/chunk-{i}.css'>")
+    for i in range(scripts):
+        parts.append(f"<script src='https://cdn.example.com/js/vendor-{i}.js' defer></script>")
+    parts.append("<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}"
+                 "gtag('js',new Date());gtag('config','G-XXXX');</script>")
+    state = {"products": [{"id": i, "name": f"Product {i}", "price": rnd.randint(5, 500),
+                           "tags": ["sale", "new", "react"][: rnd.randint(0, 3)]} for i in range(cards)]}
+    parts.append(f"<script id='__NEXT_DATA__' type='application/json'>{json.dumps(state)}</script>")
+    parts.append("</head><body><header><nav><ul>")
+    for i in range(200):
+        parts.append(f"<li class='nav-item'><a class='nav-link' href='/category/{i}'>Category {i}</a></li>")
+    parts.append("</ul></nav></header><main><h1>Shop</h1>")
+    for i in range(cards):
+        depth = rnd.randint(3, 12)
+        parts.append("<div class='wrapper'>" * depth)
+        parts.append(
+            f"<article class='card' data-id='{i}'><img src='/img/{i}.webp' alt='Product {i}' loading='lazy'>"
+            f"<h2 class='card-title'>Product {i}</h2><p class='desc'>Lorem ipsum dolor sit amet, "
+            f"consectetur adipiscing elit <span>&amp; more</span></p>"
+            f"<button class='btn' onclick='add({i})'>Add to cart</button>"
+            f"<a href='/product/{i}'>Details</a></article>"
+        )
+        parts.append("</div>" * depth)
+        if i % 50 == 0:
+            parts.append("<!-- lazy boundary --><script>console.log('chunk')</script>")
+    parts.append("</main><footer><p>&copy; Example</p></footer></body></html>")
+    return "".join(parts)
+
+CASES = [
+    # (name, cards, external scripts)
+    ("landing_small", 50, 10),
+    ("catalog_medium", 1000, 40),
+    ("catalog_large", 5000, 80),
+]
+
+def make_artifact(html: str) -> PageArtifact:
+    return PageArtifact(
+        screenshot=Blob(), viewport={}, dom=Blob(html.encode("utf-8")), headers={}, cookies=[],
+        network_logs=[], clickable_elements=[]
+    )
+
+def legacy_analyze(html: str):
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.find("title")
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    h1s = soup.find_all("h1")
+    scripts = [s.string for s in soup.find_all("script") if s.string]
+    # security_hygiene lowercased the whole DOM once per library check
+    "jquery" in html.lower()
+    "react" in html.lower()
+    return {
+        "title": title.string if title else None,
+        "description": bool(meta_desc and meta_desc.get("content")),
+        "h1": len(h1s),
+        "inline_scripts": len(scripts),
+    }
+
+def shared_analyze(html: str, backend: str):
+    artifact = make_artifact(html)
+    artifact.document = dom.ParsedDocument(html, backend=backend)
+    seo = analytics_seo.analyze_analytics_seo(artifact)
+    sec = security_hygiene.analyze_security_hygiene(artifact)
+    doc = artifact.document
+    summary = {
+        "title": doc.title,
+        "description": bool(doc.meta.get("description")),
+        "h1": len(doc.find_all("h1")),
+        "inline_scripts": len(doc.inline_scripts),
+    }
+    return summary, seo, doc.backend_used
+
+def _time(fn, rounds):
+    best, result = None, None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--files", nargs="*", default=[], help="saved HTML pages to include")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    pages = [(name, make_page(cards, scripts)) for name, cards, scripts in CASES]
+    for path in args.files:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append((path.rsplit("/", 1)[-1], f.read()))
+
+    rows = []
+    for name, html in pages:
+        legacy_t, legacy = _time(lambda: legacy_analyze(html), args.rounds)
+        rows.append({"page": name, "kb": len(html) // 1024, "backend": "legacy",
+                     "ms": round(legacy_t * 1000, 1), "speedup": 1.0, "matches": True})
+        for backend, _ in dom.available_backends():
+            t, (summary, _, used) = _time(lambda: shared_analyze(html, backend), args.rounds)
+            rows.append({"page": name, "kb": len(html) // 1024, "backend": used,
+                         "ms": round(t * 1000, 1), "speedup": round(legacy_t / t, 1),
+                         "matches": summary == legacy})
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'page':<18}{'KB':>7}{'backend':>14}{'ms':>10}{'speedup':>9}{'matches':>9}")
+    for r in rows:
+        print(f"{r['page']:<18}{r['kb']:>7}{r['backend']:>14}{r['ms']:>10}{r['speedup']:>9}{str(r['matches']):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+End-to-end scan benchmark against local fixture sites (benchmarks.fixture_sites), with
+ZAP replaced by benchmarks.fake_zap.
+
+Tools, per site and round:
+    render_page            headless Chromium render (skipped without a browser)
+    generate_heatmaps      on the rendered (or synthetic) screenshot
+    analyze_analytics_seo  on a fresh artifact, so every round parses the DOM again
+    aggregate_report       over the module results of that site
+Each gets p50/p95 latency and the peak Python allocation of one traced extra round.
+
+Workflow: workflow.app runs whole scans at each --concurrency level, each scan in its
+own thread and event loop like background scans in the API. It reports p50/p95 scan
+latency, scans per minute, per-stage p50 from ScanTimings and the process peak RSS.
+Without a browser the render is synthetic (the fixture HTML fetched over HTTP plus a
+drawn screenshot) and the browser-bound modules fail fast; meta.render says which.
+Lighthouse is only measured when its CLI is installed. A failure of a module that only
+needs the fixtures and the fake ZAP (REQUIRED_MODULES) makes the scan an error: it is
+left out of the latencies, and the run exits with status 1. Failed stages never count
+towards stages_p50_ms.
+
+Scan files go to a scratch SQLite database (DATABASE_URL, default in the temp dir).
+
+Run from the backend directory:
+    python -m benchmarks.bench_e2e --output baseline.json
+    python -m benchmarks.bench_e2e --baseline baseline.json [--threshold 0.25]
+The second form exits with status 1 when a latency or memory metric grew, or
+throughput dropped, by more than the threshold.
+"""
+import os
+import tempfile
+
+# Before app imports: settings and the engine read DATABASE_URL at import time
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "sitesense-bench.db"))
+
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app import workflow
+from app.config import settings
+from app.migrate import upgrade_database
+from app.services.timings import ScanTimings, peak_rss_kb
+from app.tools import analytics_seo, heatmaps, page_renderer, report_aggregator, security_hygiene
+from app.tools.image_codec import encode_image
+from app.tools.zap_client import zap_client
+from benchmarks.bench_dom import make_artifact
+from benchmarks.bench_heatmaps import make_screenshot
+from benchmarks.fake_zap import FakeZap
+from benchmarks.fixture_sites import SITES, FixtureServer
+
+VIEWPORT = {"width": 1440, "height": 900}
+# Synthetic screenshot heights, roughly what Chromium renders for each fixture
+SYNTHETIC_HEIGHTS = {"small": 900, "large_dom": 12000, "many_links": 16000, "ad_heavy": 9000, "tall": 30000}
+# Modules that need no browser or external CLI, so they must succeed against the local fakes
+REQUIRED_MODULES = ("security_hygiene", "analytics_seo", "heatmaps", "zap_security", "aggregated_report")
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, min(len(ordered), int(round(pct / 100 * len(ordered) + 0.5))))
+    return ordered[rank - 1]
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in seconds]
+    return {"n": len(ms), "p50_ms": round(percentile(ms, 50), 1), "p95_ms": round(percentile(ms, 95), 1)}
+
+async def browser_available() -> Optional[str]:
+    """None when Chromium can be launched, else the reason it can't."""
+    try:
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            await browser.close()
+        return None
+    except Exception as e:
+        return str(e).strip().splitlines()[0][:200]
+
+def synthetic_artifact(site: str, html: str) -> page_renderer.PageArtifact:
+    """A PageArtifact without a browser: real fixture HTML, drawn screenshot, laid-out clickables."""
+    artifact = make_artifact(html)
+    height = SYNTHETIC_HEIGHTS.get(site, 4000)
+    artifact.screenshot_bytes = encode_image(make_screenshot(height, VIEWPORT["width"]))
+    artifact.screenshot_content_type = "image/jpeg" if settings.IMAGE_FORMAT == "jpeg" else f"image/{settings.IMAGE_FORMAT}"
+    artifact.viewport = dict(VIEWPORT)
+    clickables = artifact.document.find_all("a") + artifact.document.find_all("button")
+    per_row = 6
+    artifact.clickable_elements = [
+        {"tag": el.tag.upper(), "text": "", "href": el.get("href"),
+         "rect": {"x": 40 + (i % per_row) * 230, "y": 120 + (i // per_row) * 36 % max(height - 160, 1),
+                  "width": 180, "height": 28}}
+        for i, el in enumerate(clickables)
+    ]
+    artifact.network_logs = [{"url": src, "method": "GET", "resource_type": "script"}
+                             for src in artifact.document.script_srcs]
+    return artifact
+
+class Bench:
+    def __init__(self, sites: FixtureServer, use_browser: bool, verbose: bool):
+        self.sites = sites
+        self.use_browser = use_browser
+        self.verbose = verbose
+        self._html: Dict[str, str] = {}
+
+    def quiet(self):
+        # The pipeline logs with print(); keep the report readable
+        return contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    def html(self, site: str) -> str:
+        if site not in self._html:
+            self._html[site] = httpx.get(self.sites.url(site), timeout=30).text
+        return self._html[site]
+
+    async def artifact(self, site: str) -> page_renderer.PageArtifact:
+        if self.use_browser:
+            return await page_renderer.render_page(self.sites.url(site), f"bench-{uuid.uuid4()}")
+        return synthetic_artifact(site, self.html(site))
+
+    async def synthetic_render(self, url: str, scan_id: str, trace: bool = False, record_har: bool = False,
+                               replay_har: Optional[str] = None) -> page_renderer.PageArtifact:
+        site = url.rstrip("/").rsplit("/", 1)[-1]
+        return synthetic_artifact(site, self.html(site))
+
+    # Tools
+
+    def bench_tools(self, site_names: List[str], rounds: int) -> Dict[str, Dict[str, Any]]:
+        results: Dict[str, Dict[str, Any]] = {}
+
+        def record(tool: str, site: str, fn):
+            fn()  # warm-up: lazily compiled engines and caches stay out of the percentiles
+            times = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - start)
+            tracemalloc.start()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.setdefault(tool, {})[site] = {**summarize(times), "peak_py_mb": round(peak / 2**20, 1)}
+
+        for site in site_names:
+            with self.quiet():
+                base = asyncio.run(self.artifact(site))
+                if self.use_browser:
+                    record("render_page", site, lambda: asyncio.run(self.artifact(site)))
+                record("generate_heatmaps", site, lambda: heatmaps.generate_heatmaps(
+                    base.screenshot_bytes, base.clickable_elements, "bench"))
+                # dataclasses.replace re-runs __post_init__, so each round parses a fresh document
+                record("analyze_analytics_seo", site, lambda: analytics_seo.analyze_analytics_seo(
+                    dataclasses.replace(base)))
+                module_results = [
+                    {"module_name": "security_hygiene", "result_json": asdict(security_hygiene.analyze_security_hygiene(base))},
+                    {"module_name": "analytics_seo", "result_json": asdict(analytics_seo.analyze_analytics_seo(base))},
+                ]
+                record("aggregate_report", site, lambda: report_aggregator.aggregate_report(module_results))
+        return results
+
+    # Whole scans
+
+    async def _scan(self, site: str) -> Dict[str, Any]:
+        scan_id = f"bench-{uuid.uuid4()}"
+        timings = ScanTimings(scan_id)
+        state = {"scan_id": scan_id, "url": self.sites.url(site), "options": {}, "artifact": None,
+                 "results": [], "timings": timings}
+        start = time.perf_counter()
+        try:
+            final = await workflow.app.ainvoke(state)
+            # zap_security reports "failed" and "skipped" in its status instead of raising
+            failed = [r["module_name"] for r in final["results"] if r["status"] not in ("completed", "timeout")]
+            ok = not any(m in REQUIRED_MODULES for m in failed)
+        except Exception as e:
+            failed, ok = [f"workflow: {e}"], False
+        finally:
+            await zap_client.aclose()
+        return {"site": site, "seconds": time.perf_counter() - start, "ok": ok, "failed_modules": failed,
+                "stages": {t["stage"]: t["wall_ms"] for t in timings.as_dicts() if t["status"] == "completed"}}
+
+    def bench_workflow(self, site_names: List[str], concurrency: List[int], scans_per_level: int) -> Dict[str, Any]:
+        levels = {}
+        for workers in concurrency:
+            total = max(scans_per_level, workers)
+            jobs = [site_names[i % len(site_names)] for i in range(total)]
+            with self.quiet():
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    runs = list(pool.map(lambda site: asyncio.run(self._scan(site)), jobs))
+                elapsed = time.perf_counter() - start
+
+            ok_runs = [r for r in runs if r["ok"]]
+            stages: Dict[str, List[float]] = {}
+            for run in ok_runs:
+                for stage, ms in run["stages"].items():
+                    stages.setdefault(stage, []).append(ms / 1000)
+            failed_modules = sorted({m for run in runs for m in run["failed_modules"]})
+            levels[f"c{workers}"] = {
+                **summarize([r["seconds"] for r in ok_runs]),
+                "scans": total,
+                "errors": total - len(ok_runs),
+                "scans_per_min": round(total / elapsed * 60, 1),
+                "stages_p50_ms": {stage: summarize(times)["p50_ms"] for stage, times in sorted(stages.items())},
+                "failed_modules": failed_modules,
+                "peak_rss_mb": round(peak_rss_kb() / 1024, 1),
+            }
+        return levels
+
+# Baseline comparison
+
+def flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    """Comparable metrics: "tools.<tool>.<site>.p95_ms", "workflow.c4.scans_per_min", ..."""
+    flat = {}
+    for tool, by_site in report.get("tools", {}).items():
+        for site, stats in by_site.items():
+            for key in ("p50_ms", "p95_ms", "peak_py_mb"):
+                flat[f"tools.{tool}.{site}.{key}"] = stats[key]
+    for level, stats in report.get("workflow", {}).items():
+        for key in ("p50_ms", "p95_ms", "scans_per_min", "peak_rss_mb"):
+            flat[f"workflow.{level}.{key}"] = stats[key]
+        for stage, ms in stats.get("stages_p50_ms", {}).items():
+            flat[f"workflow.{level}.stages.{stage}.p50_ms"] = ms
+    return flat
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_ms: float) -> List[Dict[str, Any]]:
+    """Metrics that got worse than the baseline by more than threshold (a fraction)."""
+    regressions = []
+    base = flatten(baseline)
+    for key, value in flatten(current).items():
+        old = base.get(key)
+        if old is None or old <= 0:
+            continue
+        if key.endswith("scans_per_min"):
+            worse = value < old * (1 - threshold)
+        else:
+            # Tiny timings are mostly noise; require an absolute change as well
+            worse = value > old * (1 + threshold) and (not key.endswith("_ms") or value - old >= min_ms)
+        if worse:
+            regressions.append({"metric": key, "baseline": old, "current": value,
+                                "change_pct": round((value / old - 1) * 100, 1)})
+    return regressions
+
+def print_report(report: Dict[str, Any]):
+    meta = report["meta"]
+    print(f"render: {meta['render']}  python {meta['python']}  rounds {meta['rounds']}")
+    print(f"\n{'tool':<24}{'site':<12}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>9}")
+    for tool, by_site in report["tools"].items():
+        for site, s in by_site.items():
+            print(f"{tool:<24}{site:<12}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['peak_py_mb']:>9}")
+    if report["workflow"]:
+        print(f"\n{'level':<8}{'scans':>6}{'errors':>7}{'p50 ms':>10}{'p95 ms':>10}{'scans/min':>11}{'RSS MB':>9}  failed modules")
+        for level, s in report["workflow"].items():
+            print(f"{level:<8}{s['scans']:>6}{s['errors']:>7}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['scans_per_min']:>11}"
+                  f"{s['peak_rss_mb']:>9}  {', '.join(s['failed_modules']) or '-'}")
+        last = list(report["workflow"].values())[-1]
+        print("stage p50 ms (last level): " + ", ".join(f"{k} {v}" for k, v in last["stages_p50_ms"].items()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", nargs="*", default=list(SITES), choices=list(SITES))
+    parser.add_argument("--rounds", type=int, default=5, help="rounds per tool and site")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4])
+    parser.add_argument("--scans", type=int, default=10, help="whole scans per concurrency level")
+    parser.add_argument("--skip-workflow", action="store_true")
+    parser.add_argument("--synthetic-render", action="store_true", help="never launch a browser")
+    parser.add_argument("--output", help="write the report JSON here (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="compare against this report and flag regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative change")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore latency changes smaller than this")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep pipeline output")
+    args = parser.parse_args()
+
+    # Fast ZAP polling against the fake; the scan deadline stays realistic
+    settings.ZAP_POLL_INITIAL_SECONDS = 0.05
+    upgrade_database()
+
+    with FixtureServer() as sites, FakeZap(spider_seconds=0.5, alerts=100) as zap:
+        zap_client.base_url = zap.base_url
+        reason = None if args.synthetic_render else asyncio.run(browser_available())
+        use_browser = not args.synthetic_render and reason is None
+        bench = Bench(sites, use_browser, args.verbose)
+        if not use_browser:
+            workflow_render = page_renderer.render_page
+            page_renderer.render_page = bench.synthetic_render
+
+        report = {
+            "meta": {
+                "render": "browser" if use_browser else f"synthetic ({reason or 'requested'})",
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "rounds": args.rounds,
+                "sites": args.sites,
+                "zap": "fake",
+            },
+            "tools": bench.bench_tools(args.sites, args.rounds),
+            "workflow": {} if args.skip_workflow else bench.bench_workflow(args.sites, args.concurrency, args.scans),
+        }
+        if not use_browser:
+            page_renderer.render_page = workflow_render
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold, args.min_ms)
+        report["regressions"] = regressions
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+        if args.baseline:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline} (threshold {args.threshold:.0%})")
+            for r in regressions:
+                print(f"  {r['metric']}: {r['baseline']} -> {r['current']} ({r['change_pct']:+}%)")
+    errors = sum(s["errors"] for s in report["workflow"].values())
+    if errors:
+        print(f"\n{errors} scan(s) failed a module that needs no browser ({', '.join(REQUIRED_MODULES)})",
+              file=sys.stderr)
+    if regressions or errors:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Fingerprint engine: literal prefilter (one automaton pass over all sources) vs running
+every signature regex over its source, on the synthetic pages from bench_dom.
+
+The naive path is what per-signature substring/regex checks grow into as signatures are
+added. Both paths must detect the same technologies and versions.
+
+Run from the backend directory:
+    python -m benchmarks.bench_fingerprint [--rounds 3] [--files page1.html]
+"""
+import argparse
+import json
+import time
+
+from app.tools import fingerprint
+from benchmarks.bench_dom import CASES, make_artifact, make_page, _time
+
+NETWORK_URLS = [
+    "https://www.google-analytics.com/g/collect?v=2&tid=G-XXXX",
+    "https://www.googletagmanager.com/gtm.js?id=GTM-XXXX",
+    "https://connect.facebook.net/en_US/fbevents.js",
+    "https://cdn.jsdelivr.net/npm/swiper@11.0.5/swiper-bundle.min.js",
+    "https://js.stripe.com/v3/",
+    "https://fonts.gstatic.com/s/inter/v12/font.woff2",
+]
+
+def naive_detect(engine: fingerprint.FingerprintEngine, artifact):
+    """Every regex over its whole source; same dictionary checks as the engine."""
+    always = engine._always
+    engine._always = list(range(len(engine._patterns)))
+    automaton = engine._automaton
+    engine._automaton = None
+    anchors = engine._anchors
+    engine._anchors = {}
+    try:
+        return engine.detect(artifact)
+    finally:
+        engine._always, engine._automaton, engine._anchors = always, automaton, anchors
+
+def build_artifact(html: str):
+    artifact = make_artifact(html)
+    artifact.network_logs = [{"url": url, "method": "GET", "resource_type": "script"} for url in NETWORK_URLS * 50]
+    artifact.headers = {"server": "nginx/1.25.3", "x-powered-by": "Next.js", "cf-ray": "abc"}
+    artifact.cookies = [{"name": "_ga", "value": "GA1.1"}, {"name": "_fbp", "value": "fb.1"}]
+    # Parse outside the timed section; both paths share the document
+    artifact.document.tags
+    return artifact
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--files", nargs="*", default=[], help="saved HTML pages to include")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = fingerprint.get_engine()
+    compile_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    pages = [(name, make_page(cards, scripts)) for name, cards, scripts in CASES]
+    for path in args.files:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append((path.rsplit("/", 1)[-1], f.read()))
+
+    rows = []
+    for name, html in pages:
+        artifact = build_artifact(html)
+        naive_t, naive = _time(lambda: naive_detect(engine, artifact), args.rounds)
+        fast_t, fast = _time(lambda: engine.detect(artifact), args.rounds)
+        rows.append({
+            "page": name,
+            "kb": len(html) // 1024,
+            "naive_ms": round(naive_t * 1000, 1),
+            "engine_ms": round(fast_t * 1000, 1),
+            "speedup": round(naive_t / fast_t, 1),
+            "detected": len(fast),
+            "matches": [(t.name, t.version) for t in fast] == [(t.name, t.version) for t in naive],
+            "found": ", ".join(f"{t.name} {t.version}" if t.version else t.name for t in fast),
+        })
+
+    if args.json:
+        print(json.dumps({"signatures": len(engine.technologies), "patterns": len(engine._patterns),
+                          "compile_ms": compile_ms, "rows": rows}, indent=2))
+        return
+    print(f"{len(engine.technologies)} technologies, {len(engine._patterns)} text patterns, "
+          f"{len(engine._always)} without a literal; compiled in {compile_ms} ms")
+    print(f"{'page':<18}{'KB':>7}{'naive ms':>10}{'engine ms':>11}{'speedup':>9}{'found':>7}{'matches':>9}")
+    for r in rows:
+        print(f"{r['page']:<18}{r['kb']:>7}{r['naive_ms']:>10}{r['engine_ms']:>11}{r['speedup']:>9}"
+              f"{r['detected']:>7}{str(r['matches']):>9}")
+    print()
+    print("detected on", rows[-1]["page"] + ":", rows[-1]["found"])
+
+if __name__ == "__main__":
+    main()
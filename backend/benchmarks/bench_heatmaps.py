@@ -0,0 +1,218 @@
+"""
+Click heatmap rasterization: exact full-resolution reference vs the downsampled rasterizer.
+
+Reports time per call and the error of the fast map against the reference (both are
+normalized to 0-1). mean_abs_err includes overlap handling: the reference lets the last
+drawn rectangle win, the fast rasterizer takes the highest score. resample_err isolates
+the downsampling by comparing against the fast rasterizer at full scale.
+
+With --pipeline it also runs generate_heatmaps on tall synthetic screenshots under
+different HEATMAP_MEMORY_BUDGET_MB values and reports peak traced memory and the
+difference of the banded overlays from the whole-image path.
+
+With --encodings it runs the whole pipeline per output encoding, with the screenshot
+given in that encoding as the browser would capture it, and reports per-stage timings
+and byte sizes. "legacy" is the previous setup: PNG capture, OpenCV default JPEG.
+
+Run from the backend directory:
+    python -m benchmarks.bench_heatmaps [--rounds 3] [--scale 0.25] [--pipeline] [--encodings]
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.tools import heatmaps, saliency
+from app.tools.image_codec import ImageEncoding
+
+CASES = [
+    # (name, height, width, elements)
+    ("viewport_200", 900, 1440, 200),
+    ("viewport_3000", 900, 1440, 3000),
+    ("fullpage_3000", 12000, 1440, 3000),
+    ("fullpage_tall", 30000, 1440, 8000),
+]
+
+def make_elements(h: int, w: int, count: int, seed: int = 0):
+    rnd = random.Random(seed)
+    elements = []
+    for i in range(count):
+        tag = rnd.choice(["A", "A", "A", "BUTTON", "INPUT"])
+        elements.append({
+            "tag": tag,
+            "text": f"item {i}",
+            "href": f"https://example.com/{i}" if tag == "A" else None,
+            "rect": {
+                "x": rnd.uniform(-20, w),
+                "y": rnd.uniform(-20, h),
+                "width": rnd.uniform(0, 300),
+                "height": rnd.uniform(0, 60),
+            },
+        })
+    return elements
+
+def _time(fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+PIPELINE_CASES = [
+    # (name, height, width)
+    ("viewport", 900, 1440),
+    ("fullpage_8k", 8000, 1440),
+    ("fullpage_30k", 30000, 1440),
+]
+
+def make_screenshot(h: int, w: int, seed: int = 0) -> np.ndarray:
+    rnd = np.random.default_rng(seed)
+    img = np.full((h, w, 3), 245, np.uint8)
+    for _ in range(h // 15):
+        y, x = int(rnd.integers(0, h - 20)), int(rnd.integers(0, w - 200))
+        color = tuple(int(c) for c in rnd.integers(0, 200, 3))
+        cv2.putText(img, "Lorem ipsum dolor sit", (x, y + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return img
+
+def whole_image_overlays(img, elements):
+    """Unbanded reference: both overlays built at full size."""
+    attention_grid, _ = saliency.compute_attention_grid(img, settings.HEATMAP_QUALITY)
+    click_grid, _ = heatmaps.rasterize_click_grid(img.shape[:2], elements, settings.HEATMAP_CLICK_SCALE)
+    return heatmaps.overlay_grid(img, attention_grid), heatmaps.overlay_grid(img, click_grid)
+
+def bench_pipeline(budgets_mb):
+    rows = []
+    for name, h, w in PIPELINE_CASES:
+        img = make_screenshot(h, w)
+        png = cv2.imencode(".png", img)[1].tobytes()
+        elements = make_elements(h, w, 2000)
+        ref_attention, ref_click = whole_image_overlays(img, elements)
+        del img
+
+        for budget in budgets_mb:
+            settings.HEATMAP_MEMORY_BUDGET_MB = budget
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = heatmaps.generate_heatmaps(png, elements, "bench")
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            # JPEG is lossy, so compare both paths after the same encode/decode round-trip
+            diffs = []
+            for produced, reference in ((result.attention_heatmap_bytes, ref_attention),
+                                        (result.click_heatmap_bytes, ref_click)):
+                decoded = heatmaps.decode_image(produced)
+                ref_decoded = heatmaps.decode_image(heatmaps.encode_image(reference))
+                diffs.append(float(np.abs(decoded.astype(np.int16) - ref_decoded).mean()))
+
+            rows.append({
+                "case": name,
+                "size": f"{w}x{h}",
+                "budget_mb": budget,
+                "band_rows": heatmaps.band_rows_for_budget((h, w), budget * 1024 * 1024),
+                "ms": round(elapsed * 1000, 1),
+                "peak_mb": round(peak / 1e6, 1),
+                "mean_abs_diff": round(max(diffs), 3),
+            })
+    return rows
+
+ENCODINGS = [
+    # (name, capture encoding, output encoding)
+    ("legacy", ImageEncoding("png"), ImageEncoding("jpeg", quality=95, progressive=False, optimize=False)),
+    ("jpeg_q80", ImageEncoding("jpeg", quality=80), ImageEncoding("jpeg", quality=80)),
+    ("jpeg_q80_prog", ImageEncoding("jpeg", quality=80), ImageEncoding("jpeg", quality=80, progressive=True)),
+    ("jpeg_q60", ImageEncoding("jpeg", quality=60), ImageEncoding("jpeg", quality=60)),
+    ("webp_q80", ImageEncoding("webp", quality=80), ImageEncoding("webp", quality=80)),
+]
+
+def bench_encodings(rounds: int):
+    rows = []
+    for case, h, w in PIPELINE_CASES[:2]:
+        img = make_screenshot(h, w)
+        elements = make_elements(h, w, 1000)
+        for name, capture, output in ENCODINGS:
+            screenshot = heatmaps.encode_image(img, capture)
+            best = None
+            for _ in range(rounds):
+                result = heatmaps.generate_heatmaps(screenshot, elements, "bench", encoding=output)
+                total = sum(result.stage_timings_ms.values())
+                if best is None or total < best[0]:
+                    best = (total, result)
+            total, result = best
+            rows.append({
+                "case": case,
+                "encoding": name,
+                **{f"{stage}_ms": ms for stage, ms in result.stage_timings_ms.items()},
+                "total_ms": round(total, 1),
+                **{f"{key}_kb": round(size / 1024, 1) for key, size in result.byte_sizes.items()},
+            })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=0.25)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--pipeline", action="store_true", help="also benchmark banded generate_heatmaps")
+    parser.add_argument("--budgets", default="1024,256,64", help="comma-separated memory budgets in MB")
+    parser.add_argument("--encodings", action="store_true", help="also compare output encodings end to end")
+    args = parser.parse_args()
+
+    # Warm up OpenCV and NumPy so the first case isn't charged for it
+    heatmaps.rasterize_click_map((100, 100), make_elements(100, 100, 10), args.scale)
+
+    rows = []
+    for name, h, w, count in CASES:
+        elements = make_elements(h, w, count)
+        exact_t, (exact, exact_scored) = _time(lambda: heatmaps.rasterize_click_map_exact((h, w), elements), args.rounds)
+        fast_t, (fast, fast_scored) = _time(lambda: heatmaps.rasterize_click_map((h, w), elements, args.scale), args.rounds)
+        assert fast.shape == exact.shape
+        assert len(fast_scored) == len(exact_scored)
+        err = np.abs(fast - exact)
+        full_scale, _ = heatmaps.rasterize_click_map((h, w), elements, 1.0)
+        rows.append({
+            "case": name,
+            "size": f"{w}x{h}",
+            "elements": count,
+            "exact_ms": round(exact_t * 1000, 1),
+            "fast_ms": round(fast_t * 1000, 1),
+            "speedup": round(exact_t / fast_t, 1),
+            "mean_abs_err": round(float(err.mean()), 4),
+            "p99_abs_err": round(float(np.percentile(err, 99)), 4),
+            "resample_err": round(float(np.abs(fast - full_scale).mean()), 4),
+        })
+
+    pipeline_rows = bench_pipeline([int(b) for b in args.budgets.split(",")]) if args.pipeline else []
+    encoding_rows = bench_encodings(args.rounds) if args.encodings else []
+
+    if args.json:
+        print(json.dumps({"rasterize": rows, "pipeline": pipeline_rows, "encodings": encoding_rows}, indent=2))
+        return
+    print(f"{'case':<16}{'size':>12}{'elems':>7}{'exact ms':>10}{'fast ms':>9}{'speedup':>9}{'mean err':>10}{'p99 err':>9}{'resample':>10}")
+    for r in rows:
+        print(f"{r['case']:<16}{r['size']:>12}{r['elements']:>7}{r['exact_ms']:>10}{r['fast_ms']:>9}"
+              f"{r['speedup']:>9}{r['mean_abs_err']:>10}{r['p99_abs_err']:>9}{r['resample_err']:>10}")
+
+    if pipeline_rows:
+        print()
+        print(f"{'case':<16}{'size':>12}{'budget MB':>11}{'band rows':>11}{'ms':>9}{'peak MB':>9}{'diff':>8}")
+        for r in pipeline_rows:
+            print(f"{r['case']:<16}{r['size']:>12}{r['budget_mb']:>11}{r['band_rows']:>11}{r['ms']:>9}"
+                  f"{r['peak_mb']:>9}{r['mean_abs_diff']:>8}")
+
+    if encoding_rows:
+        print()
+        columns = list(encoding_rows[0].keys())
+        print("".join(f"{c:>22}" if i > 1 else f"{c:<14}" for i, c in enumerate(columns)))
+        for r in encoding_rows:
+            print("".join(f"{r[c]:>22}" if i > 1 else f"{r[c]:<14}" for i, c in enumerate(columns)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Size and throughput benchmark for ModuleResult.result_json storage.
+
+Builds synthetic ZAP, accessibility and heatmap results shaped like the real module
+output and compares plain JSON against each codec in app.db_types.
+
+Run from the backend directory:
+    python -m benchmarks.bench_result_json [--alerts 2000] [--rounds 20]
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+from app.db_types import compress_json, decompress_json, zstandard
+from app.result_json_dictionary import DICTIONARIES, CURRENT_VERSION, _ZAP_TEXT, _AXE_TEXT
+
+def make_zap_result(alerts: int):
+    names = [t for t in _ZAP_TEXT if len(t) < 80]
+    descriptions = [t for t in _ZAP_TEXT if len(t) >= 80]
+    rnd = random.Random(1)
+    return {
+        "issues": [
+            {
+                "risk": rnd.choice(["Informational", "Low", "Medium", "High"]),
+                "confidence": rnd.choice(["Low", "Medium", "High"]),
+                "name": rnd.choice(names),
+                "description": rnd.choice(descriptions),
+                "url": f"https://example.com/catalog/item/{rnd.randint(1, 10**6)}?ref=nav",
+                "solution": rnd.choice(descriptions),
+            }
+            for _ in range(alerts)
+        ],
+        "status": "completed",
+    }
+
+def make_accessibility_result(violations: int, nodes: int):
+    rnd = random.Random(2)
+    return {
+        "score": 62,
+        "issues": [
+            {
+                "id": f"rule-{i}",
+                "impact": rnd.choice(["minor", "moderate", "serious", "critical"]),
+                "description": rnd.choice(_AXE_TEXT[:16]),
+                "help_url": f"https://dequeuniversity.com/rules/axe/4.7/rule-{i}?application=axeAPI",
+                "nodes": [f"#main > div:nth-child({n}) > a.product-link" for n in range(nodes)],
+            }
+            for i in range(violations)
+        ],
+    }
+
+def make_heatmap_result(elements: int):
+    rnd = random.Random(3)
+    return {
+        "elements": [
+            {
+                "tag": rnd.choice(["a", "button", "input"]),
+                "text": f"Product {i}",
+                "score": rnd.choice([0.5, 0.6, 0.8]),
+                "rect": {"x": rnd.uniform(0, 1440), "y": rnd.uniform(0, 9000), "width": 120.5, "height": 24.0},
+            }
+            for i in range(elements)
+        ],
+        "attention_heatmap_url": "/files/00000000-0000-0000-0000-000000000000/attention_heatmap",
+        "click_heatmap_url": "/files/00000000-0000-0000-0000-000000000000/click_heatmap",
+    }
+
+def _time(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        out = fn()
+    return (time.perf_counter() - start) / rounds, out
+
+def bench_payload(name, payload, rounds):
+    raw = json.dumps(payload).encode()
+    codecs = {
+        "json": (lambda: json.dumps(payload).encode(), lambda b: json.loads(b)),
+        "gzip": (lambda: gzip.compress(raw), lambda b: json.loads(gzip.decompress(b))),
+        "zlib+dict": (lambda: compress_json(payload, codec="gzip"), decompress_json),
+    }
+    if zstandard is not None:
+        plain = zstandard.ZstdCompressor(level=9)
+        codecs["zstd"] = (lambda: plain.compress(raw), lambda b: json.loads(zstandard.ZstdDecompressor().decompress(b)))
+        for level in (3, 9, 19):
+            codecs[f"zstd+dict/{level}"] = (
+                lambda level=level: compress_json(payload, codec="zstd", level=level), decompress_json
+            )
+
+    rows = []
+    for codec, (encode, decode) in codecs.items():
+        enc_time, blob = _time(encode, rounds)
+        dec_time, decoded = _time(lambda: decode(blob), rounds)
+        assert decoded == payload, f"{codec} round-trip mismatch"
+        rows.append({
+            "payload": name,
+            "codec": codec,
+            "bytes": len(blob),
+            "ratio": round(len(raw) / len(blob), 2),
+            "encode_mb_s": round(len(raw) / enc_time / 1e6, 1),
+            "decode_mb_s": round(len(raw) / dec_time / 1e6, 1),
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    payloads = {
+        "zap_small": make_zap_result(20),
+        "zap_large": make_zap_result(args.alerts),
+        "accessibility": make_accessibility_result(25, 40),
+        "heatmaps": make_heatmap_result(3000),
+    }
+    rows = []
+    for name, payload in payloads.items():
+        rows.extend(bench_payload(name, payload, args.rounds))
+
+    if args.json:
+        print(json.dumps({"dictionary_version": CURRENT_VERSION,
+                          "dictionary_bytes": len(DICTIONARIES[CURRENT_VERSION]),
+                          "results": rows}, indent=2))
+        return
+
+    print(f"{'payload':<14}{'codec':<14}{'bytes':>10}{'ratio':>8}{'enc MB/s':>10}{'dec MB/s':>10}")
+    for r in rows:
+        print(f"{r['payload']:<14}{r['codec']:<14}{r['bytes']:>10}{r['ratio']:>8}{r['encode_mb_s']:>10}{r['decode_mb_s']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Application startup time, each measurement in a fresh interpreter (what a cold start
+or a uvicorn --reload pays):
+
+    config     import app.config (settings)
+    main       import app.main (the ASGI app and routers)
+    ready      import app.main and run the lifespan (migrations, writer, collector)
+    workflow   import app.workflow after app.main, i.e. what the first scan adds
+
+--top N lists the N slowest modules (cumulative, from python -X importtime) under
+app.main, to see what a regression pulled in.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup [--rounds 5] [--top 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each snippet prints its own elapsed seconds, so interpreter startup is excluded
+STAGES = {
+    "config": "import app.config",
+    "main": "import app.main",
+    "ready": (
+        "import app.main\n"
+        "from fastapi.testclient import TestClient\n"
+        "with TestClient(app.main.app):\n"
+        "    pass"
+    ),
+    "workflow": (
+        "import app.main\n"
+        "start = time.perf_counter()\n"
+        "import app.workflow"
+    ),
+}
+
+def run_stage(code: str, env) -> float:
+    script = "import time\nstart = time.perf_counter()\n" + code + "\nprint(time.perf_counter() - start)\n"
+    out = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def import_times(env, top: int):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND_DIR,
+                         env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            rows.append((int(cumulative), name.strip()))
+        except ValueError:  # header line
+            continue
+    # rows[0] is app.main itself
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in rows[1:top + 1]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also list the slowest imports under app.main")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+                   RETENTION_ENABLED="false")
+        rows = []
+        for stage, code in STAGES.items():
+            times = [run_stage(code, env) for _ in range(args.rounds)]
+            rows.append({"stage": stage, "median_ms": round(statistics.median(times) * 1000, 1),
+                         "min_ms": round(min(times) * 1000, 1), "max_ms": round(max(times) * 1000, 1)})
+        slowest = import_times(env, args.top) if args.top else []
+
+    if args.json:
+        print(json.dumps({"stages": rows, "slowest_imports": slowest}, indent=2))
+        return
+    print(f"{'stage':<10}{'median ms':>11}{'min ms':>9}{'max ms':>9}")
+    for r in rows:
+        print(f"{r['stage']:<10}{r['median_ms']:>11}{r['min_ms']:>9}{r['max_ms']:>9}")
+    if slowest:
+        print(f"\n{'cumulative ms':>14}  module")
+        for r in slowest:
+            print(f"{r['cumulative_ms']:>14}  {r['module']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+ZAP alert ingestion: the previous single core/view/alerts call with one ZapIssue per
+alert instance vs paged retrieval deduplicated into AlertGroups.
+
+Runs against benchmarks.fake_zap with a growing number of synthetic alerts (25 alert
+types spread over many URLs, like a header missing on every page) and reports wall
+time, peak Python memory while ingesting, and the size of the stored result JSON. The
+deduplicated result should stay the same size however many alerts there are.
+Paging trades some wall time (one round trip per page) for memory that stays flat.
+
+Run from the backend directory:
+    python -m benchmarks.bench_zap_alerts [--alerts 1000 10000 50000] [--page-size 500]
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from dataclasses import asdict
+
+from app.config import settings
+from app.tools import security_zap
+from app.tools.zap_client import ZapClient
+from benchmarks.fake_zap import FakeZap, make_alerts
+
+TARGET = "https://example.com"
+
+async def legacy_ingest(client: ZapClient):
+    alerts = await client.alerts(TARGET)
+    issues = [
+        security_zap.ZapIssue(
+            risk=a.get("risk"), confidence=a.get("confidence"), name=a.get("alert"),
+            description=a.get("description"), url=a.get("url"), solution=a.get("solution"),
+        )
+        for a in alerts
+    ]
+    return security_zap.ZapResult(issues=issues, status="completed")
+
+async def paged_ingest(client: ZapClient, page_size: int):
+    groups = security_zap.AlertGroups()
+    async for page in client.iter_alerts(TARGET, page_size):
+        for alert in page:
+            groups.add(alert)
+    return security_zap.ZapResult(issues=groups.issues(), status="completed", alert_count=groups.total)
+
+def measure(fn):
+    # Timed untraced; tracemalloc slows allocation-heavy code down several times
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, nargs="*", default=[1000, 10000, 50000])
+    parser.add_argument("--page-size", type=int, default=settings.ZAP_ALERTS_PAGE_SIZE)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.alerts:
+        with FakeZap(alerts=0) as zap:
+            zap.alerts.extend(make_alerts(count, TARGET))
+            client = ZapClient(base_url=zap.base_url)
+
+            async def run(ingest):
+                try:
+                    return await ingest()
+                finally:
+                    await client.aclose()
+
+            for mode, ingest in (("legacy", lambda: legacy_ingest(client)),
+                                 ("paged", lambda: paged_ingest(client, args.page_size))):
+                t, peak, result = measure(lambda: asyncio.run(run(ingest)))
+                payload = json.dumps(asdict(result))
+                rows.append({"alerts": count, "mode": mode, "ms": round(t * 1000, 1),
+                             "peak_mb": round(peak / 2**20, 1), "issues": len(result.issues),
+                             "result_kb": round(len(payload) / 1024, 1)})
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'alerts':>8}{'mode':>8}{'ms':>10}{'peak MB':>9}{'issues':>8}{'result KB':>11}")
+    for r in rows:
+        print(f"{r['alerts']:>8}{r['mode']:>8}{r['ms']:>10}{r['peak_mb']:>9}{r['issues']:>8}{r['result_kb']:>11}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Minimal fake ZAP JSON API for exercising the ZAP client without a real ZAP.
+
+Implements core version, alerts (paged with start/count), numberOfMessages and messages
+(both filtered by baseurl, paged from start 0), spider scan/status/stop/setOptionMaxDepth,
+pscan recordsToScan and exim importHar. The spider's progress is time-based (reaches 100 after
+--spider-seconds), and every API request is recorded so callers can check polling and
+stop behavior. Failures can be injected: the first --fail-first requests answer 503 and
+--latency delays every answer.
+
+It is also a proxy stand-in: plain-HTTP requests in absolute form are forwarded and
+CONNECT is tunnelled (without TLS interception). Each proxied or HAR-imported message
+is queued for "passive scanning", drained at --passive-rate messages per second, and
+adds header alerts for its URL. A spider adds one message per page it reports alerts for
+(without header alerts). Messages get increasing history ids, and the passive queue
+drains in id order like ZAP's. Synthetic --alerts are reported for spidered targets.
+
+Standalone:
+    python -m benchmarks.fake_zap --port 8090 --spider-seconds 5 --alerts 200
+then run the backend with ZAP_PORT=8090.
+
+In-process:
+    with FakeZap(spider_seconds=1) as zap:
+        client = ZapClient(base_url=zap.base_url)
+"""
+import argparse
+import json
+import select
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+RISKS = ["High", "Medium", "Low", "Informational"]
+
+# Header checks applied to every passively scanned message: (header, alert name, risk)
+PASSIVE_RULES = [
+    ("x-content-type-options", "X-Content-Type-Options Header Missing", "Low"),
+    ("x-frame-options", "Missing Anti-clickjacking Header", "Medium"),
+    ("content-security-policy", "Content Security Policy (CSP) Header Not Set", "Medium"),
+]
+
+def passive_alerts(url: str, headers: Dict[str, str]) -> List[Dict[str, Any]]:
+    present = {k.lower() for k in headers}
+    return [
+        {"alert": name, "name": name, "risk": risk, "confidence": "Medium",
+         "description": f"{header} was not set.", "solution": f"Set {header}.", "url": url,
+         "pluginId": str(10020 + i)}
+        for i, (header, name, risk) in enumerate(PASSIVE_RULES) if header not in present
+    ]
+
+def make_alerts(count: int, base_url: str = "https://example.com") -> List[Dict[str, Any]]:
+    alerts = []
+    for i in range(count):
+        name = f"Synthetic alert {i % 25}"
+        alerts.append({
+            "id": str(i),
+            "pluginId": str(10000 + i % 25),
+            "alert": name,
+            "name": name,
+            "risk": RISKS[i % len(RISKS)],
+            "confidence": "Medium",
+            "description": f"Description of {name}.",
+            "solution": f"Fix {name}.",
+            "url": f"{base_url}/page/{i // 25}",
+        })
+    return alerts
+
+class FakeZap:
+    def __init__(self, port: int = 0, spider_seconds: float = 2.0, alerts: int = 50,
+                 latency: float = 0.0, fail_first: int = 0, api_key: str = "", passive_rate: float = 200.0):
+        self.spider_seconds = spider_seconds
+        self.alert_count = alerts
+        self.latency = latency
+        self.fail_first = fail_first
+        self.api_key = api_key
+        self.passive_rate = passive_rate
+        self.requests: List[str] = []
+        self.spiders: Dict[str, Dict[str, Any]] = {}
+        self.max_depth: Optional[int] = None
+        # Messages seen through the proxy, HAR imports or the spider: (url, response headers);
+        # a message's history id is its position + 1
+        self.messages: List[Any] = []
+        self.alerts: List[Dict[str, Any]] = []
+        self._passive_queue: List[float] = []  # enqueue times
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path: str) -> int:
+        with self._lock:
+            return sum(1 for p in self.requests if p == path)
+
+    def start(self) -> "FakeZap":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def record_message(self, url: str, headers: Dict[str, str], alerts: bool = True):
+        with self._lock:
+            self.messages.append((url, headers))
+            self._passive_queue.append(time.monotonic())
+            if alerts:
+                self.alerts.extend(passive_alerts(url, headers))
+
+    def message_views(self, base_url: str = "") -> List[Dict[str, str]]:
+        with self._lock:
+            return [{"id": str(i + 1), "requestHeader": f"GET {url} HTTP/1.1"}
+                    for i, (url, _) in enumerate(self.messages) if url.startswith(base_url)]
+
+    def records_to_scan(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            if not self._passive_queue:
+                return 0
+            # Drained in order at passive_rate messages per second from the first enqueue
+            done = int((now - self._passive_queue[0]) * self.passive_rate)
+            if done >= len(self._passive_queue):
+                self._passive_queue.clear()
+                return 0
+            return len(self._passive_queue) - done
+
+    def _spider_progress(self, scan: str) -> int:
+        spider = self.spiders.get(scan)
+        if spider is None:
+            return 0
+        if spider["stopped"]:
+            return spider["stopped_at"]
+        elapsed = time.monotonic() - spider["started"]
+        return min(100, int(elapsed / max(self.spider_seconds, 1e-6) * 100))
+
+    def handle(self, path: str, params: Dict[str, str]) -> Dict[str, Any]:
+        if path == "/JSON/core/view/version/":
+            return {"version": "2.14.0"}
+        if path == "/JSON/spider/action/scan/":
+            with self._lock:
+                scan = str(len(self.spiders))
+                self.spiders[scan] = {"url": params.get("url"), "started": time.monotonic(),
+                                      "stopped": False, "stopped_at": 0, "max_depth": self.max_depth}
+                self.alerts.extend(make_alerts(self.alert_count, params.get("url", "").rstrip("/")))
+            base = params.get("url", "").rstrip("/")
+            for page in range(self.alert_count // 25 + 1):
+                self.record_message(f"{base}/page/{page}", {}, alerts=False)
+            return {"scan": scan}
+        if path == "/JSON/spider/action/setOptionMaxDepth/":
+            self.max_depth = int(params.get("Integer", 0))
+            return {"Result": "OK"}
+        if path == "/JSON/core/view/numberOfMessages/":
+            return {"numberOfMessages": str(len(self.message_views(params.get("baseurl", ""))))}
+        if path == "/JSON/core/view/messages/":
+            messages = self.message_views(params.get("baseurl", ""))
+            start, count = int(params.get("start") or 0), int(params.get("count") or 0)
+            return {"messages": messages[start:start + count] if count > 0 else messages[start:]}
+        if path == "/JSON/pscan/view/recordsToScan/":
+            return {"recordsToScan": str(self.records_to_scan())}
+        if path == "/JSON/exim/action/importHar/":
+            with open(params["filePath"], encoding="utf-8") as f:
+                har = json.load(f)
+            for entry in har.get("log", {}).get("entries", []):
+                headers = {h["name"]: h["value"] for h in entry.get("response", {}).get("headers", [])}
+                self.record_message(entry["request"]["url"], headers)
+            return {"Result": "OK"}
+        if path == "/JSON/spider/view/status/":
+            return {"status": str(self._spider_progress(params.get("scanId", "")))}
+        if path == "/JSON/spider/action/stop/":
+            spider = self.spiders.get(params.get("scanId", ""))
+            if spider is not None and not spider["stopped"]:
+                spider["stopped_at"] = self._spider_progress(params["scanId"])
+                spider["stopped"] = True
+            return {"Result": "OK"}
+        if path == "/JSON/core/view/alerts/":
+            base = params.get("baseurl", "")
+            start, count = int(params.get("start") or 0), int(params.get("count") or 0)
+            with self._lock:
+                alerts = [a for a in self.alerts if a["url"].startswith(base)]
+            return {"alerts": alerts[start:start + count] if count > 0 else alerts[start:]}
+        raise KeyError(path)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_CONNECT(self):
+                # HTTPS through the proxy: a blind tunnel, recorded by host only
+                host, _, port = self.path.partition(":")
+                try:
+                    upstream = socket.create_connection((host, int(port or 443)), timeout=10)
+                except OSError:
+                    return self.send_error(502)
+                fake.record_message(f"https://{host}/", {"x-content-type-options": "", "x-frame-options": "",
+                                                         "content-security-policy": ""})
+                self.send_response(200, "Connection Established")
+                self.end_headers()
+                sockets = [self.connection, upstream]
+                try:
+                    while True:
+                        readable, _, _ = select.select(sockets, [], [], 10)
+                        if not readable:
+                            break
+                        for sock in readable:
+                            data = sock.recv(65536)
+                            if not data:
+                                return
+                            (upstream if sock is self.connection else self.connection).sendall(data)
+                finally:
+                    upstream.close()
+
+            def _proxy(self):
+                request = urllib.request.Request(self.path, method=self.command, headers={
+                    k: v for k, v in self.headers.items() if k.lower() not in ("proxy-connection", "connection")
+                })
+                try:
+                    with urllib.request.urlopen(request, timeout=10) as resp:
+                        status, headers, body = resp.status, dict(resp.headers.items()), resp.read()
+                except urllib.error.HTTPError as e:
+                    status, headers, body = e.code, dict(e.headers.items()), e.read()
+                except OSError:
+                    return self.send_error(502)
+                fake.record_message(self.path, headers)
+                self.send_response(status)
+                for k, v in headers.items():
+                    if k.lower() not in ("transfer-encoding", "connection", "content-length"):
+                        self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("http://"):
+                    return self._proxy()
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                with fake._lock:
+                    fake.requests.append(parsed.path)
+                    failing = len(fake.requests) <= fake.fail_first
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                if failing:
+                    return self._send(503, {"code": "service_unavailable"})
+                if fake.api_key and self.headers.get("X-ZAP-API-Key") != fake.api_key:
+                    return self._send(403, {"code": "bad_api_key"})
+                try:
+                    return self._send(200, fake.handle(parsed.path, params))
+                except KeyError:
+                    return self._send(404, {"code": "bad_view"})
+
+            def _send(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--spider-seconds", type=float, default=5.0)
+    parser.add_argument("--alerts", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--passive-rate", type=float, default=200.0, help="passive scan messages per second")
+    args = parser.parse_args()
+
+    zap = FakeZap(args.port, args.spider_seconds, args.alerts, args.latency, args.fail_first, args.api_key,
+                  args.passive_rate)
+    print(f"Fake ZAP listening on {zap.base_url}")
+    try:
+        zap._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        zap._server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Local fixture sites for end-to-end benchmarks, served from memory on 127.0.0.1.
+
+    small       a small static landing page
+    large_dom   ~5000 product cards in deep nesting, 80 external scripts (bench_dom's page)
+    many_links  navigation-heavy page with thousands of links and buttons
+    ad_heavy    tag manager, ad and tracker scripts, pixels and iframes from slow endpoints
+    tall        a very long page (~30k px) for full-page screenshots and heatmaps
+
+Every page is deterministic, so runs are comparable. Slow endpoints (/slow/...) answer
+after ?ms= milliseconds, like third-party ad servers.
+
+Standalone:
+    python -m benchmarks.fixture_sites --port 8765
+In-process:
+    with FixtureServer() as sites:
+        sites.url("large_dom")
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.bench_dom import make_page
+
+def small_page() -> str:
+    return (
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'><title>Small Co</title>"
+        "<meta name='description' content='A small static site.'>"
+        "<meta name='viewport' content='width=device-width, initial-scale=1'>"
+        "<link rel='stylesheet' href='/static/site.css'></head><body>"
+        "<header><nav><a href='/'>Home</a> <a href='/about'>About</a> <a href='/contact'>Contact</a></nav></header>"
+        "<main><h1>Welcome</h1><p>We make things.</p><button onclick='void 0'>Get started</button>"
+        "<img src='/static/hero.svg' alt='Hero' width='800' height='400'></main>"
+        "<footer><p>&copy; Small Co</p></footer></body></html>"
+    )
+
+def many_links_page(links: int = 4000, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    parts = ["<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'><title>Directory</title>",
+             "<meta name='description' content='Everything, linked.'></head><body><h1>Directory</h1>"]
+    for section in range(links // 100):
+        parts.append(f"<section><h2>Section {section}</h2><ul>")
+        for i in range(100):
+            n = section * 100 + i
+            if rnd.random() < 0.1:
+                parts.append(f"<li><button class='btn' data-n='{n}'>Action {n}</button></li>")
+            else:
+                parts.append(f"<li><a href='/item/{n}'>Item {n}</a></li>")
+        parts.append("</ul></section>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def ad_heavy_page(slow_ms: int = 400) -> str:
+    parts = [
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'><title>News Today</title>",
+        "<meta name='description' content='Breaking news.'>",
+        "<script async src='/slow/gtm.js?id=GTM-XXXX&ms=150'></script>",
+        "<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}"
+        "gtag('js',new Date());gtag('config','G-BENCH');</script>",
+        "<script>!function(f,b,e,v,n,t,s){}(window,document,'script','/slow/fbevents.js');fbq('init','1');</script>",
+    ]
+    for i in range(12):
+        parts.append(f"<script async src='/slow/ads/prebid-{i}.js?ms={slow_ms}'></script>")
+    parts.append("</head><body><h1>Headlines</h1>")
+    for i in range(60):
+        parts.append(f"<article><h2>Story {i}</h2><p>{'Lorem ipsum dolor sit amet. ' * 12}</p>"
+                     f"<a href='/story/{i}'>Read more</a></article>")
+        if i % 6 == 0:
+            parts.append(f"<iframe src='/slow/ads/slot-{i}.html?ms={slow_ms}' width='300' height='250'></iframe>"
+                         f"<img src='/slow/pixel.gif?slot={i}&ms={slow_ms // 2}' width='1' height='1' alt=''>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def tall_page(sections: int = 120) -> str:
+    parts = ["<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'><title>Long read</title>",
+             "<style>section{height:250px;padding:20px;border-bottom:1px solid #ccc}"
+             "section:nth-child(odd){background:#f4f6fb}</style></head><body><h1>A very long page</h1>"]
+    for i in range(sections):
+        parts.append(f"<section><h2>Chapter {i}</h2><p>{'Text ' * 80}</p>"
+                     f"<a href='/chapter/{i}'>Continue</a> <button>Like</button></section>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+SITES: Dict[str, Callable[[], str]] = {
+    "small": small_page,
+    "large_dom": lambda: make_page(5000, 80),
+    "many_links": many_links_page,
+    "ad_heavy": ad_heavy_page,
+    "tall": tall_page,
+}
+
+STATIC_TYPES = {".js": "application/javascript", ".css": "text/css", ".svg": "image/svg+xml",
+                ".gif": "image/gif", ".html": "text/html; charset=utf-8", ".webp": "image/webp"}
+# 1x1 transparent GIF
+PIXEL = bytes.fromhex("47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b")
+
+class FixtureServer:
+    def __init__(self, port: int = 0):
+        self.pages = {name: build() for name, build in SITES.items()}
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, site: str) -> str:
+        return f"{self.base_url}/{site}/"
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = parse_qs(parsed.query)
+                path = parsed.path
+                if path.startswith("/slow/"):
+                    time.sleep(int(params.get("ms", ["300"])[0]) / 1000)
+                site = path.strip("/").split("/", 1)[0]
+                if path.rstrip("/") == f"/{site}" and site in pages:
+                    return self._send(200, pages[site].encode(), "text/html; charset=utf-8")
+                if path.endswith(".gif"):
+                    return self._send(200, PIXEL, "image/gif")
+                ext = "." + path.rsplit(".", 1)[-1] if "." in path.rsplit("/", 1)[-1] else ".html"
+                body = b"<p>fixture</p>" if ext == ".html" else b"/* fixture */"
+                return self._send(200, body, STATIC_TYPES.get(ext, "application/octet-stream"))
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = FixtureServer(args.port)
+    for name in SITES:
+        print(f"{name:<12} {server.url(name)}  ({len(server.pages[name]) // 1024} KB)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+if __name__ == "__main__":
+    main()
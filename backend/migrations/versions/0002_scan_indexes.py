@@ -0,0 +1,37 @@
+"""indexes and unique (scan_id, file_type) on files
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Older rows may hold duplicate artifacts per scan; keep the newest before enforcing uniqueness
+    op.execute(
+        "DELETE FROM files WHERE id NOT IN "
+        "(SELECT MAX(id) FROM files GROUP BY scan_id, file_type)"
+    )
+
+    # A unique index (rather than a table constraint) avoids a table rebuild on SQLite
+    # and is a valid ON CONFLICT target on both SQLite and Postgres.
+    op.create_index('uq_files_scan_id_file_type', 'files', ['scan_id', 'file_type'], unique=True)
+    op.create_index('ix_module_results_scan_id', 'module_results', ['scan_id'])
+    op.create_index('ix_scans_created_at', 'scans', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scans_created_at', table_name='scans')
+    op.drop_index('ix_module_results_scan_id', table_name='module_results')
+    op.drop_index('uq_files_scan_id_file_type', table_name='files')
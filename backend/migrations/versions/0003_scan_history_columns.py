@@ -0,0 +1,93 @@
+"""scan domain and overall_score columns, keyset indexes for scan history
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+from urllib.parse import urlparse
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 1000
+
+
+def _backfill(bind) -> None:
+    scans = sa.table(
+        'scans',
+        sa.column('id', sa.String),
+        sa.column('url', sa.String),
+        sa.column('domain', sa.String),
+        sa.column('overall_score', sa.Integer),
+    )
+    module_results = sa.table(
+        'module_results',
+        sa.column('scan_id', sa.String),
+        sa.column('module_name', sa.String),
+        sa.column('result_json', sa.JSON),
+    )
+
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.select(scans.c.id, scans.c.url)
+            .where(scans.c.id > last_id)
+            .order_by(scans.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        reports = dict(bind.execute(
+            sa.select(module_results.c.scan_id, module_results.c.result_json)
+            .where(
+                module_results.c.module_name == 'aggregated_report',
+                module_results.c.scan_id.in_([r.id for r in rows]),
+            )
+        ).all())
+
+        for row in rows:
+            report = reports.get(row.id) or {}
+            bind.execute(
+                scans.update()
+                .where(scans.c.id == row.id)
+                .values(
+                    domain=(urlparse(row.url).hostname or "").lower() or None,
+                    overall_score=report.get('overall_score'),
+                )
+            )
+
+
+def upgrade() -> None:
+    op.add_column('scans', sa.Column('domain', sa.String(), nullable=True))
+    op.add_column('scans', sa.Column('overall_score', sa.Integer(), nullable=True))
+
+    _backfill(op.get_bind())
+
+    op.drop_index('ix_scans_created_at', table_name='scans')
+    op.create_index('ix_scans_created_at_id', 'scans', ['created_at', 'id'])
+    op.create_index('ix_scans_url_created_at_id', 'scans', ['url', 'created_at', 'id'])
+    op.create_index('ix_scans_domain_created_at_id', 'scans', ['domain', 'created_at', 'id'])
+    op.create_index('ix_scans_status_created_at_id', 'scans', ['status', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scans_status_created_at_id', table_name='scans')
+    op.drop_index('ix_scans_domain_created_at_id', table_name='scans')
+    op.drop_index('ix_scans_url_created_at_id', table_name='scans')
+    op.drop_index('ix_scans_created_at_id', table_name='scans')
+    op.create_index('ix_scans_created_at', 'scans', ['created_at'])
+
+    with op.batch_alter_table('scans') as batch_op:
+        batch_op.drop_column('overall_score')
+        batch_op.drop_column('domain')
@@ -0,0 +1,99 @@
+"""store module_results.result_json as compressed bytes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db_types import compress_json, decompress_json, is_compressed
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 500
+
+module_results = sa.table(
+    'module_results',
+    sa.column('id', sa.Integer),
+    sa.column('result_json', sa.LargeBinary),
+)
+
+
+def _rewrite(bind, convert) -> None:
+    """Rewrites result_json in id order, BATCH rows per statement round."""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(module_results.c.id, module_results.c.result_json)
+            .where(module_results.c.id > last_id)
+            .order_by(module_results.c.id)
+            .limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = [
+            {'row_id': row.id, 'value': new_value}
+            for row in rows
+            for new_value in [convert(row.result_json)]
+            if new_value is not None
+        ]
+        if updates:
+            bind.execute(
+                module_results.update()
+                .where(module_results.c.id == sa.bindparam('row_id'))
+                .values(result_json=sa.bindparam('value')),
+                updates,
+            )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.alter_column(
+            'module_results', 'result_json',
+            type_=sa.LargeBinary(),
+            postgresql_using="convert_to(result_json::text, 'UTF8')",
+        )
+    else:
+        with op.batch_alter_table('module_results') as batch_op:
+            batch_op.alter_column('result_json', type_=sa.LargeBinary(), existing_type=sa.JSON())
+
+    def _compress(value):
+        if value is None or is_compressed(value):
+            return None
+        return compress_json(decompress_json(value))
+
+    _rewrite(bind, _compress)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    def _decompress(value):
+        if value is None or not is_compressed(value):
+            return None
+        return json.dumps(decompress_json(value)).encode('utf-8')
+
+    _rewrite(bind, _decompress)
+
+    if bind.dialect.name == 'postgresql':
+        op.alter_column(
+            'module_results', 'result_json',
+            type_=sa.JSON(),
+            postgresql_using="convert_from(result_json, 'UTF8')::json",
+        )
+    else:
+        with op.batch_alter_table('module_results') as batch_op:
+            batch_op.alter_column('result_json', type_=sa.JSON(), existing_type=sa.LargeBinary())
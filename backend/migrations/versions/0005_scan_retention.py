@@ -0,0 +1,39 @@
+"""scan pinning and artifact purge marker; incremental auto_vacuum on SQLite
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scans', sa.Column('pinned', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column('scans', sa.Column('artifacts_purged_at', sa.DateTime(timezone=True), nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # Switching auto_vacuum mode needs one full VACUUM; afterwards the retention
+        # collector can release free pages a few at a time with incremental_vacuum.
+        mode = bind.exec_driver_sql('PRAGMA auto_vacuum').scalar()
+        if mode != 2:
+            with op.get_context().autocommit_block():
+                bind.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+                bind.exec_driver_sql('VACUUM')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('scans') as batch_op:
+        batch_op.drop_column('artifacts_purged_at')
+        batch_op.drop_column('pinned')
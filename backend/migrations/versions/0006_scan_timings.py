@@ -0,0 +1,42 @@
+"""per-stage scan timings
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scan_timings',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('scan_id', sa.String(), nullable=True),
+        sa.Column('stage', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('started_ms', sa.Float(), nullable=True),
+        sa.Column('wall_ms', sa.Float(), nullable=True),
+        sa.Column('cpu_ms', sa.Float(), nullable=True),
+        sa.Column('queue_wait_ms', sa.Float(), nullable=True),
+        sa.Column('bytes_out', sa.Integer(), nullable=True),
+        sa.Column('rss_delta_kb', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['scan_id'], ['scans.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_scan_timings_scan_id', 'scan_timings', ['scan_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scan_timings_scan_id', table_name='scan_timings')
+    op.drop_table('scan_timings')
@@ -123,10 +123,22 @@ async function clearHistory() {
     }
 }
 
+// Status line for a running scan: queue place or finished stages
+function describeStatus(status) {
+    if (status.status === 'queued' && status.queue_position) {
+        return `Queued: #${status.queue_position}, starting in about ${status.estimated_start_seconds}s...`;
+    }
+    if (status.status === 'running' && status.modules_total) {
+        return `Running: ${status.modules_done}/${status.modules_total} steps done...`;
+    }
+    return `Status: ${status.status}...`;
+}
+
 // Poll scan status
 async function pollScanStatus(scanId) {
     let attempts = 0;
     const maxAttempts = 120;
+    let version = null;
 
     const poll = async () => {
         if (attempts >= maxAttempts) {
@@ -136,11 +148,21 @@ async function pollScanStatus(scanId) {
         }
 
         try {
-            const response = await fetch(`${API_BASE}/scan/${scanId}`);
-            if (!response.ok) throw new Error('Failed to fetch scan status');
-
-            const scanData = await response.json();
-            statusText.textContent = `Status: ${scanData.status}...`;
+            // Long-poll the lightweight status; the full scan is fetched once it is finished
+            const params = version === null ? '' : `?since=${version}&wait=30`;
+            const statusResponse = await fetch(`${API_BASE}/scan/${scanId}/status${params}`);
+            if (!statusResponse.ok) throw new Error('Failed to fetch scan status');
+
+            const status = await statusResponse.json();
+            version = status.version ?? null;
+            statusText.textContent = describeStatus(status);
+
+            let scanData = status;
+            if (status.status === 'completed' || status.status === 'failed') {
+                const response = await fetch(`${API_BASE}/scan/${scanId}`);
+                if (!response.ok) throw new Error('Failed to fetch scan');
+                scanData = await response.json();
+            }
 
             if (scanData.status === 'completed') {
                 // Save completed scan to IndexedDB
@@ -160,7 +182,7 @@ async function pollScanStatus(scanId) {
                 setTimeout(() => loadScan(scanId), 3000);
             } else {
                 attempts++;
-                setTimeout(poll, 1000);
+                setTimeout(poll, version === null ? 1000 : 0);
             }
         } catch (error) {
             console.error('Error polling scan:', error);
@@ -549,9 +571,16 @@ async function createNewScan() {
         const response = await fetch(`${API_BASE}/scan/`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ url })
+            // Someone is waiting on screen: the interactive lane starts within seconds
+            body: JSON.stringify({ url, priority: 'interactive' })
         });
 
+        if (response.status === 429) {
+            // Admission control: queue full or too many scans from this client
+            const retryAfter = response.headers.get('Retry-After');
+            const body = await response.json().catch(() => ({}));
+            throw new Error(`${body.detail || 'Server is busy'}. Try again in ${retryAfter || 'a few'} seconds.`);
+        }
         if (!response.ok) throw new Error('Failed to create scan');
 
         const scanData = await response.json();
@@ -577,6 +606,7 @@ async function createNewScan() {
 async function pollScanStatus(scanId) {
     let attempts = 0;
     const maxAttempts = 120;
+    let version = null;
 
     const poll = async () => {
         if (attempts >= maxAttempts) {
@@ -586,11 +616,21 @@ async function pollScanStatus(scanId) {
         }
 
         try {
-            const response = await fetch(`${API_BASE}/scan/${scanId}`);
-            if (!response.ok) throw new Error('Failed to fetch scan status');
-
-            const scanData = await response.json();
-            statusText.textContent = `Status: ${scanData.status}...`;
+            // Long-poll the lightweight status; the full scan is fetched once it is finished
+            const params = version === null ? '' : `?since=${version}&wait=30`;
+            const statusResponse = await fetch(`${API_BASE}/scan/${scanId}/status${params}`);
+            if (!statusResponse.ok) throw new Error('Failed to fetch scan status');
+
+            const status = await statusResponse.json();
+            version = status.version ?? null;
+            statusText.textContent = describeStatus(status);
+
+            let scanData = status;
+            if (status.status === 'completed' || status.status === 'failed') {
+                const response = await fetch(`${API_BASE}/scan/${scanId}`);
+                if (!response.ok) throw new Error('Failed to fetch scan');
+                scanData = await response.json();
+            }
 
             // Update sidebar status immediately
             const sidebarStatus = document.querySelector(`.scan-item[data-scan-id="${scanId}"] .scan-status`);
@@ -607,7 +647,7 @@ async function pollScanStatus(scanId) {
                 setTimeout(() => loadScan(scanId), 3000);
             } else {
                 attempts++;
-                setTimeout(poll, 1000);
+                setTimeout(poll, version === null ? 1000 : 0);
             }
         } catch (error) {
             console.error('Error polling scan:', error);
@@ -711,7 +751,13 @@ function displayResults(scanData) {
         recommendationsList.innerHTML = '<li>No recommendations available</li>';
     }
 
-    // Heatmaps - now served from database
+    // Heatmaps - now served from database, until retention purges the scan's files
+    const heatmapsCard = document.querySelector('.heatmaps-card');
+    if (report.artifacts_purged) {
+        heatmapsCard.classList.add('hidden');
+        return;
+    }
+    heatmapsCard.classList.remove('hidden');
     document.getElementById('attentionHeatmap').src = `${API_BASE}/files/${scanData.id}/attention_heatmap`;
     document.getElementById('clickHeatmap').src = `${API_BASE}/files/${scanData.id}/click_heatmap`;
 }
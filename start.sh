@@ -152,4 +152,7 @@ echo "Press Ctrl+C to stop the server"
 echo ""
 
 cd backend
-uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+# Behind a reverse proxy (Render) the client address is in X-Forwarded-For; scan quotas
+# key anonymous clients on it. Only trust it from FORWARDED_ALLOW_IPS (default: local proxy)
+uvicorn app.main:app --reload --host 0.0.0.0 --port 8000 \
+    --proxy-headers --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-127.0.0.1}"